@@ -0,0 +1,402 @@
+import argparse
+import html
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from trade_journal import Side
+
+
+# Кількість точок кривої капіталу, що зберігається у звіті для графіків і порівняння прогонів
+EQUITY_SAMPLE_POINTS = 500
+
+# Поля підсумку у таблиці порівняння прогонів
+COMPARE_FIELDS = ['total_return_percent', 'profit', 'final_equity', 'max_drawdown_percent', 'max_drawdown_duration',
+                  'sharpe', 'sortino', 'exposure_percent', 'cycles', 'mean_cycle_duration', 'max_cycle_depth_percent',
+                  'max_adverse_percent', 'mean_levels_filled', 'trades', 'fees']
+
+CYCLE_COLUMNS = ['start', 'end', 'duration', 'closed', 'buys', 'levels', 'entry_price',
+                 'depth_percent', 'max_adverse_percent', 'profit_percent']
+
+
+def mark_to_market(close, index, trades, initial_balance):
+    """Побарові кошти, позиція, її вартість і капітал (кошти + позиція × close) без циклу по барах.
+
+    `trades` - колонки журналу угод. Кошти - початковий баланс + реалізований
+    прибуток - вартість відкритої позиції; комісії входять у вартість покупок
+    і віднімаються з надходжень від продажів.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    quantity = np.zeros(n)
+    cost = np.zeros(n)
+    realized = np.zeros(n)
+    if len(trades['side']):
+        is_sell = trades['side'] == Side.SELL
+        price = trades['price']
+        traded = trades['quantity']
+        fee = trades['fee']
+        bars = pd.DatetimeIndex(index).searchsorted(pd.to_datetime(trades['timestamp'], unit='ns'))
+
+        # Продаж закриває весь цикл: вартість циклу - сума покупок з моменту попереднього продажу
+        cycle = np.cumsum(is_sell) - is_sell
+        buy_cost = np.where(is_sell, 0.0, price * traded + fee)
+        cycle_cost = np.bincount(cycle, weights=buy_cost, minlength=int(cycle[-1]) + 1)
+        sell_cost = np.where(is_sell, cycle_cost[cycle], 0.0)
+
+        np.add.at(quantity, bars, np.where(is_sell, -traded, traded))
+        np.add.at(cost, bars, buy_cost - sell_cost)
+        np.add.at(realized, bars, np.where(is_sell, price * traded - fee - sell_cost, 0.0))
+        # Після продажу позиції немає: накопичені суми обнуляються від залишків округлення
+        last_trade = np.searchsorted(bars, np.arange(n), side='right') - 1
+        holding = (last_trade >= 0) & ~is_sell[np.maximum(last_trade, 0)]
+        quantity = np.where(holding, np.cumsum(quantity), 0.0)
+        cost = np.where(holding, np.cumsum(cost), 0.0)
+        realized = np.cumsum(realized)
+    cash = initial_balance + realized - cost
+    return {'cash': cash, 'quantity': quantity, 'cost': cost, 'equity': cash + quantity * close}
+
+
+def _periods_per_year(index):
+    if len(index) < 2:
+        return 0.0
+    step = pd.Series(index).diff().median()
+    return pd.Timedelta(days=365) / step if step > pd.Timedelta(0) else 0.0
+
+
+def drawdown_stats(equity, index):
+    """Максимальна просадка (%), її початок, дно та відновлення, а також найдовший період під водою."""
+    n = len(equity)
+    if n == 0:
+        return {'max_drawdown_percent': 0.0, 'max_drawdown_start': None, 'max_drawdown_trough': None,
+                'max_drawdown_recovery': None, 'max_drawdown_duration': pd.Timedelta(0),
+                'max_drawdown_duration_bars': 0}
+    peaks = np.maximum.accumulate(equity)
+    drawdown = (peaks - equity) / peaks
+    positions = np.arange(n)
+    # Позиція останнього піку для кожного бару
+    last_peak = np.maximum.accumulate(np.where(equity >= peaks, positions, 0))
+    trough = int(np.argmax(drawdown))
+    start = int(last_peak[trough])
+    recovered = np.flatnonzero(equity[trough:] >= peaks[trough])
+    recovery = trough + int(recovered[0]) if len(recovered) else None
+
+    underwater = positions - last_peak
+    longest = int(np.argmax(underwater))
+    return {
+        'max_drawdown_percent': float(drawdown[trough] * 100),
+        'max_drawdown_start': index[start],
+        'max_drawdown_trough': index[trough],
+        'max_drawdown_recovery': index[recovery] if recovery is not None else None,
+        'max_drawdown_duration': index[longest] - index[last_peak[longest]],
+        'max_drawdown_duration_bars': int(underwater[longest]),
+    }
+
+
+def risk_ratios(equity, index):
+    """Річні коефіцієнти Шарпа та Сортіно за побаровими доходностями (безризикова ставка - 0)."""
+    if len(equity) < 2:
+        return {'sharpe': 0.0, 'sortino': 0.0}
+    returns = np.diff(equity) / equity[:-1]
+    scale = np.sqrt(_periods_per_year(index))
+    mean = returns.mean()
+    deviation = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    return {
+        'sharpe': float(mean / deviation * scale) if deviation > 0 else 0.0,
+        'sortino': float(mean / downside * scale) if downside > 0 else 0.0,
+    }
+
+
+def trade_cycles(trades, close, index, quantity, cost):
+    """Цикли стратегії: від першої купівлі сітки до продажу з тейк-профітом.
+
+    Для кожного циклу - тривалість, кількість покупок і виконаних рівнів сітки,
+    глибина (падіння close від першої ціни входу) та найбільший нереалізований
+    збиток. Незакритий цикл наприкінці прогону позначається closed=False.
+    """
+    if not len(trades['side']):
+        return pd.DataFrame(columns=CYCLE_COLUMNS)
+    is_sell = trades['side'] == Side.SELL
+    bars = index.searchsorted(pd.to_datetime(trades['timestamp'], unit='ns'))
+    cycle = np.cumsum(is_sell) - is_sell
+    firsts = np.flatnonzero(np.r_[True, cycle[1:] != cycle[:-1]])
+    lasts = np.r_[firsts[1:], len(cycle)] - 1
+    closed = is_sell[lasts]
+    start_bar = bars[firsts]
+    end_bar = np.where(closed, bars[lasts], len(close) - 1)
+
+    # Мінімуми на барах [start, end] кожного циклу: reduceat по парах меж, непарні відрізки відкидаються
+    bounds = np.column_stack((start_bar, end_bar + 1)).ravel()
+    lowest = np.minimum.reduceat(np.append(close, np.inf), bounds)[::2]
+    unrealized = np.full(len(close) + 1, np.inf)
+    holding = np.flatnonzero(cost > 0)
+    unrealized[holding] = (quantity[holding] * close[holding] / cost[holding] - 1) * 100
+    adverse = np.minimum.reduceat(unrealized, bounds)[::2]
+
+    entry_price = trades['price'][firsts]
+    return pd.DataFrame({
+        'start': index[start_bar],
+        'end': index[end_bar],
+        'duration': index[end_bar] - index[start_bar],
+        'closed': closed,
+        'buys': np.add.reduceat((~is_sell).astype(np.int64), firsts),
+        'levels': np.add.reduceat(np.where(is_sell, 0, trades['orders_executed']).astype(np.int64), firsts),
+        'entry_price': entry_price,
+        'depth_percent': (1 - lowest / entry_price) * 100,
+        'max_adverse_percent': np.where(np.isfinite(adverse), -np.minimum(adverse, 0.0), 0.0),
+        'profit_percent': np.where(closed, trades['profit_percent'][lasts], np.nan),
+    }, columns=CYCLE_COLUMNS)
+
+
+def analyze(engine, start=None, stop=None):
+    """Звіт про прогін рушія: підсумкові метрики, цикли, розподіл рівнів сітки та вибірка кривої капіталу.
+
+    За замовчуванням враховуються бари від прогріву індикаторів до останнього обробленого бару.
+    """
+    close = np.asarray(engine.close, dtype=np.float64)
+    index = pd.DatetimeIndex(engine.index)
+    trades = engine.journal.arrays()
+    curves = mark_to_market(close, index, trades, engine.initial_balance)
+
+    if stop is None:
+        stop = len(close) if engine.last_index is None else engine.last_index + 1
+    start = min(max(engine.warmup if start is None else int(start), 0), stop)
+    equity = curves['equity'][start:stop]
+    timestamps = index[start:stop]
+
+    cycles = trade_cycles(trades, close[:stop], index[:stop], curves['quantity'][:stop], curves['cost'][:stop])
+    closed = cycles[cycles['closed'].astype(bool)]
+    final_equity = float(equity[-1]) if len(equity) else float(engine.initial_balance)
+    summary = {
+        'start': timestamps[0] if len(timestamps) else None,
+        'end': timestamps[-1] if len(timestamps) else None,
+        'bars': len(equity),
+        'initial_balance': float(engine.initial_balance),
+        'final_equity': final_equity,
+        'profit': float(engine.profit),
+        'total_return_percent': (final_equity / engine.initial_balance - 1) * 100,
+        **drawdown_stats(equity, timestamps),
+        **risk_ratios(equity, timestamps),
+        'exposure_percent': float(np.mean(curves['quantity'][start:stop] > 0) * 100) if len(equity) else 0.0,
+        'trades': len(trades['side']),
+        'buys': int(np.count_nonzero(trades['side'] == Side.BUY)),
+        'sells': int(np.count_nonzero(trades['side'] == Side.SELL)),
+        'fees': float(trades['fee'].sum()),
+        'cycles': len(closed),
+        'open_cycle': bool(len(cycles) and not cycles['closed'].iloc[-1]),
+        'mean_cycle_duration': closed['duration'].mean() if len(closed) else pd.Timedelta(0),
+        'max_cycle_duration': closed['duration'].max() if len(closed) else pd.Timedelta(0),
+        'mean_cycle_depth_percent': float(closed['depth_percent'].mean()) if len(closed) else 0.0,
+        'max_cycle_depth_percent': float(cycles['depth_percent'].max()) if len(cycles) else 0.0,
+        'max_adverse_percent': float(cycles['max_adverse_percent'].max()) if len(cycles) else 0.0,
+        'mean_levels_filled': float(cycles['levels'].mean()) if len(cycles) else 0.0,
+    }
+
+    sample = np.unique(np.linspace(0, len(equity) - 1, min(len(equity), EQUITY_SAMPLE_POINTS)).astype(int))
+    peaks = np.maximum.accumulate(equity) if len(equity) else equity
+    return {
+        'summary': summary,
+        'grid_levels': {int(levels): int(count) for levels, count in cycles['levels'].value_counts().sort_index().items()},
+        'cycles': cycles,
+        'equity_sample': pd.DataFrame({
+            'equity': equity[sample],
+            'drawdown_percent': ((peaks - equity) / peaks * 100)[sample],
+        }, index=pd.DatetimeIndex(timestamps[sample], name='timestamp')),
+    }
+
+
+def _plain(value):
+    """Значення звіту у вигляді, придатному для JSON."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, pd.Timedelta):
+        return value.total_seconds()
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return float(value) if np.isfinite(value) else None
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return str(value)
+
+
+def report_to_json(report, params=None):
+    """Звіт як словник JSON; тривалості - у секундах, час - ISO 8601."""
+    cycles = report['cycles']
+    sample = report['equity_sample']
+    return {
+        'params': params or {},
+        'summary': {name: _plain(value) for name, value in report['summary'].items()},
+        'grid_levels': {str(levels): count for levels, count in report['grid_levels'].items()},
+        'cycles': [{name: _plain(value) for name, value in row.items()} for row in cycles.to_dict('records')],
+        'equity_sample': {
+            'timestamp': [_plain(timestamp) for timestamp in sample.index],
+            'equity': [_plain(value) for value in sample['equity']],
+            'drawdown_percent': [_plain(value) for value in sample['drawdown_percent']],
+        },
+    }
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def write_report_json(path, payload):
+    _write(path, json.dumps(payload, indent=2, ensure_ascii=False))
+
+
+def _format(name, value):
+    if value is None:
+        return '-'
+    if name.endswith('duration') and isinstance(value, (int, float)):
+        return str(pd.Timedelta(seconds=value))
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _svg_line(values, width=900, height=220, color='#1f77b4', fill=None):
+    """Інлайн-SVG лінії по значеннях (без зовнішніх бібліотек і скриптів)."""
+    values = np.asarray([np.nan if value is None else value for value in values], dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if len(finite) < 2:
+        return '<svg></svg>'
+    low, high = float(finite.min()), float(finite.max())
+    span = (high - low) or 1.0
+    x = np.linspace(0, width, len(values))
+    y = height - (np.nan_to_num(values, nan=low) - low) / span * (height - 10) - 5
+    points = ' '.join(f"{px:.1f},{py:.1f}" for px, py in zip(x, y))
+    area = f'<polygon points="0,{height} {points} {width},{height}" fill="{fill}" stroke="none"/>' if fill else ''
+    return (f'<svg viewBox="0 0 {width} {height}" width="100%" preserveAspectRatio="none">{area}'
+            f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="1.5"/>'
+            f'<text x="4" y="14" font-size="12">{high:,.2f}</text>'
+            f'<text x="4" y="{height - 4}" font-size="12">{low:,.2f}</text></svg>')
+
+
+def _table(rows, columns):
+    head = ''.join(f'<th>{html.escape(column)}</th>' for column in columns)
+    body = ''.join('<tr>' + ''.join(f'<td>{html.escape(_format(column, row.get(column)))}</td>' for column in columns)
+                   + '</tr>' for row in rows)
+    return f'<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+_STYLE = ('<style>body{font-family:sans-serif;margin:24px;color:#222}table{border-collapse:collapse;margin:12px 0}'
+          'td,th{border:1px solid #ccc;padding:3px 8px;text-align:right;font-size:13px}th{background:#f3f3f3}'
+          'h2{margin-top:28px}</style>')
+
+
+def render_html(payload, title='Звіт бек-тесту'):
+    """Самодостатній HTML-звіт (CSS та SVG вбудовані) зі словника report_to_json."""
+    summary = payload['summary']
+    sample = payload['equity_sample']
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(title)}</title>{_STYLE}</head><body>',
+             f'<h1>{html.escape(title)}</h1>']
+    if payload.get('params'):
+        parts.append('<h2>Параметри</h2>' + _table([payload['params']], list(payload['params'])))
+    parts.append('<h2>Підсумок</h2>' + _table([{'метрика': name, 'значення': _format(name, value)}
+                                              for name, value in summary.items()], ['метрика', 'значення']))
+    parts.append('<h2>Капітал</h2>' + _svg_line(sample['equity']))
+    parts.append('<h2>Просадка, %</h2>' + _svg_line([-value if value is not None else None
+                                                     for value in sample['drawdown_percent']],
+                                                    color='#d62728', fill='#f6d0d0'))
+    parts.append('<h2>Розподіл виконаних рівнів сітки</h2>'
+                 + _table([{'рівнів': levels, 'циклів': count} for levels, count in payload['grid_levels'].items()],
+                          ['рівнів', 'циклів']))
+    parts.append('<h2>Цикли</h2>' + _table(payload['cycles'], CYCLE_COLUMNS))
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def render_comparison(payloads, names):
+    """HTML з підсумками кількох прогонів поруч: параметри, метрики та мініатюри кривих капіталу."""
+    param_names = sorted({name for payload in payloads for name in payload.get('params', {})})
+    rows = []
+    for name, payload in zip(names, payloads):
+        rows.append({'прогін': name, **payload.get('params', {}),
+                     **{field: payload['summary'].get(field) for field in COMPARE_FIELDS}})
+    columns = ['прогін'] + param_names + COMPARE_FIELDS
+    sparklines = ''.join(f'<h3>{html.escape(name)}</h3>' + _svg_line(payload['equity_sample']['equity'], height=80)
+                         for name, payload in zip(names, payloads))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Порівняння прогонів</title>{_STYLE}</head><body>'
+            f'<h1>Порівняння прогонів</h1>{_table(rows, columns)}<h2>Криві капіталу</h2>{sparklines}</body></html>')
+
+
+def format_summary(summary):
+    """Короткий текстовий підсумок для логу."""
+    return (f"Прибутковість {summary['total_return_percent']:.2f}%, макс. просадка "
+            f"{summary['max_drawdown_percent']:.2f}% (під водою до {summary['max_drawdown_duration']}), "
+            f"Шарп {summary['sharpe']:.2f}, Сортіно {summary['sortino']:.2f}, "
+            f"в позиції {summary['exposure_percent']:.1f}% часу, циклів {summary['cycles']} "
+            f"(сер. тривалість {summary['mean_cycle_duration']}, макс. глибина "
+            f"{summary['max_cycle_depth_percent']:.2f}%, сер. рівнів {summary['mean_levels_filled']:.1f}).")
+
+
+def write_report(output_dir, name, report, params=None):
+    """Записати звіт у OUTPUT_DIR/<name>.json і <name>.html; повертає словник JSON."""
+    payload = report_to_json(report, params)
+    write_report_json(os.path.join(output_dir, f"{name}.json"), payload)
+    _write(os.path.join(output_dir, f"{name}.html"), render_html(payload, title=f"Звіт бек-тесту {name}"))
+    return payload
+
+
+def run_reports(csv_path, ranges, output_dir, balance=5000.0, start_date=None, end_date=None):
+    """Бек-тест і звіт для кожної комбінації параметрів; index.html порівнює всі прогони."""
+    from backtest_engine import BacktestEngine
+    from data_source import load_ohlcv
+    from indicators import IndicatorCache
+    from optimizer import INDICATOR_PARAMS, build_grid, silent
+
+    data = load_ohlcv(csv_path, start_date=start_date, end_date=end_date)
+    cache = IndicatorCache()
+    payloads, names = [], []
+    for number, params in enumerate(build_grid(ranges), start=1):
+        frame = cache.get(data, *(params[name] for name in INDICATOR_PARAMS))
+        engine = BacktestEngine.from_params(frame, {'balance': balance, **params}, log=silent, kernel=True)
+        engine.run()
+        report = analyze(engine)
+        name = f"run_{number:04d}"
+        payload = write_report(output_dir, name, report, params)
+        logging.info(f"{name}: {format_summary(report['summary'])}")
+        payloads.append(payload)
+        names.append(name)
+    _write(os.path.join(output_dir, 'index.html'), render_comparison(payloads, names))
+    logging.info(f"Звіти {len(payloads)} прогонів у '{output_dir}', порівняння - index.html.")
+    return payloads
+
+
+if __name__ == "__main__":
+    from optimizer import add_sweep_arguments, ranges_from_args
+
+    parser = argparse.ArgumentParser(description='Звіт аналітики бек-тесту (HTML/JSON) та порівняння прогонів')
+    parser.add_argument('--csv', help='CSV з даними OHLCV (Time,Open,High,Low,Close,Volume)')
+    parser.add_argument('--from', dest='from_date', help='Початкова дата у форматі YYYY-MM-DD')
+    parser.add_argument('--to', dest='to_date', help='Кінцева дата у форматі YYYY-MM-DD')
+    parser.add_argument('--balance', type=float, default=5000.0, help='Початковий баланс')
+    parser.add_argument('--output-dir', default='reports', help='Каталог для звітів')
+    parser.add_argument('--compare', nargs='+', metavar='JSON',
+                        help='Лише порівняти готові JSON-звіти (без бек-тестів) у OUTPUT_DIR/index.html')
+    add_sweep_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.compare:
+        loaded = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as f:
+                loaded.append(json.load(f))
+        _write(os.path.join(args.output_dir, 'index.html'),
+               render_comparison(loaded, [os.path.splitext(os.path.basename(path))[0] for path in args.compare]))
+        logging.info(f"Порівняння {len(loaded)} звітів у '{os.path.join(args.output_dir, 'index.html')}'.")
+    elif args.csv:
+        run_reports(args.csv, ranges_from_args(args), args.output_dir, balance=args.balance,
+                    start_date=args.from_date, end_date=args.to_date)
+    else:
+        parser.error('Потрібен --csv або --compare')
@@ -0,0 +1,594 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from analytics import mark_to_market
+from exchange import OrderRejected
+from execution import ExecutionModel
+import grid_kernel
+from order_book import GridOrderBook
+from trade_journal import Side, TradeJournal
+
+
+# Колонки, які повертає calculate_indicators і які потрібні стратегії
+INDICATOR_COLUMNS = ('close', 'ma', 'ma_10', 'bb_lower', 'bb_upper')
+
+# Додаткові колонки для виконання всередині бару (ExecutionModel(intrabar=True))
+INTRABAR_COLUMNS = ('open', 'high', 'low')
+
+# Методи стратегії, які повністю замінює ядро сітки; перевизначення будь-якого з них вимикає ядро
+KERNEL_METHODS = ('on_bar', 'check_buy_conditions', 'check_sell_conditions', 'execute_initial_buy_order',
+                  'execute_remembered_orders', 'setup_conditional_orders', 'submit_order', 'buying_power',
+                  'check_intrabar', 'take_profit_price', 'profit_percent_at', 'sell')
+
+
+class StrategyState:
+    """Торговий стан стратегії для однієї пари: позиція, баланс, сітка ордерів та угоди."""
+
+    __slots__ = ('holding_coins', 'bought_quantity', 'total_cost', 'balance', 'profit', 'order_book',
+                 'initial_buy_done', 'journal', 'last_index')
+
+    def __init__(self, initial_balance, journal=None):
+        self.holding_coins = False
+        self.bought_quantity = 0.0
+        self.total_cost = 0.0
+        self.balance = initial_balance
+        self.profit = 0.0
+        self.order_book = GridOrderBook()
+        self.initial_buy_done = False
+        self.journal = journal if journal is not None else TradeJournal()
+        self.last_index = None
+
+
+def _state_attribute(name):
+    # Поле стану, доступне як атрибут рушія (для GUI, оптимізатора та звітів)
+    return property(lambda self: getattr(self.state, name))
+
+
+def engine_params(params):
+    """Аргументи рушія зі словника значень, аналогічного TradingBotApp.params."""
+    return {
+        'initial_balance': params.get('balance', 5000.0),
+        'number_of_orders': params.get('number_of_orders', 20),
+        'martingale_factor': params.get('martingale_factor', 0.1),
+        'order_step_percentage': params.get('order_step_percentage', 2.0),
+        'profit_target_percent': params.get('profit_target_percent', 1.9),
+        'net_profit_target_percent': params.get('net_profit_target_percent', 4.24),
+        'purchase_balance_percent': params.get('purchase_balance_percent', 25.0),
+    }
+
+
+class BacktestEngine:
+    """Бек-тест стратегії MA10/MA320/BB з сіткою мартингейла без Tk."""
+
+    def __init__(self, data, initial_balance=5000.0, number_of_orders=20, martingale_factor=0.1,
+                 order_step_percentage=2.0, profit_target_percent=1.9, net_profit_target_percent=4.24,
+                 purchase_balance_percent=25.0, log=None, exchange=None, capital=None, trade_sink=None,
+                 keep_trades=True, kernel=False, execution=None):
+        execution = execution or ExecutionModel()
+        required = INDICATOR_COLUMNS + (INTRABAR_COLUMNS if execution.intrabar else ())
+        missing = [column for column in required if column not in data.columns]
+        if missing:
+            raise ValueError(f"У даних відсутні колонки: {', '.join(missing)}")
+
+        # Одноразове вилучення суцільних масивів з DataFrame
+        self.index = data.index
+        self.close = np.ascontiguousarray(data['close'].to_numpy(dtype=np.float64))
+        self.ma = np.ascontiguousarray(data['ma'].to_numpy(dtype=np.float64))
+        self.ma_10 = np.ascontiguousarray(data['ma_10'].to_numpy(dtype=np.float64))
+        self.bb_lower = np.ascontiguousarray(data['bb_lower'].to_numpy(dtype=np.float64))
+        self.bb_upper = np.ascontiguousarray(data['bb_upper'].to_numpy(dtype=np.float64))
+        if execution.intrabar:
+            self.open = np.ascontiguousarray(data['open'].to_numpy(dtype=np.float64))
+            self.high = np.ascontiguousarray(data['high'].to_numpy(dtype=np.float64))
+            self.low = np.ascontiguousarray(data['low'].to_numpy(dtype=np.float64))
+            # Межі діапазону кожного бару одним векторним проходом: бари, що не перетинають
+            # ні смугу, ні тейк-профіт, check_intrabar відкидає без обходу шляху
+            self.bar_low = np.minimum.reduce((self.open, self.high, self.low, self.close)).tolist()
+            self.bar_high = np.maximum.reduce((self.open, self.high, self.low, self.close)).tolist()
+        else:
+            self.open = self.high = self.low = self.bar_low = self.bar_high = None
+
+        self.initial_balance = float(initial_balance)
+        self.number_of_orders = int(number_of_orders)
+        self.martingale_factor = float(martingale_factor)
+        self.order_step_percentage = float(order_step_percentage)
+        self.profit_target_percent = float(profit_target_percent)
+        self.net_profit_target_percent = float(net_profit_target_percent)
+        self.purchase_balance_percent = float(purchase_balance_percent) / 100  # Перетворення на дробове число
+
+        self.log = log or logging.info
+        self.exchange = exchange  # Адаптер біржі для торгівлі наживо; у бек-тесті None
+        self.capital = capital  # Спільний пул капіталу портфеля; None - лише власний баланс
+        self.trade_sink = trade_sink  # Приймач, у який журнал угод дописується пачками під час прогону
+        self.keep_trades = keep_trades  # False - записані у приймач угоди не тримаються в пам'яті
+        self.kernel = kernel  # True - run() через скомпільоване ядро сітки, коли це можливо (див. uses_kernel)
+        self.execution = execution  # Ціни виконання, комісія, прослизання та події всередині бару
+        self.reset()
+
+    @classmethod
+    def from_params(cls, data, params, log=None, exchange=None, **kwargs):
+        """Створити рушій зі словника значень, аналогічного TradingBotApp.params."""
+        return cls(data, log=log, exchange=exchange, **engine_params(params), **kwargs)
+
+    def reset(self):
+        """Скинути торговий стан до початкового."""
+        self.state = StrategyState(self.initial_balance,
+                                   TradeJournal(sink=self.trade_sink, keep=self.keep_trades))
+        # Побарова діагностика лише на рівні DEBUG; перевірка рівня - один раз, а не на кожен бар
+        self.debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+    holding_coins = _state_attribute('holding_coins')
+    bought_quantity = _state_attribute('bought_quantity')
+    total_cost = _state_attribute('total_cost')
+    balance = _state_attribute('balance')
+    profit = _state_attribute('profit')
+    order_book = _state_attribute('order_book')
+    initial_buy_done = _state_attribute('initial_buy_done')
+    journal = _state_attribute('journal')
+    last_index = _state_attribute('last_index')
+
+    @property
+    def warmup(self):
+        """Перший індекс, на якому поточні та попередні значення індикаторів валідні."""
+        valid = np.isfinite(self.ma) & np.isfinite(self.ma_10) & np.isfinite(self.bb_lower) & np.isfinite(self.bb_upper)
+        positions = np.flatnonzero(valid)
+        if len(positions) == 0:
+            return len(self.close)
+        return int(positions[0]) + 1
+
+    @property
+    def conditional_orders(self):
+        """Невиконані умовні ордери у форматі [{'price', 'quantity'}] (для графіку)."""
+        return [{'price': price, 'quantity': quantity} for price, quantity in self.order_book.open_orders()]
+
+    @property
+    def remembered_orders(self):
+        return [{'price': price, 'quantity': quantity} for price, quantity in self.order_book.remembered]
+
+    @property
+    def last_close(self):
+        return float(self.close[self.last_index]) if self.last_index is not None else 0.0
+
+    @property
+    def last_timestamp(self):
+        return self.index[self.last_index] if self.last_index is not None else None
+
+    def run(self, start=None, stop=None):
+        """Прогнати стратегію по барах [start, stop) і повернути історію торгівлі."""
+        start = self.warmup if start is None else max(int(start), 1)
+        stop = len(self.close) if stop is None else min(int(stop), len(self.close))
+        if self.uses_kernel():
+            self.run_kernel(start, stop)
+            return self.journal
+
+        # Списки Python індексуються швидше за скаляри NumPy у чистому циклі
+        close = self.close.tolist()
+        ma = self.ma.tolist()
+        ma_10 = self.ma_10.tolist()
+        bb_lower = self.bb_lower.tolist()
+        bb_upper = self.bb_upper.tolist()
+        on_bar = self.on_bar
+        self.debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+
+        for i in range(start, stop):
+            on_bar(i, close[i], ma[i], ma_10[i], bb_lower[i], bb_upper[i], ma[i - 1], ma_10[i - 1], bb_lower[i - 1])
+
+        return self.journal
+
+    def uses_kernel(self):
+        """Чи виконає run() прогін ядром сітки.
+
+        Ядро не викликає методів рушія, тож воно вмикається лише без біржі,
+        спільного пулу капіталу, DEBUG-діагностики та перевизначених або
+        обгорнутих (instrument_engine) методів стратегії. Без Numba побаровий
+        цикл рушія швидший за інтерпретоване ядро, тож тоді лишається він.
+        """
+        if not (self.kernel and grid_kernel.NUMBA_AVAILABLE) or self.exchange is not None or self.capital is not None:
+            return False
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            return False
+        return all(name not in vars(self) and getattr(type(self), name) is getattr(BacktestEngine, name)
+                   for name in KERNEL_METHODS)
+
+    def run_kernel(self, start, stop):
+        """Прогнати бари [start, stop) ядром сітки і перенести угоди та кінцевий стан у рушій.
+
+        Повідомлення про окремі угоди при цьому не логуються.
+        """
+        state = self.state
+        prices, quantities, filled, reached, remembered = state.order_book.export_state()
+        remembered = np.array(remembered, dtype=np.float64).reshape(-1, 2)
+        execution = self.execution
+        close = np.asarray(self.close, dtype=np.float64)
+        intrabar = self.high is not None
+        # Без intrabar ядро не читає open/high/low
+        open_, high, low = (self.open, self.high, self.low) if intrabar else (close, close, close)
+        (trades, last_index, state.holding_coins, state.bought_quantity, state.total_cost, state.balance,
+         state.profit, state.initial_buy_done, prices, quantities, filled, reached,
+         remembered_prices, remembered_quantities) = grid_kernel.compiled()(
+            close, np.asarray(self.ma, dtype=np.float64),
+            np.asarray(self.ma_10, dtype=np.float64), np.asarray(self.bb_lower, dtype=np.float64),
+            np.asarray(self.bb_upper, dtype=np.float64), open_, high, low, start, stop,
+            self.initial_balance, self.number_of_orders, self.martingale_factor,
+            self.order_step_percentage / 100, self.profit_target_percent, self.net_profit_target_percent,
+            self.purchase_balance_percent, intrabar, execution.fee_rate, execution.slippage, bool(state.holding_coins),
+            float(state.bought_quantity),
+            float(state.total_cost), float(state.balance), float(state.profit), bool(state.initial_buy_done),
+            np.array(prices, dtype=np.float64), np.array(quantities, dtype=np.float64),
+            np.array(filled, dtype=np.bool_), reached, remembered[:, 0].copy(), remembered[:, 1].copy())
+        state.order_book.restore_state(prices.tolist(), quantities.tolist(), filled, reached,
+                                       zip(remembered_prices.tolist(), remembered_quantities.tolist()))
+        if last_index >= 0:
+            state.last_index = last_index
+
+        bars = trades[:, grid_kernel.TRADE_BAR].astype(np.int64)
+        state.journal.extend({
+            'timestamp': pd.DatetimeIndex(self.index)[bars].as_unit('ns').asi8,
+            'side': trades[:, grid_kernel.TRADE_SIDE].astype(np.int8),
+            'price': trades[:, grid_kernel.TRADE_PRICE],
+            'quantity': trades[:, grid_kernel.TRADE_QUANTITY],
+            'orders_executed': trades[:, grid_kernel.TRADE_ORDERS].astype(np.int32),
+            'profit_percent': trades[:, grid_kernel.TRADE_PROFIT],
+            'fee': trades[:, grid_kernel.TRADE_FEE],
+        })
+
+    @property
+    def trade_history(self):
+        """Угоди як список словників (сумісність; для обробки - journal або trade_history_frame())."""
+        return self.journal.records()
+
+    def step(self, i):
+        """Обробити один бар за його позиційним індексом."""
+        self.on_bar(
+            i, float(self.close[i]), float(self.ma[i]), float(self.ma_10[i]),
+            float(self.bb_lower[i]), float(self.bb_upper[i]),
+            float(self.ma[i - 1]), float(self.ma_10[i - 1]), float(self.bb_lower[i - 1])
+        )
+
+    def on_bar(self, i, last_close, last_ma, last_ma_10, last_bb_lower, last_bb_upper,
+               prev_ma, prev_ma_10, prev_bb_lower):
+        state = self.state
+        state.last_index = i
+        if self.debug:
+            logging.debug("Умови купівлі - Час: %s, Ціна: %s, MA10: %s, MA: %s, BB Lower: %s",
+                          self.index[i], last_close, last_ma_10, last_ma, last_bb_lower)
+            logging.debug("Умови продажу - Час: %s, Ціна: %s, BB Upper: %s", self.index[i], last_close, last_bb_upper)
+        if self.high is not None:
+            self.check_intrabar(i, prev_bb_lower)
+        self.check_buy_conditions(i, last_close, last_ma, last_ma_10, last_bb_lower, prev_ma, prev_ma_10, prev_bb_lower)
+        self.check_sell_conditions(i, last_close, last_bb_upper)
+
+    def check_intrabar(self, i, prev_bb_lower):
+        """Події бару i до його закриття: рівні сітки, досягнуті мінімумом, і тейк-профіт за максимумом.
+
+        Точки бару проходяться в порядку O→L→H→C (див. ExecutionModel). Смуги Боллінджера
+        беруться з попереднього бару - значення бару i залежать від його close.
+        Рішення за close (перетини MA, купівлі) приймаються після, у check_buy_conditions.
+        """
+        state = self.state
+        if not state.initial_buy_done:
+            return  # Без сітки немає ні рівнів, ні позиції (позиція можлива лише після початкової купівлі)
+        bb_upper = float(self.bb_upper[i - 1])
+        threshold = self.take_profit_price(bb_upper)
+        if self.bar_low[i] >= prev_bb_lower and (threshold is None or self.bar_high[i] < threshold):
+            return  # Діапазон бару не перетинає ні смугу, ні тейк-профіт
+        points = self.execution.points(float(self.open[i]), float(self.high[i]), float(self.low[i]),
+                                       float(self.close[i]))
+        previous = points[0]
+        if threshold is not None and previous >= threshold:
+            self.sell(i, previous, self.profit_percent_at(previous))  # Розрив ціни на відкритті
+        for price in points[1:]:
+            if price < previous:
+                if state.initial_buy_done and price < prev_bb_lower:
+                    for level_price, _ in state.order_book.remember_reached(price):
+                        self.log(f"Ціна досягла умовного ордера на {level_price:.2f}. Запам'ятовування ордера.")
+            elif price > previous:
+                threshold = self.take_profit_price(bb_upper)
+                if threshold is not None and price >= threshold:
+                    exit_price = max(previous, threshold)
+                    self.sell(i, exit_price, self.profit_percent_at(exit_price))
+            previous = price
+
+    def check_buy_conditions(self, i, last_close, last_ma, last_ma_10, last_bb_lower,
+                             prev_ma, prev_ma_10, prev_bb_lower):
+        state = self.state
+        # Перевірка, чи MA10 перетнув MA320 зверху вниз
+        if not state.holding_coins:
+            if prev_ma_10 > prev_ma and last_ma_10 < last_ma:
+                self.log("MA10 перетнув MA320 зверху вниз. Встановлення умовних ордерів.")
+                self.setup_conditional_orders(last_close)
+                # Не купувати на першому перетині
+                return
+
+        # Перевірка на початкову купівлю
+        if not state.initial_buy_done:
+            # Перевірка, чи MA10 перетнув BB нижню лінію зверху
+            if prev_ma_10 < prev_bb_lower and last_ma_10 > last_bb_lower:
+                self.log("MA10 перетнув BB нижню лінію зверху. Виконання початкової купівлі.")
+                self.execute_initial_buy_order(i, last_close)
+                state.initial_buy_done = True
+        else:
+            # Перевірка, чи ціна нижча за BB нижню лінію та досягла умовних ордерів
+            if last_close < last_bb_lower:
+                for price, _ in state.order_book.remember_reached(last_close):
+                    self.log(f"Ціна досягла умовного ордера на {price:.2f}. Запам'ятовування ордера.")
+            # Коли MA10 знову перетинає BB нижню лінію зверху
+            if prev_ma_10 < prev_bb_lower and last_ma_10 > last_bb_lower:
+                self.log("MA10 знову перетнув BB нижню лінію зверху. Виконання запам'ятованих ордерів.")
+                self.execute_remembered_orders(i, last_close)
+
+    def execute_initial_buy_order(self, i, last_close):
+        state = self.state
+        current_timestamp = self.index[i]
+        self.log(f"Виконання початкової купівлі на {current_timestamp} за ціною {last_close:.2f} USDT")
+
+        # Фільтрація ордерів, де ціна > поточної
+        filtered_orders = state.order_book.orders_above(last_close)
+
+        if not filtered_orders:
+            self.log("Немає умовних ордерів з ціною вище поточної для виконання.")
+            return
+
+        # Підрахунок загальної вартості фільтрованих ордерів за поточною ціною (з прослизанням і комісією)
+        execution = self.execution
+        fill_price = execution.buy_fill(last_close)
+        total_orders_cost = sum(execution.cost(quantity * fill_price) for _, quantity in filtered_orders)
+
+        # Розрахунок, який відсоток початкового балансу це становить
+        total_orders_percent = total_orders_cost / self.initial_balance
+
+        # Обробка випадку, коли purchase_balance_percent = 0%
+        if self.purchase_balance_percent == 0:
+            orders_to_buy = filtered_orders.copy()
+            cumulative_cost = total_orders_cost
+            cumulative_quantity = sum(quantity for _, quantity in orders_to_buy)
+            self.log(f"Відсоток балансу для покупки 0%. Виконано всі {len(orders_to_buy)} умовних ордерів.")
+        elif total_orders_percent >= self.purchase_balance_percent:
+            orders_to_buy = filtered_orders.copy()
+            cumulative_cost = total_orders_cost
+            cumulative_quantity = sum(quantity for _, quantity in orders_to_buy)
+            self.log(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT >= вказаному відсотку "
+                     f"балансу для покупки.")
+        else:
+            # Використання заданого відсотка балансу для покупки
+            purchase_balance = self.initial_balance * self.purchase_balance_percent
+            available = self.buying_power()
+            if available < purchase_balance:
+                purchase_balance = available  # Використати весь доступний баланс, якщо менше
+                self.log(f"Баланс ({available:.2f} USDT) менше заданого відсотка. Використано весь доступний баланс.")
+
+            orders_to_buy = []
+            cumulative_cost = 0.0
+            cumulative_quantity = 0.0
+
+            for order in filtered_orders:
+                order_quantity = order[1]
+                order_cost = execution.cost(order_quantity * fill_price)  # Використання поточної ціни
+                if cumulative_cost + order_cost <= purchase_balance or cumulative_cost == 0.0:
+                    orders_to_buy.append(order)
+                    cumulative_cost += order_cost
+                    cumulative_quantity += order_quantity
+                else:
+                    break
+            self.log(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT < заданому відсотку балансу "
+                     f"для покупки. Купівля до {self.purchase_balance_percent*100:.2f}% балансу.")
+
+        if not orders_to_buy:
+            self.log("Немає умовних ордерів, які можна виконати з доступним балансом.")
+            return
+
+        # Виконання покупки
+        try:
+            fill = self.submit_order('BUY', cumulative_quantity, fill_price)
+        except OrderRejected as e:
+            # Умовні ордери лишаються невиконаними, стан стратегії не змінюється
+            self.log(f"Біржа відхилила початкову купівлю: {e}")
+            return
+        avg_price = fill_price  # Купівля за поточною ціною
+        fee = execution.fee(cumulative_quantity * fill_price)
+        if fill is not None and (fill['quantity'], fill['price'], fill['fee']) != (cumulative_quantity, avg_price, fee):
+            # Фактичне виконання біржі: кількість після округлення до кроку лоту або часткова, ціна та комісія
+            cumulative_quantity, avg_price, fee = fill['quantity'], fill['price'], fill['fee']
+            cumulative_cost = cumulative_quantity * avg_price + fee
+        state.bought_quantity += cumulative_quantity
+        state.balance -= cumulative_cost
+        if self.capital is not None:
+            self.capital.debit(cumulative_cost)
+        state.total_cost += cumulative_cost
+
+        state.holding_coins = True
+
+        # Видалення виконаних ордерів з умовних
+        state.order_book.fill(orders_to_buy)
+
+        # Запис торгівлі
+        state.journal.append(Side.BUY, current_timestamp.value, avg_price, cumulative_quantity, len(orders_to_buy),
+                             fee=fee)
+
+        self.log(f"Виконано початкову купівлю на суму {cumulative_cost:.2f} USDT за ціною {avg_price:.2f} USDT.")
+
+    def execute_remembered_orders(self, i, crossing_price):
+        state = self.state
+        current_timestamp = self.index[i]
+        self.log(f"Виконання запам'ятованих ордерів на {current_timestamp} за ціною {crossing_price:.2f} USDT")
+
+        # Купівля запам'ятованих ордерів, де ціна > поточної ціни перетину
+        orders_to_buy = [order for order in state.order_book.remembered if order[0] > crossing_price]
+        if not orders_to_buy:
+            self.log("Немає запам'ятованих ордерів для виконання на цьому перетині.")
+            return
+
+        execution = self.execution
+        fill_price = execution.buy_fill(crossing_price)
+        for position, (_, order_quantity) in enumerate(orders_to_buy):
+            order_cost = execution.cost(order_quantity * fill_price)  # Купівля за поточною ціною
+
+            if self.buying_power() >= order_cost:
+                try:
+                    fill = self.submit_order('BUY', order_quantity, fill_price)
+                except OrderRejected as e:
+                    # Невиконані ордери лишаються запам'ятованими до наступного перетину
+                    self.log(f"Біржа відхилила запам'ятований ордер: {e}")
+                    orders_to_buy = orders_to_buy[:position]
+                    break
+                price, fee = fill_price, execution.fee(order_quantity * fill_price)
+                if fill is not None:
+                    order_quantity, price, fee = fill['quantity'], fill['price'], fill['fee']
+                    order_cost = order_quantity * price + fee
+                state.bought_quantity += order_quantity
+                state.balance -= order_cost
+                if self.capital is not None:
+                    self.capital.debit(order_cost)
+                state.total_cost += order_cost
+
+                # Запис торгівлі
+                state.journal.append(Side.BUY, current_timestamp.value, price, order_quantity, 1, fee=fee)
+                self.log(f"Виконано запам'ятований ордер на ціну {price:.2f} USDT, кількість {order_quantity:.6f}.")
+            else:
+                self.log("Недостатньо балансу для виконання запам'ятованого ордера.")
+                break  # Немає достатньо балансу для подальших ордерів
+
+        # Видалення виконаних ордерів з умовних та запам'ятованих
+        state.order_book.fill(orders_to_buy)
+        state.order_book.forget(orders_to_buy)
+
+    def setup_conditional_orders(self, crossing_price):
+        P0 = crossing_price
+        S = self.order_step_percentage / 100
+        M = self.martingale_factor
+        total_sum = 0
+        prices = [P0]
+        quantities = []
+
+        # Розрахунок цін ордерів
+        for n in range(1, self.number_of_orders + 1):
+            if n > 1:
+                Pn = prices[-1] - (S * P0)
+                prices.append(Pn)
+            exponent = (n - 1)
+            total_sum += prices[-1] * (1 + M) ** exponent
+
+        # Розрахунок кількості
+        Q1 = self.initial_balance / total_sum  # Використання початкового балансу для розрахунку кількості
+        quantities.append(Q1)
+        for n in range(1, self.number_of_orders):
+            Qn = quantities[-1] * (1 + M)
+            quantities.append(Qn)
+
+        # Зберігання умовних ордерів; запам'ятовані ордери попередньої сітки не скидаються
+        self.state.order_book.set_grid(prices, quantities)
+
+        self.log(f"Встановлено умовні ордери, починаючи з ціни {P0:.2f} USDT.")
+
+    def buying_power(self):
+        """Кошти, доступні для купівлі: власний баланс або залишок спільного пулу."""
+        return self.state.balance if self.capital is None else self.capital.available
+
+    def submit_order(self, side, quantity, price):
+        """Передати ордер адаптеру біржі до зміни стану; OrderRejected залишає стан незмінним.
+
+        Повертає виконання біржі (кількість, ціна, комісія), за яким рушій
+        оновлює стан; у бек-тесті - None, і стан рахується за моделлю виконання.
+        """
+        if self.exchange is not None:
+            return self.exchange.place_market_order(side, quantity, price)
+        return None
+
+    def profit_percent_at(self, price):
+        """Прибуток позиції у відсотках, якщо продати її за ціною `price` (з прослизанням і комісією)."""
+        state = self.state
+        execution = self.execution
+        # Те саме, що execution.proceeds(quantity * execution.sell_fill(price)), без викликів на кожному барі
+        notional = state.bought_quantity * (price * (1 - execution.slippage))
+        profit = (notional - notional * execution.fee_rate) - state.total_cost
+        return (profit / state.total_cost) * 100 if state.total_cost > 0 else 0
+
+    def take_profit_price(self, bb_upper):
+        """Найнижча ціна, за якої спрацьовує умова продажу check_sell_conditions; None - без позиції."""
+        state = self.state
+        if not (state.holding_coins and state.bought_quantity > 0 and state.total_cost > 0):
+            return None
+        execution = self.execution
+        unit = 1.0 * (1 - execution.slippage)  # Як proceeds(sell_fill(1.0)), у тому ж порядку, що й ядро
+        unit_value = (unit - unit * execution.fee_rate) * state.bought_quantity
+        net_target = state.total_cost * (1 + self.net_profit_target_percent / 100) / unit_value
+        target = state.total_cost * (1 + self.profit_target_percent / 100) / unit_value
+        return min(net_target, max(target, bb_upper))
+
+    def check_sell_conditions(self, i, last_close, last_bb_upper):
+        state = self.state
+        if state.holding_coins and state.bought_quantity > 0:
+            profit_percent = self.profit_percent_at(last_close)
+
+            if profit_percent >= self.net_profit_target_percent or \
+               (last_close > last_bb_upper and profit_percent >= self.profit_target_percent):
+                self.sell(i, last_close, profit_percent)
+
+    def sell(self, i, price, profit_percent):
+        """Продати всю позицію за ціною рішення `price` і підготувати наступний цикл."""
+        state = self.state
+        current_timestamp = self.index[i]
+        execution = self.execution
+        fill_price = execution.sell_fill(price)
+        quantity = state.bought_quantity
+        notional = quantity * fill_price
+        fee = execution.fee(notional)
+        # Виконання продажу
+        try:
+            fill = self.submit_order('SELL', quantity, fill_price)
+        except OrderRejected as e:
+            # Позиція лишається відкритою, умова продажу перевіряється знову на наступних барах
+            self.log(f"Біржа відхилила продаж: {e}")
+            return
+        cost = state.total_cost
+        if fill is not None:
+            quantity, fill_price, fee = fill['quantity'], fill['price'], fill['fee']
+            notional = quantity * fill_price
+            if quantity < state.bought_quantity:
+                cost = state.total_cost * (quantity / state.bought_quantity)  # Вартість проданої частини
+        trade_profit = notional - fee - cost
+        state.profit += trade_profit
+        self.log(f"Продано {quantity:.6f} одиниць за ціною {fill_price:.2f} USDT.")
+
+        # Запис торгівлі
+        state.journal.append(Side.SELL, current_timestamp.value, fill_price, quantity,
+                             profit_percent=profit_percent, fee=fee)
+        self.log(f"Прибуток від торгівлі: {trade_profit:.2f} USDT.")
+
+        if self.capital is not None:
+            self.capital.credit(cost)  # Вартість циклу повертається у пул, прибуток - ні
+        remaining = state.bought_quantity - quantity
+        state.bought_quantity = remaining
+        state.total_cost -= cost
+        if remaining > 0 and self.exchange.executable_quantity(remaining) > 0:
+            # Часткове виконання: позиція лишається відкритою, залишок продається на наступних барах
+            self.log(f"Продаж виконано частково, залишок {remaining:.6f} одиниць.")
+            return
+        if remaining > 0:
+            # Залишок менший за крок лоту біржі переходить у позицію наступного циклу
+            self.log(f"Залишок {remaining:.6f} одиниць менший за крок лоту, переноситься в наступний цикл.")
+        state.holding_coins = False
+        # Скидання для наступного циклу торгівлі
+        state.order_book.clear()  # Очищення умовних та запам'ятованих ордерів
+        state.initial_buy_done = False  # Скидання флагу початкової купівлі
+        # Скидання балансу до початкового, гарантування, що він не перевищує початковий
+        state.balance = self.initial_balance
+        self.log("Підготовка до наступної можливості купівлі.")
+
+    def trade_history_frame(self):
+        """Повернути історію торгівлі як DataFrame."""
+        return self.journal.to_frame()
+
+    def equity_curve(self):
+        """Побарова вартість портфеля: баланс + реалізований прибуток + позиція за ціною закриття."""
+        return mark_to_market(self.close, self.index, self.journal.arrays(), self.initial_balance)['equity']
+
+
+def max_drawdown(equity):
+    """Максимальна просадка кривої капіталу у відсотках."""
+    if len(equity) == 0:
+        return 0.0
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max((peaks - equity) / peaks) * 100)
@@ -0,0 +1,94 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest_engine import BacktestEngine  # noqa: E402
+from data_source import load_ohlcv  # noqa: E402
+from indicators import calculate_indicators  # noqa: E402
+from logging_setup import LOG_FORMAT, setup_logging  # noqa: E402
+
+
+class LegacyLoggingEngine(BacktestEngine):
+    """Рушій з побаровим логуванням як до рефакторингу: два f-рядки INFO на кожен бар."""
+
+    def on_bar(self, i, last_close, last_ma, last_ma_10, last_bb_lower, last_bb_upper,
+               prev_ma, prev_ma_10, prev_bb_lower):
+        current_timestamp = self.index[i]
+        logging.info(f"Умови купівлі - Час: {current_timestamp}, Ціна: {last_close}, MA10: {last_ma_10}, MA: {last_ma}, BB Lower: {last_bb_lower}")
+        logging.info(f"Умови продажу - Час: {current_timestamp}, Ціна: {last_close}, BB Upper: {last_bb_upper}")
+        super().on_bar(i, last_close, last_ma, last_ma_10, last_bb_lower, last_bb_upper,
+                       prev_ma, prev_ma_10, prev_bb_lower)
+
+
+def _reset_root_logger():
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+
+def _silent(message):
+    pass
+
+
+def run_scenario(name, data, log_path, repeat):
+    """Прогнати бек-тест `repeat` разів і повернути (час рушія, час з дочитуванням черги) у секундах."""
+    best_engine, best_total = float('inf'), float('inf')
+    for _ in range(repeat):
+        _reset_root_logger()
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        listener = None
+        engine_class, log = BacktestEngine, logging.info
+
+        if name == 'disabled':
+            logging.getLogger().setLevel(logging.WARNING)
+            log = _silent
+        elif name == 'legacy_per_bar':
+            handler = logging.FileHandler(log_path, mode='w', encoding='utf-8')
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            logging.getLogger().addHandler(handler)
+            logging.getLogger().setLevel(logging.INFO)
+            engine_class = LegacyLoggingEngine
+        else:
+            level = logging.DEBUG if name == 'queued_debug' else logging.INFO
+            listener = setup_logging(level=level, log_file=log_path, console=False)
+
+        started = time.perf_counter()
+        engine_class(data, log=log).run()
+        engine_time = time.perf_counter() - started
+        if listener is not None:
+            listener.stop()
+        total_time = time.perf_counter() - started
+
+        best_engine = min(best_engine, engine_time)
+        best_total = min(best_total, total_time)
+    _reset_root_logger()
+    return best_engine, best_total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Накладні витрати логування у бек-тесті')
+    parser.add_argument('--csv', default='btc_binance_15m_main.csv', help='CSV з даними OHLCV')
+    parser.add_argument('--repeat', type=int, default=3, help='Кількість повторів (береться найкращий час)')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    data = calculate_indicators(load_ohlcv(args.csv)[['close']].copy(), 320, 10, 320)
+    logging.disable(logging.NOTSET)
+
+    scenarios = ['disabled', 'queued_info', 'queued_debug', 'legacy_per_bar']
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {name: run_scenario(name, data, os.path.join(tmp, f"{name}.log"), args.repeat) for name in scenarios}
+        sizes = {name: os.path.getsize(os.path.join(tmp, f"{name}.log")) if name != 'disabled' else 0 for name in scenarios}
+
+    baseline = results['disabled'][0]
+    print(f"{len(data)} барів, найкращий з {args.repeat} запусків")
+    print(f"{'сценарій':<16}{'рушій, мс':>12}{'з чергою, мс':>15}{'x до disabled':>15}{'лог, КБ':>10}")
+    for name, (engine_time, total_time) in results.items():
+        print(f"{name:<16}{engine_time * 1000:>12.1f}{total_time * 1000:>15.1f}{engine_time / baseline:>15.2f}{sizes[name] / 1024:>10.0f}")
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_source import load_ohlcv  # noqa: E402
+from portfolio import BarFeed, Portfolio  # noqa: E402
+
+
+def synthetic_columns(base, count, seed=1):
+    """`count` синтетичних пар з ряду `base`: масштаб і незалежний множинний шум для кожної."""
+    rng = np.random.default_rng(seed)
+    timestamps = base.index.as_unit('ms').asi8
+    close = base['close'].to_numpy()
+    columns_by_symbol = {}
+    for position in range(count):
+        noise = np.exp(np.cumsum(rng.normal(0.0, 0.002, len(close))))
+        columns_by_symbol[f"SYM{position:03d}USDT"] = {
+            'timestamp': timestamps,
+            'close': close * noise * rng.uniform(0.01, 10.0),
+        }
+    return columns_by_symbol
+
+
+def run_portfolio(columns_by_symbol, capital_mode):
+    portfolio = Portfolio(list(columns_by_symbol), {'balance': 5000.0 * len(columns_by_symbol)},
+                          capital_mode=capital_mode, log=lambda message: None)
+    asyncio.run(portfolio.run(BarFeed(columns_by_symbol)))
+    return portfolio
+
+
+def measure(columns_by_symbol, capital_mode):
+    """Прогнати портфель і повернути (секунди CPU, байти пам'яті портфеля, кількість барів)."""
+    started = time.process_time()
+    portfolio = run_portfolio(columns_by_symbol, capital_mode)
+    cpu = time.process_time() - started
+
+    # Пам'ять - окремим прогоном: tracemalloc у рази сповільнює виконання
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    traced = run_portfolio(columns_by_symbol, capital_mode)
+    memory = tracemalloc.get_traced_memory()[0] - baseline  # Лише те, що лишилось за портфелем (і джерелом)
+    tracemalloc.stop()
+    del traced
+    return cpu, memory, portfolio.bars
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пам'ять і CPU портфеля на кожну додаткову пару")
+    parser.add_argument('--csv', default='btc_binance_15m_main.csv', help='CSV, з якого будуються синтетичні пари')
+    parser.add_argument('--bars', type=int, default=10000, help='Кількість барів на пару')
+    parser.add_argument('--symbols', default='1,10,50', help='Розміри портфеля через кому')
+    parser.add_argument('--capital', choices=('partitioned', 'shared'), default='shared', help='Розподіл капіталу')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    base = load_ohlcv(args.csv).iloc[:args.bars]
+    sizes = [int(value) for value in args.symbols.split(',')]
+
+    results = {count: measure(synthetic_columns(base, count), args.capital) for count in sizes}
+    print(f"{len(base)} барів на пару, капітал: {args.capital}")
+    print(f"{'пар':>6}{'CPU, с':>10}{'мкс/бар пари':>15}{'пам., КБ':>11}{'КБ/пару':>10}")
+    for count, (cpu, memory, bars) in results.items():
+        print(f"{count:>6}{cpu:>10.2f}{cpu / bars * 1e6:>15.2f}{memory / 1024:>11.0f}{memory / 1024 / count:>10.1f}")
+
+    # Приріст на кожну додаткову пару між найменшим і найбільшим портфелем
+    first, last = min(sizes), max(sizes)
+    if last > first:
+        cpu_delta = (results[last][0] - results[first][0]) / (last - first)
+        memory_delta = (results[last][1] - results[first][1]) / (last - first)
+        print(f"Кожна додаткова пара: +{cpu_delta * 1000:.1f} мс CPU на {len(base)} барів, +{memory_delta / 1024:.1f} КБ")
@@ -0,0 +1,283 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backtest_engine import BacktestEngine  # noqa: E402
+from data_source import load_ohlcv, parse_ohlcv_csv  # noqa: E402
+from execution import ExecutionModel  # noqa: E402
+from indicators import calculate_indicators  # noqa: E402
+from kline_downloader import RequestWeightLimiter, download_klines  # noqa: E402
+from kline_store import klines_to_columns  # noqa: E402
+from live_replay import ReplayClient  # noqa: E402
+from monte_carlo import block_starts, bootstrap_paths  # noqa: E402
+from order_book import GridOrderBook  # noqa: E402
+from resample import resample_columns  # noqa: E402
+
+
+# Набори даних, що постачаються з репозиторієм
+DATASETS = {
+    'btc': os.path.join(ROOT, 'btc_binance_15m_main.csv'),
+    'xmr': os.path.join(ROOT, 'XMRUSDT_binance_15m_23-25.csv'),
+}
+# Еталонні результати зберігаються в репозиторії, тож пороги діють одразу після checkout. Барів/с залежить від
+# машини: на іншому залізі спершу оновіть еталон на коміті без змін (python benchmarks/bench_suite.py
+# --save-baseline) і порівнюйте вже з ним
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_THRESHOLDS = os.path.join(ROOT, 'benchmarks', 'thresholds.json')
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'results', 'latest.json')
+WINDOWS = (320, 10, 320)
+
+# Реєстр: назва -> функція підготовки, що повертає (виклик без аргументів, кількість оброблених барів)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _silent(message):
+    pass
+
+
+def _close_frame(dataset):
+    return load_ohlcv(DATASETS[dataset])[['close']].copy()
+
+
+def _indicator_frame(dataset):
+    return calculate_indicators(_close_frame(dataset), *WINDOWS)
+
+
+for _dataset in DATASETS:
+    @benchmark(f'indicators.{_dataset}')
+    def _indicators(dataset=_dataset):
+        data = _close_frame(dataset)
+        return (lambda: calculate_indicators(data, *WINDOWS)), len(data)
+
+    @benchmark(f'backtest.{_dataset}')
+    def _backtest(dataset=_dataset):
+        data = _indicator_frame(dataset)
+        return (lambda: BacktestEngine(data, log=_silent).run()), len(data)
+
+    @benchmark(f'backtest_kernel.{_dataset}')
+    def _backtest_kernel(dataset=_dataset):
+        data = _indicator_frame(dataset)
+        return (lambda: BacktestEngine(data, log=_silent, kernel=True).run()), len(data)
+
+    @benchmark(f'backtest_intrabar.{_dataset}')
+    def _backtest_intrabar(dataset=_dataset):
+        data = calculate_indicators(load_ohlcv(DATASETS[dataset])[['open', 'high', 'low', 'close']].copy(), *WINDOWS)
+        execution = ExecutionModel(intrabar=True, fee_rate=0.001, slippage=0.0005)
+        return (lambda: BacktestEngine(data, log=_silent, execution=execution).run()), len(data)
+
+    @benchmark(f'csv_parse.{_dataset}')
+    def _csv_parse(dataset=_dataset):
+        path = DATASETS[dataset]
+        return (lambda: parse_ohlcv_csv(path)), len(parse_ohlcv_csv(path)['timestamp'])
+
+    @benchmark(f'csv_load_cached.{_dataset}')
+    def _csv_load_cached(dataset=_dataset):
+        path = DATASETS[dataset]
+        return (lambda: load_ohlcv(path)), len(load_ohlcv(path))
+
+
+@benchmark('order_grid.btc')
+def _order_grid():
+    """Операції сітки в ритмі рушія: нова сітка від ціни, пошук досягнутих рівнів, виконання, скидання."""
+    close = _close_frame('btc')['close'].tolist()
+    levels = np.arange(20)
+
+    def run():
+        book = GridOrderBook()
+        for position, price in enumerate(close):
+            if not book.prices:
+                book.set_grid((price * (1 - 0.012 * levels)).tolist(), (0.001 * 1.1 ** levels).tolist())
+            reached = book.remember_reached(price)
+            if reached:
+                book.fill(reached)
+                book.forget(reached[:1])
+            book.orders_above(price)
+            if position % 500 == 499:
+                book.clear()
+        return book
+
+    return run, len(close)
+
+
+@benchmark('resample_1h.btc')
+def _resample():
+    """Агрегація 15m -> 1h без кешу (ціна --timeframe 1h при першому запуску)."""
+    columns = parse_ohlcv_csv(DATASETS['btc'])
+    return (lambda: resample_columns(columns, '1h')), len(columns['timestamp'])
+
+
+@benchmark('bootstrap_paths.btc')
+def _bootstrap_paths():
+    """Пакет із 16 шляхів блочного бутстрепу довжини набору даних (барів - сумарно по шляхах)."""
+    close = _close_frame('btc')['close'].to_numpy()
+    returns = np.diff(np.log(close))
+    starts = block_starts([len(returns)], 96)
+    rng = np.random.default_rng(0)
+    return (lambda: bootstrap_paths(returns, starts, 16, len(close), 96, close[0], rng)), 16 * len(close)
+
+
+@benchmark('kline_paging.btc')
+def _kline_paging():
+    """download_klines з заглушкою Client: планування сторінок, потоки, складання та колонки."""
+    columns = parse_ohlcv_csv(DATASETS['btc'])
+    client = ReplayClient(columns)
+    start_ts, end_ts = int(columns['timestamp'][0]), int(columns['timestamp'][-1])
+
+    def run():
+        limiter = RequestWeightLimiter(max_weight=10 ** 9)  # Без очікування: міряється лише клієнтська частина
+        return klines_to_columns(download_klines(client, 'BTCUSDT', '15m', start_ts=start_ts, end_ts=end_ts,
+                                                 limiter=limiter))
+
+    return run, len(columns['timestamp'])
+
+
+def measure(name, repeat):
+    """Прогнати бенчмарк: найкращий і медіанний час з `repeat` запусків та пікова пам'ять окремим запуском."""
+    run, bars = BENCHMARKS[name]()
+    run()  # Прогрів: кеші файлової системи, імпорти, JIT-кеші бібліотек
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    # tracemalloc сповільнює виконання, тож пам'ять міряється окремим запуском
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = run()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    del result
+
+    best = min(timings)
+    return {
+        'bars': bars,
+        'best_s': best,
+        'median_s': statistics.median(timings),
+        'bars_per_s': bars / best if best else float('inf'),
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+    }
+
+
+def read_thresholds(path):
+    """Пороги регресій з JSON у репозиторії: загальні max_slowdown/max_memory_growth і окремі для бенчмарків."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(results, baseline, thresholds, max_slowdown, max_memory_growth):
+    """Список регресій відносно базових результатів; пороги thresholds['benchmarks'][name] мають пріоритет."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get('benchmarks', {}).get(name)
+        if reference is None:
+            continue
+        limits = thresholds.get('benchmarks', {}).get(name, {})
+        slowdown = limits.get('max_slowdown', max_slowdown)
+        memory_growth = limits.get('max_memory_growth', max_memory_growth)
+        if current['bars_per_s'] < reference['bars_per_s'] * (1 - slowdown):
+            regressions.append(f"{name}: {current['bars_per_s']:,.0f} барів/с проти {reference['bars_per_s']:,.0f} "
+                               f"(допустимо -{slowdown:.0%})")
+        if current['peak_memory_kb'] > reference['peak_memory_kb'] * (1 + memory_growth) + 64:
+            regressions.append(f"{name}: пік пам'яті {current['peak_memory_kb']:,.0f} КБ проти "
+                               f"{reference['peak_memory_kb']:,.0f} КБ (допустимо +{memory_growth:.0%})")
+    return regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Набір бенчмарків гарячих шляхів з порівнянням з базовими результатами')
+    parser.add_argument('--filter', default='', help='Запускати лише бенчмарки, назва яких містить цей рядок')
+    parser.add_argument('--repeat', type=int, default=5, help='Кількість запусків кожного бенчмарку')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON з результатами цього запуску')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON з базовими результатами')
+    parser.add_argument('--save-baseline', action='store_true', help='Записати результати як нові базові')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help='JSON з порогами регресій')
+    parser.add_argument('--max-slowdown', type=float, default=None,
+                        help='Допустиме падіння барів/с (частка; за замовчуванням - з --thresholds або 0.15)')
+    parser.add_argument('--max-memory-growth', type=float, default=None,
+                        help='Допустиме зростання піку пам\'яті (частка; за замовчуванням - з --thresholds або 0.25)')
+    parser.add_argument('--list', action='store_true', help='Показати назви бенчмарків і вийти')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        sys.exit(0)
+
+    logging.disable(logging.CRITICAL)
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = {}
+    print(f"{'бенчмарк':<26}{'барів':>9}{'найкращий, мс':>15}{'медіана, мс':>13}{'барів/с':>13}{'пік, КБ':>10}")
+    for name in names:
+        result = results[name] = measure(name, args.repeat)
+        print(f"{name:<26}{result['bars']:>9}{result['best_s'] * 1000:>15.2f}{result['median_s'] * 1000:>13.2f}"
+              f"{result['bars_per_s']:>13,.0f}{result['peak_memory_kb']:>10,.0f}")
+
+    payload = {'environment': environment(), 'repeat': args.repeat, 'benchmarks': results}
+    write_json(args.output, payload)
+    print(f"Результати збережено у {args.output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"Базові результати оновлено: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment', {}).get('machine') != payload['environment']['machine']:
+            print(f"Увага: базові результати зняті на іншій машині ({baseline.get('environment', {}).get('machine')}) - "
+                  f"за потреби оновіть їх з --save-baseline.")
+        thresholds = read_thresholds(args.thresholds)
+        max_slowdown = args.max_slowdown if args.max_slowdown is not None else thresholds.get('max_slowdown', 0.15)
+        max_memory_growth = (args.max_memory_growth if args.max_memory_growth is not None
+                             else thresholds.get('max_memory_growth', 0.25))
+        regressions = compare(results, baseline, thresholds, max_slowdown, max_memory_growth)
+        if regressions:
+            print("Регресії відносно базових результатів:")
+            print('\n'.join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print("Регресій відносно базових результатів немає.")
+    else:
+        print(f"Базових результатів ({args.baseline}) немає - запустіть з --save-baseline.")
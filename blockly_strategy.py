@@ -0,0 +1,615 @@
+import argparse
+import json
+import logging
+import math
+import xml.etree.ElementTree as ET
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+
+# Простір імен XML робочої області Blockly
+BLOCKLY_NS = '{https://developers.google.com/blockly/xml}'
+
+# Blockly.WorkspaceSvg.getTopBlocks(true): сортування за y + sin(3°)·x
+TOP_BLOCK_X_WEIGHT = math.sin(math.radians(3))
+
+# Оператори logic_compare у Blockly
+COMPARE_OPERATORS = {'EQ': '==', 'NEQ': '!=', 'LT': '<', 'LTE': '<=', 'GT': '>', 'GTE': '>='}
+
+# Блоки індикаторів: тип -> (назва масиву, поля параметрів)
+INDICATOR_BLOCKS = {
+    'sma_indicator': ('sma', ('COL', 'PER')),
+    'macd_indicator': ('macd', ('COL', 'FAST', 'SLOW')),
+    'bb_upper_indicator': ('bb_upper', ('COL', 'PER', 'MULT')),
+    'bb_middle_indicator': ('bb_middle', ('COL', 'PER', 'MULT')),
+    'bb_lower_indicator': ('bb_lower', ('COL', 'PER', 'MULT')),
+    'supertrend_up_indicator': ('supertrend_up', ('PER', 'FACTOR')),
+}
+
+
+class UnsupportedBlockError(ValueError):
+    """Стратегія містить блок, який компілятор не підтримує."""
+
+
+class Block:
+    """Вузол AST: блок Blockly з полями, входами-значеннями, вкладеними інструкціями та наступним блоком."""
+
+    __slots__ = ('type', 'fields', 'values', 'statements', 'next', 'disabled', 'x', 'y')
+
+    def __init__(self, element):
+        self.type = element.get('type')
+        self.disabled = element.get('disabled') == 'true'
+        self.x = float(element.get('x', 0))
+        self.y = float(element.get('y', 0))
+        self.fields = {}
+        self.values = {}
+        self.statements = {}
+        self.next = None
+        for child in element:
+            tag = child.tag.replace(BLOCKLY_NS, '')
+            if tag == 'field':
+                self.fields[child.get('name')] = child.text or ''
+                continue
+            inner = _child_block(child)
+            if inner is None:
+                continue
+            if tag == 'value':
+                self.values[child.get('name')] = Block(inner)
+            elif tag == 'statement':
+                self.statements[child.get('name')] = Block(inner)
+            elif tag == 'next':
+                self.next = Block(inner)
+
+
+def _child_block(element):
+    # Блок має пріоритет над тінню (shadow), як у Blockly
+    for tag in ('block', 'shadow'):
+        found = element.find(BLOCKLY_NS + tag)
+        if found is None:
+            found = element.find(tag)
+        if found is not None:
+            return found
+    return None
+
+
+def parse_workspace(xml_text):
+    """Розібрати XML робочої області у список верхніх блоків у порядку генерації коду Blockly."""
+    root = ET.fromstring(xml_text)
+    blocks = [Block(element) for element in root if element.tag.replace(BLOCKLY_NS, '') == 'block']
+    return sorted(blocks, key=lambda block: block.y + TOP_BLOCK_X_WEIGHT * block.x)
+
+
+def load_strategy_text(path, name=None):
+    """Прочитати XML стратегії з файлу.
+
+    Підтримуються сирий XML, JSON-рядок з XML та JSON-об'єкт {назва: XML},
+    як у localStorage конструктора (без `name` береться перша стратегія).
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    if text.startswith('<'):
+        return text[:text.index('</xml>') + len('</xml>')] if '</xml>' in text else text
+
+    value, _ = json.JSONDecoder().raw_decode(text)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict) and value:
+        if name is None:
+            return next(iter(value.values()))
+        if name not in value:
+            raise KeyError(f"Стратегію '{name}' не знайдено. Доступні: {', '.join(value)}")
+        return value[name]
+    raise ValueError(f"Файл '{path}' не містить XML стратегії.")
+
+
+# ---------- Індикатори: повні масиви з тими самими формулами, що й у js/main.js ----------
+
+def _prefix_sums(values):
+    # Послідовне накопичення, як у циклі prefixSums у JS (np.cumsum не використовує попарне додавання)
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    squares = np.concatenate(([0.0], np.cumsum(values * values)))
+    return sums, squares
+
+
+def _window_difference(prefix, period):
+    """prefix[idx+1] - prefix[idx+1-period] для idx >= period-1, інакше NaN."""
+    n = len(prefix) - 1
+    result = np.full(n, np.nan)
+    if period >= 1 and period == int(period) and int(period) <= n:
+        period = int(period)
+        result[period - 1:] = prefix[period:] - prefix[:n - period + 1]
+    return result
+
+
+def _sma(values, period):
+    n = len(values)
+    sums, _ = _prefix_sums(values)
+    result = _window_difference(sums, period) / period
+    result[:max(0, min(n, math.ceil(period - 1)))] = 0.0  # computeSMA: 0, поки idx < p-1
+    return result
+
+
+def _bollinger(values, period, multiplier):
+    n = len(values)
+    sums, squares = _prefix_sums(values)
+    middle = _window_difference(sums, period) / period
+    variance = np.maximum(_window_difference(squares, period) / period - middle * middle, 0.0)
+    deviation = np.sqrt(variance)
+    warmup = max(0, min(n, math.ceil(period - 1)))
+    middle[:warmup] = 0.0
+    deviation[:warmup] = 0.0
+    return middle + multiplier * deviation, middle, middle - multiplier * deviation
+
+
+def _supertrend_up(high, low, close, period, factor):
+    n = len(close)
+    true_range = high - low
+    if n > 1:
+        previous = close[:-1]
+        true_range[1:] = np.maximum(np.maximum(high[1:] - low[1:], np.abs(high[1:] - previous)),
+                                    np.abs(low[1:] - previous))
+    prefix = np.concatenate(([0.0], np.cumsum(true_range)))
+    atr = np.zeros(n)
+    if period == int(period) and 0 <= int(period) < n:
+        start = int(period)
+        atr[start:] = (prefix[start + 1:] - prefix[1:n - start + 1]) / period  # computeATR: 0, поки i < p
+    hl2 = (high + low) / 2
+    upper = (hl2 + factor * atr).tolist()
+    lower = (hl2 - factor * atr).tolist()
+
+    # Напрям залежить від попереднього значення лінії - послідовний прохід, як buildSupertrend
+    close = close.tolist()
+    direction = [True] * n
+    line = lower[0] if n else 0.0
+    for i in range(1, n):
+        if close[i] > line:
+            direction[i] = True
+        elif close[i] < line:
+            direction[i] = False
+        else:
+            direction[i] = direction[i - 1]
+        line = lower[i] if direction[i] else upper[i]
+    return direction
+
+
+def compute_indicator(columns, key):
+    """Повний масив індикатора за ключем плану, наприклад ('sma', 'Close', 39.0)."""
+    kind = key[0]
+    if kind == 'supertrend_up':
+        _, period, factor = key
+        return _supertrend_up(columns('High'), columns('Low'), columns('Close'), period, factor)
+    values = columns(key[1])
+    if kind == 'sma':
+        return _sma(values, key[2]).tolist()
+    if kind == 'macd':
+        return (_sma(values, key[2]) - _sma(values, key[3])).tolist()
+    upper, middle, lower = _bollinger(values, key[2], key[3])
+    return {'bb_upper': upper, 'bb_middle': middle, 'bb_lower': lower}[kind].tolist()
+
+
+# ---------- Форматування чисел як у JS ----------
+
+def js_to_fixed(value, digits):
+    """Number.prototype.toFixed: округлення точного двійкового значення, половина - від нуля."""
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    rounded = Decimal(value).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP)
+    text = f"{rounded:.{digits}f}"
+    return text[1:] if text.startswith('-') and rounded == 0 else text
+
+
+def js_string(value):
+    """String(value) для чисел і булевих значень у JS."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    if value == 0:
+        return '0'
+    # Найкоротші цифри (repr) у записі Number::toString
+    sign, digits, exponent = Decimal(repr(abs(value))).normalize().as_tuple()
+    digits = ''.join(map(str, digits))
+    point = len(digits) + exponent  # Позиція десяткової коми відносно першої цифри
+    prefix = '-' if value < 0 else ''
+    if len(digits) <= point <= 21:
+        return prefix + digits + '0' * (point - len(digits))
+    if 0 < point <= 21:
+        return prefix + digits[:point] + '.' + digits[point:]
+    if -6 < point <= 0:
+        return prefix + '0.' + '0' * -point + digits
+    mantissa = digits[0] + ('.' + digits[1:] if len(digits) > 1 else '')
+    return f"{prefix}{mantissa}e{'+' if point - 1 >= 0 else '-'}{abs(point - 1)}"
+
+
+# ---------- Симуляція: семантика buy/sell/placeGridOrders/processGrid/processTakeProfit ----------
+
+class GridSimulator:
+    """Стан симуляції конструктора стратегій (кеш, монети, сітка, тейк-профіт) і журнал дій."""
+
+    __slots__ = ('initial_balance', 'balance', 'coin', 'total_profit', 'purchases_qty', 'purchases_sum',
+                 'grid_prices', 'grid_quantities', 'grid_filled', 'grid_high', 'grid_locked',
+                 'take_profit_pct', 'logs', 'trades')
+
+    def __init__(self, initial_balance):
+        self.initial_balance = float(initial_balance)
+        self.balance = self.initial_balance
+        self.coin = 0.0
+        self.total_profit = 0.0
+        self.purchases_qty = 0.0
+        self.purchases_sum = 0.0
+        self.grid_prices = []
+        self.grid_quantities = []
+        self.grid_filled = []
+        self.grid_high = -math.inf  # Найвища ціна невиконаного ордера: вище неї processGrid нічого не робить
+        self.grid_locked = False
+        self.take_profit_pct = None
+        self.logs = []
+        self.trades = []
+
+    def balance_is_initial(self):
+        return abs(self.balance - self.initial_balance) < 1e-8
+
+    def buy(self, pct, price, time):
+        spent = self.balance * (pct / 100)
+        if spent <= 0 or spent > self.balance:
+            return
+        quantity = spent / price
+        self.balance -= spent
+        self.coin += quantity
+        self.purchases_qty += quantity
+        self.purchases_sum += quantity * price
+        self.logs.append(f"{time} BUY  {js_to_fixed(pct, 2)}% → -{js_to_fixed(spent, 2)} USDT, +{js_to_fixed(quantity, 4)} coin")
+        self.trades.append((time, 'BUY', price, quantity))
+        self.grid_locked = True
+
+    def buy_quantity(self, quantity, price, time):
+        spent = quantity * price
+        if spent <= 0 or spent > self.balance:
+            return
+        self.balance -= spent
+        self.coin += quantity
+        self.purchases_qty += quantity
+        self.purchases_sum += quantity * price
+        self.logs.append(f"{time} BUY  {js_to_fixed(quantity, 4)} coin @ {js_to_fixed(price, 2)} → -{js_to_fixed(spent, 2)} USDT")
+        self.trades.append((time, 'BUY', price, quantity))
+        self.grid_locked = True
+
+    def sell(self, pct, price, time):
+        quantity = self.coin * (pct / 100)
+        if quantity <= 0 or quantity > self.coin:
+            return
+        gained = quantity * price
+        self.coin -= quantity
+        self.balance += gained
+        self.purchases_qty -= quantity
+        self.purchases_sum -= quantity * price  # Як у JS: за ціною продажу, а не середньою ціною купівлі
+        self.logs.append(f"{time} SELL {js_to_fixed(pct, 2)}% → +{js_to_fixed(gained, 2)} USDT, -{js_to_fixed(quantity, 4)} coin")
+        self.trades.append((time, 'SELL', price, quantity))
+        if self.coin < 1e-8:
+            if self.balance > self.initial_balance:
+                profit = self.balance - self.initial_balance
+                self.total_profit += profit
+                self.balance = self.initial_balance
+                self.logs.append(f"→ PROFIT realised: +{js_to_fixed(profit, 2)} USDT (total {js_to_fixed(self.total_profit, 2)} USDT)")
+            self._reset_cycle()
+            self.purchases_qty = 0.0
+            self.purchases_sum = 0.0
+
+    def _reset_cycle(self):
+        self.grid_locked = False
+        self.grid_prices = []
+        self.grid_quantities = []
+        self.grid_filled = []
+        self.grid_high = -math.inf
+        self.take_profit_pct = None
+
+    def close_position(self, price, time):
+        if self.coin > 0:
+            self.sell(100, price, time)
+        self._reset_cycle()
+
+    def place_grid_orders(self, count, factor, step, price):
+        if self.grid_locked:
+            return
+        step = step / 100
+        growth = 1 + factor
+        count = math.ceil(count) if count > 0 else 0  # for (n=0; n<c; n++) з дробовим c
+        prices = [price * (1 - n * step) for n in range(count)]
+        total = 0.0
+        for n in range(count):
+            total += prices[n] * growth ** n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first_quantity = float(np.float64(self.initial_balance) / total)  # Ділення на 0 дає Infinity/NaN, як у JS
+        self.grid_prices = prices
+        self.grid_quantities = [first_quantity * growth ** n for n in range(count)]
+        self.grid_filled = [False] * count
+        self.grid_high = max((value for value in prices if value == value), default=-math.inf)
+
+    def process_grid(self, price, time):
+        # Ордери виконуються за своєю ціною у порядку сітки, навіть якщо на покупку бракує балансу
+        prices, quantities, filled = self.grid_prices, self.grid_quantities, self.grid_filled
+        for n in range(len(prices)):
+            if not filled[n] and price <= prices[n]:
+                self.buy_quantity(quantities[n], prices[n], time)
+                filled[n] = True
+        self.grid_high = max((value for value, done in zip(prices, filled) if not done and value == value),
+                             default=-math.inf)
+
+    def process_take_profit(self, price, time):
+        average = self.purchases_sum / self.purchases_qty if self.purchases_qty else 0
+        if price >= average * (1 + self.take_profit_pct / 100):
+            self.sell(100, price, time)
+
+    def log(self, value):
+        self.logs.append(js_string(value))
+
+    def summary(self, last_close):
+        return (
+            "=== RESULT ===\n"
+            f"Cash:  {js_to_fixed(self.balance, 2)}\n"
+            f"Coin:  {js_to_fixed(self.coin, 4)}\n"
+            f"Net:   {js_to_fixed(self.balance + self.coin * (last_close or 0), 2)}\n"
+            f"Total profit: {js_to_fixed(self.total_profit, 2)}"
+        )
+
+
+def _truthy(value):
+    # Істинність у JS: NaN та 0 хибні (у Python NaN істинний)
+    return value == value and value != 0
+
+
+def _repeat_count(value):
+    # for (count = 0; count < value; count++)
+    value = float(value)
+    return math.ceil(value) if value > 0 and math.isfinite(value) else 0
+
+
+# ---------- Компілятор XML -> Python ----------
+
+class StrategyCompiler:
+    """Перетворює AST робочої області на одну функцію Python, що проходить усі рядки.
+
+    Код блоків генерується один раз; індикатори замінюються зверненням до
+    заздалегідь обчислених масивів, глобальні значення - локальними змінними.
+    """
+
+    def __init__(self):
+        self.indicators = {}   # ключ індикатора -> ім'я масиву
+        self.columns = {}      # колонка CSV -> ім'я масиву
+        self.globals = {}      # ключ globals_values -> ім'я змінної
+        self._temporaries = 0
+
+    def _column(self, name):
+        if name not in self.columns:
+            self.columns[name] = f"col_{len(self.columns)}"
+        return self.columns[name]
+
+    def _global(self, key):
+        if key not in self.globals:
+            self.globals[key] = f"g_{len(self.globals)}"
+        return self.globals[key]
+
+    def _indicator(self, key):
+        if key not in self.indicators:
+            self.indicators[key] = f"ind_{len(self.indicators)}"
+        return self.indicators[key]
+
+    @staticmethod
+    def _number(block, name):
+        return float(block.fields.get(name, 0) or 0)
+
+    def expression(self, block, default):
+        """Код виразу та його тип ('bool' або 'num'); `default` - код для порожнього входу."""
+        if block is None:
+            return default
+        kind = block.type
+        if kind == 'math_number':
+            return repr(float(block.fields.get('NUM', 0))), 'num'
+        if kind == 'column_value':
+            return f"{self._column(block.fields.get('COL', ''))}[i]", 'num'
+        if kind == 'balance_initial':
+            return "(abs(sim.balance - initial_balance) < 1e-8)", 'bool'
+        if kind == 'globals_values_get':
+            return self._global(block.fields.get('KEY', '')), 'num'
+        if kind == 'globals_values_create':
+            return 'nan', 'num'  # Значення виразу - undefined; побічний ефект генерує statement()
+        if kind in INDICATOR_BLOCKS:
+            name, parameters = INDICATOR_BLOCKS[kind]
+            key = (name, *(block.fields.get(field, '') if field == 'COL' else self._number(block, field)
+                           for field in parameters))
+            return f"{self._indicator(key)}[i]", 'bool' if name == 'supertrend_up' else 'num'
+        if kind == 'logic_boolean':
+            return ('True' if block.fields.get('BOOL') == 'TRUE' else 'False'), 'bool'
+        if kind == 'logic_negate':
+            code, value_kind = self.expression(block.values.get('BOOL'), ('True', 'bool'))
+            return (f"(not {code})" if value_kind == 'bool' else f"(not _truthy({code}))"), 'bool'
+        if kind == 'logic_compare':
+            operator = COMPARE_OPERATORS[block.fields.get('OP', 'EQ')]
+            left, _ = self.expression(block.values.get('A'), ('0.0', 'num'))
+            right, _ = self.expression(block.values.get('B'), ('0.0', 'num'))
+            return f"({left} {operator} {right})", 'bool'
+        if kind == 'logic_operation':
+            return self._logic_operation(block)
+        raise UnsupportedBlockError(f"Блок-значення '{kind}' не підтримується.")
+
+    def _logic_operation(self, block):
+        is_and = block.fields.get('OP', 'AND') == 'AND'
+        left_block, right_block = block.values.get('A'), block.values.get('B')
+        # Значення за замовчуванням як у генераторі Blockly для && та ||
+        if left_block is None and right_block is None:
+            fallback = ('False', 'bool')
+        else:
+            fallback = ('True', 'bool') if is_and else ('False', 'bool')
+        left, left_kind = self.expression(left_block, fallback)
+        right, right_kind = self.expression(right_block, fallback)
+        if left_kind == right_kind == 'bool':
+            return f"({left} {'and' if is_and else 'or'} {right})", 'bool'
+        # && та || у JS повертають операнд, а не булеве значення
+        temporary = f"_t{self._temporaries}"
+        self._temporaries += 1
+        if is_and:
+            return f"({right} if _truthy({temporary} := {left}) else {temporary})", 'num'
+        return f"({temporary} if _truthy({temporary} := {left}) else {right})", 'num'
+
+    def condition(self, block):
+        code, kind = self.expression(block, ('False', 'bool'))
+        return code if kind == 'bool' else f"_truthy({code})"
+
+    def statement(self, block, indent):
+        """Рядки коду для ланцюжка інструкцій, що починається з `block`."""
+        lines = []
+        pad = '    ' * indent
+        while block is not None:
+            if block.disabled:
+                block = block.next
+                continue
+            kind = block.type
+            values = block.values
+            if kind == 'globals_values_create':
+                name = self._global(block.fields.get('KEY', ''))
+                lines.append(f"{pad}if not _truthy({name}):  # globals_values_create('{block.fields.get('KEY', '')}')")
+                lines.append(f"{pad}    {name} = nan")
+            elif kind == 'globals_values_set':
+                name = self._global(block.fields.get('KEY', ''))
+                code, value_kind = self.expression(values.get('VALUE'), ('0.0', 'num'))
+                code = code if value_kind == 'num' else f"float({code})"
+                lines.append(f"{pad}{name} = {code}  # {block.fields.get('KEY', '')}")
+            elif kind == 'controls_if':
+                lines.extend(self._controls_if(block, indent))
+            elif kind == 'controls_repeat_ext':
+                times, _ = self.expression(values.get('TIMES'), ('0.0', 'num'))
+                lines.append(f"{pad}for _ in range(_repeat_count({times})):")
+                lines.extend(self.statement(block.statements.get('DO'), indent + 1) or [f"{pad}    pass"])
+            elif kind == 'buy_action':
+                amount, _ = self.expression(values.get('AMT'), ('0.0', 'num'))
+                lines.append(f"{pad}sim.buy(float({amount}), close, time)")
+            elif kind == 'sell_action':
+                amount, _ = self.expression(values.get('AMT'), ('0.0', 'num'))
+                lines.append(f"{pad}sim.sell(float({amount}), close, time)")
+            elif kind == 'close_position_action':
+                lines.append(f"{pad}sim.close_position(close, time)")
+            elif kind == 'log_action':
+                message, _ = self.expression(values.get('AMT'), ("''", 'num'))
+                lines.append(f"{pad}sim.log({message})")
+            elif kind == 'grid_orders':
+                price, _ = self.expression(values.get('PRICE'), ('0.0', 'num'))
+                lines.append(f"{pad}sim.place_grid_orders({self._number(block, 'COUNT')!r}, {self._number(block, 'FACTOR')!r}, "
+                             f"{self._number(block, 'STEP')!r}, float({price}))")
+            elif kind == 'take_profit_action':
+                lines.append(f"{pad}sim.take_profit_pct = {self._number(block, 'PCT')!r}")
+            elif kind in INDICATOR_BLOCKS or kind in ('column_value', 'math_number', 'globals_values_get',
+                                                       'balance_initial', 'logic_compare', 'logic_operation',
+                                                       'logic_boolean', 'logic_negate'):
+                self.expression(block, ('nan', 'num'))  # Окремий вираз без побічних ефектів
+            else:
+                raise UnsupportedBlockError(f"Блок '{kind}' не підтримується.")
+            block = block.next
+        return lines
+
+    def _controls_if(self, block, indent):
+        pad = '    ' * indent
+        lines = []
+        branch = 0
+        while f"IF{branch}" in block.values or f"DO{branch}" in block.statements or branch == 0:
+            keyword = 'if' if branch == 0 else 'elif'
+            lines.append(f"{pad}{keyword} {self.condition(block.values.get(f'IF{branch}'))}:")
+            lines.extend(self.statement(block.statements.get(f"DO{branch}"), indent + 1) or [f"{pad}    pass"])
+            branch += 1
+        if 'ELSE' in block.statements:
+            lines.append(f"{pad}else:")
+            lines.extend(self.statement(block.statements['ELSE'], indent + 1) or [f"{pad}    pass"])
+        return lines
+
+    def compile(self, top_blocks):
+        body = []
+        for block in top_blocks:
+            body.extend(self.statement(block, 2))
+        arguments = ['sim', 'initial_balance', 'close_values', 'time_values',
+                     *self.columns.values(), *self.indicators.values()]
+        source = [f"def strategy({', '.join(arguments)}):"]
+        source += [f"    {name} = nan  # {key}" for key, name in self.globals.items()]
+        source.append("    for i, (close, time) in enumerate(zip(close_values, time_values)):")
+        source += body or ["        pass"]
+        source += [
+            "        if close <= sim.grid_high:",
+            "            sim.process_grid(close, time)",
+            "        if sim.take_profit_pct is not None and sim.coin > 0:",
+            "            sim.process_take_profit(close, time)",
+        ]
+        return CompiledStrategy('\n'.join(source) + '\n', dict(self.columns), dict(self.indicators))
+
+
+class CompiledStrategy:
+    """Скомпільована стратегія: код Python і план індикаторів, що обчислюються повними масивами."""
+
+    def __init__(self, source, columns, indicators):
+        self.source = source
+        self.columns = columns
+        self.indicators = indicators
+        namespace = {'nan': math.nan, '_truthy': _truthy, '_repeat_count': _repeat_count}
+        exec(compile(source, '<blockly-strategy>', 'exec'), namespace)
+        self.function = namespace['strategy']
+
+    @classmethod
+    def from_xml(cls, xml_text):
+        return StrategyCompiler().compile(parse_workspace(xml_text))
+
+    def run(self, data, initial_balance=100.0):
+        """Прогнати стратегію по рядках `data` (колонки як у CSV: Time, Open, High, Low, Close, ...)."""
+        numeric = {}
+
+        def column(name):
+            # Number(row[name]): нечислові значення та відсутні колонки дають NaN
+            if name not in numeric:
+                if name in data.columns:
+                    numeric[name] = pd.to_numeric(data[name], errors='coerce').to_numpy(dtype=np.float64)
+                else:
+                    numeric[name] = np.full(len(data), np.nan)
+            return numeric[name]
+
+        arrays = [column(name).tolist() for name in self.columns]
+        arrays += [compute_indicator(column, key) for key in self.indicators]
+        times = data['Time'].astype(str).tolist() if 'Time' in data.columns else [''] * len(data)
+        close = column('Close')
+
+        sim = GridSimulator(initial_balance)
+        self.function(sim, sim.initial_balance, close.tolist(), times, *arrays)
+        sim.logs.append(sim.summary(float(close[-1]) if len(close) else 0.0))
+        return sim
+
+
+def read_strategy_csv(path):
+    """CSV для конструктора стратегій: колонки з заголовка без перейменування."""
+    return pd.read_csv(path, skip_blank_lines=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Бек-тест стратегії з конструктора Blockly на CSV')
+    parser.add_argument('strategy', help='Файл з XML стратегії (XML, JSON-рядок або JSON {назва: XML})')
+    parser.add_argument('csv', help='CSV з колонками Time,Open,High,Low,Close,Volume')
+    parser.add_argument('--name', help="Назва стратегії у JSON-об'єкті")
+    parser.add_argument('--balance', type=float, default=100.0, help='Початковий баланс')
+    parser.add_argument('--show-code', action='store_true', help='Показати згенерований код Python')
+    parser.add_argument('--log', action='store_true', help='Вивести журнал дій, як у полі Output конструктора')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    strategy = CompiledStrategy.from_xml(load_strategy_text(args.strategy, args.name))
+    if args.show_code:
+        print(strategy.source)
+    frame = read_strategy_csv(args.csv)
+    simulator = strategy.run(frame, args.balance)
+    if args.log:
+        print('\n'.join(simulator.logs))
+    else:
+        print(simulator.logs[-1])
+    logging.info(f"Стратегію прогнано на {len(frame)} рядках: {len(simulator.trades)} угод.")
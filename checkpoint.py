@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Версія формату знімка; знімки іншої версії не відновлюються
+SNAPSHOT_VERSION = 2
+
+# Параметри стратегії, що зберігаються у знімку (назви як у engine_params)
+SNAPSHOT_PARAMS = ('initial_balance', 'number_of_orders', 'martingale_factor', 'order_step_percentage',
+                   'profit_target_percent', 'net_profit_target_percent', 'purchase_balance_percent')
+
+# Поля StrategyState у знімку та їх типи
+STATE_FIELDS = {'holding_coins': bool, 'bought_quantity': float, 'total_cost': float, 'balance': float,
+                'profit': float, 'initial_buy_done': bool}
+
+
+def write_snapshot(path, snapshot):
+    """Атомарно записати знімок у JSON: тимчасовий файл, fsync і заміна.
+
+    Після збою на диску лишається або попередній, або новий знімок повністю.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """Прочитати знімок або None, якщо файлу немає."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Непідтримувана версія знімка '{path}': {snapshot.get('version')}")
+    return snapshot
+
+
+def _timestamp_ms(timestamp):
+    return int(pd.Timestamp(timestamp).value // 1_000_000)
+
+
+def engine_params_snapshot(engine):
+    params = {name: getattr(engine, name) for name in SNAPSHOT_PARAMS}
+    params['purchase_balance_percent'] *= 100  # У рушії зберігається частка
+    return params
+
+
+def engine_snapshot(engine):
+    """Знімок торгового стану рушія: позиція, баланс, сітка ордерів, угоди та останній оброблений бар.
+
+    Бар зберігається і як позиція, і як час відкриття (мс) - за часом стан
+    знаходить своє місце в даних з іншим початком. Угоди у знімок не
+    входять: журнал перед знімком дописується у приймач, а `trades` - зміщення
+    в ньому, тож розмір і вартість знімка не залежать від кількості угод.
+    """
+    state = engine.state
+    journal = state.journal
+    journal.flush()
+    prices, quantities, filled, reached, remembered = state.order_book.export_state()
+    bar = state.last_index
+    return {
+        'version': SNAPSHOT_VERSION,
+        'bar': bar,
+        'timestamp': _timestamp_ms(engine.index[bar]) if bar is not None else None,
+        'params': engine_params_snapshot(engine),
+        'state': {name: cast(getattr(state, name)) for name, cast in STATE_FIELDS.items()},
+        'order_book': {
+            'prices': prices,
+            'quantities': quantities,
+            'filled': filled,
+            'reached': reached,
+            'remembered': [list(order) for order in remembered],
+        },
+        'journal': {'trades': len(journal), 'counts': list(journal.counts)},
+    }
+
+
+def restore_engine(engine, snapshot, bar=None):
+    """Відновити стан рушія зі знімка; повертає позицію першого ще не обробленого бару.
+
+    Позиція бару знімка шукається в індексі рушія за часом (або задається `bar`).
+    Інші параметри стратегії, ніж у знімку, означають форк: стан продовжується
+    з новими параметрами. Приймач журналу має бути тим самим файлом, що й при
+    знімку: він обрізається до угод знімка, і нові угоди дописуються після них.
+    """
+    if snapshot['timestamp'] is not None and bar is None:
+        index = pd.DatetimeIndex(engine.index)
+        bar = int(index.searchsorted(pd.Timestamp(snapshot['timestamp'], unit='ms')))
+        if bar >= len(index) or _timestamp_ms(index[bar]) != snapshot['timestamp']:
+            raise ValueError(f"Бару знімка {pd.Timestamp(snapshot['timestamp'], unit='ms')} немає в даних.")
+
+    params = engine_params_snapshot(engine)
+    changed = [name for name in SNAPSHOT_PARAMS if not np.isclose(params[name], snapshot['params'][name])]
+    if changed:
+        logging.info(f"Форк стану з іншими параметрами: {', '.join(changed)}.")
+
+    engine.reset()
+    state = engine.state
+    for name, cast in STATE_FIELDS.items():
+        setattr(state, name, cast(snapshot['state'][name]))
+    book = snapshot['order_book']
+    state.order_book.restore_state(book['prices'], book['quantities'], book['filled'], book['reached'],
+                                   book['remembered'])
+    trades = snapshot['journal']['trades']
+    if state.journal.sink is not None:
+        state.journal.resume(trades, snapshot['journal']['counts'])
+    elif trades:
+        logging.warning(f"Журнал без приймача: {trades} угод до знімка не відновлюються.")
+    state.last_index = bar
+    return bar + 1 if bar is not None else None
+
+
+def run_checkpointed(engine, path, start=None, stop=None, every_bars=10_000):
+    """Прогнати бари [start, stop) відрізками по `every_bars` зі знімком стану після кожного.
+
+    Відрізки проходить звичайний run() (побаровий цикл або ядро сітки), тож
+    результат той самий, що й одним прогоном.
+    """
+    start = engine.warmup if start is None else max(int(start), 1)
+    stop = len(engine.close) if stop is None else min(int(stop), len(engine.close))
+    every_bars = max(int(every_bars), 1)
+    for chunk_start in range(start, stop, every_bars):
+        engine.run(start=chunk_start, stop=min(chunk_start + every_bars, stop))
+        write_snapshot(path, engine_snapshot(engine))
+    return engine.journal
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# Колонки OHLCV (час відкриття у мс + ціни та об'єм) у колонковому форматі
+KLINE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Типи колонок, з якими парситься CSV
+CSV_DTYPES = {'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64, 'volume': np.float64}
+
+# Можливі назви колонки часу у CSV
+TIME_COLUMN_NAMES = ('time', 'timestamp', 'date', 'datetime', 'open_time')
+
+# Формат дати у CSV, що постачаються з репозиторієм
+CSV_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def empty_columns():
+    return {
+        'timestamp': np.empty(0, dtype=np.int64),
+        **{column: np.empty(0, dtype=np.float64) for column in KLINE_COLUMNS[1:]},
+    }
+
+
+def columns_to_frame(columns):
+    """Побудувати DataFrame у форматі get_historical_data з колонок без копіювання."""
+    index = pd.DatetimeIndex(pd.to_datetime(columns['timestamp'], unit='ms'), name='timestamp')
+    return pd.DataFrame({column: columns[column] for column in KLINE_COLUMNS[1:]}, index=index, copy=False)
+
+
+def read_columns_meta(directory):
+    """Прочитати meta.json колонкового каталогу або None."""
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_columns(directory, mmap=True):
+    """Завантажити колонки з каталогу .npy (memory-mapped) або None, якщо його немає."""
+    if read_columns_meta(directory) is None:
+        return None
+    mode = 'r' if mmap else None
+    return {
+        column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode=mode)
+        for column in KLINE_COLUMNS
+    }
+
+
+def save_columns(directory, columns, meta):
+    """Атомарно записати колонки у каталог .npy разом з meta.json."""
+    tmp_directory = directory + '.tmp'
+    old_directory = directory + '.old'
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    for column in KLINE_COLUMNS:
+        dtype = np.int64 if column == 'timestamp' else np.float64
+        np.save(os.path.join(tmp_directory, f"{column}.npy"), np.ascontiguousarray(columns[column], dtype=dtype))
+    with open(os.path.join(tmp_directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'rows': int(len(columns['timestamp'])), **meta}, f)
+
+    # Заміна каталогу: старий -> .old, новий -> основний
+    shutil.rmtree(old_directory, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old_directory)
+    os.replace(tmp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+
+
+def sort_unique(columns):
+    """Впорядкувати колонки за часом; при дублікатах лишається останній запис."""
+    order = np.argsort(columns['timestamp'], kind='stable')
+    timestamps = columns['timestamp'][order]
+    keep = np.ones(len(timestamps), dtype=bool)
+    keep[:-1] = timestamps[1:] != timestamps[:-1]
+    if keep.all() and (order[1:] > order[:-1]).all():
+        return columns
+    return {column: columns[column][order][keep] for column in KLINE_COLUMNS}
+
+
+def parse_ohlcv_csv(path):
+    """Розпарсити CSV Time,Open,High,Low,Close,Volume у типізовані колонки."""
+    header = pd.read_csv(path, nrows=0).columns
+    names = {name: name.strip().lower() for name in header}
+    time_column = next((name for name, lower in names.items() if lower in TIME_COLUMN_NAMES), None)
+    if time_column is None:
+        raise ValueError(f"У файлі '{path}' немає колонки часу.")
+    value_columns = {name: lower for name, lower in names.items() if lower in CSV_DTYPES}
+    missing = set(CSV_DTYPES) - set(value_columns.values())
+    if missing:
+        raise ValueError(f"У файлі '{path}' відсутні колонки: {', '.join(sorted(missing))}")
+
+    frame = pd.read_csv(
+        path,
+        usecols=[time_column, *value_columns],
+        dtype={name: CSV_DTYPES[lower] for name, lower in value_columns.items()},
+        engine='c',
+    ).rename(columns=value_columns)
+
+    times = frame[time_column]
+    if pd.api.types.is_numeric_dtype(times):
+        timestamps = times.to_numpy(dtype=np.int64)  # Уже мілісекунди Binance
+    else:
+        timestamps = pd.to_datetime(times, format=CSV_TIME_FORMAT).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+    columns = {'timestamp': timestamps}
+    for column in KLINE_COLUMNS[1:]:
+        columns[column] = frame[column].to_numpy(dtype=np.float64)
+    return sort_unique(columns)
+
+
+def parse_date_ms(date):
+    """Дата (YYYY-MM-DD) як мітка часу Unix у мілісекундах UTC (None - без межі).
+
+    Дата без часового поясу вважається UTC, як і час відкриття клайнів Binance.
+    """
+    if not date:
+        return None
+    return int(pd.Timestamp(date).value // 1_000_000)
+
+
+def load_ohlcv(path, start_date=None, end_date=None, use_cache=True, timeframe=None):
+    """Завантажити OHLCV з CSV у форматі, який очікує calculate_indicators.
+
+    Поруч з CSV зберігається бінарний кеш `<path>.cache`, який при наступних
+    завантаженнях відкривається через memory map без парсингу. З `timeframe`
+    (наприклад '1h') бари CSV агрегуються у старший таймфрейм, а результат
+    кешується поруч у `<path>.<timeframe>.cache`.
+    """
+    sidecar = path + '.cache'
+    stat = os.stat(path)
+    source = {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+    columns = None
+    if use_cache:
+        meta = read_columns_meta(sidecar)
+        if meta is not None and all(meta.get(key) == value for key, value in source.items()):
+            columns = load_columns(sidecar)
+
+    if columns is None:
+        columns = parse_ohlcv_csv(path)
+        logging.info(f"CSV '{path}' розпарсено: {len(columns['timestamp'])} рядків.")
+        if use_cache:
+            try:
+                save_columns(sidecar, columns, source)
+            except OSError as e:
+                logging.warning(f"Не вдалося зберегти бінарний кеш '{sidecar}': {e}")
+
+    if timeframe:
+        from resample import cached_resample
+
+        columns = cached_resample(f"{path}.{timeframe}.cache", columns, timeframe, source if use_cache else None)
+
+    # Зріз за датами - це view на memory-mapped масиви
+    timestamps = columns['timestamp']
+    first = int(np.searchsorted(timestamps, parse_date_ms(start_date), side='left')) if start_date else 0
+    last = int(np.searchsorted(timestamps, parse_date_ms(end_date), side='right')) if end_date else len(timestamps)
+    data = columns_to_frame({column: columns[column][first:last] for column in KLINE_COLUMNS})
+    logging.info(f"Завантажено {len(data)} рядків з '{path}'.")
+    return data
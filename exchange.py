@@ -0,0 +1,161 @@
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+
+
+class OrderRejected(Exception):
+    """Біржа відхилила ордер або він не був виконаний."""
+
+
+class LazyClient:
+    """binance Client, що створюється при першому зверненні до нього.
+
+    Імпорт python-binance (~0.7 с) і запит ping у конструкторі Client
+    не потрібні запускам, яким вистачає CSV або кешу клайнів.
+    """
+
+    def __init__(self, api_key=None, api_secret=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from binance.client import Client
+
+            self._client = Client(self.api_key, self.api_secret)
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)  # Без рекурсії через client до виклику __init__ (copy, pickle)
+        return getattr(self.client, name)
+
+
+class ExchangeAdapter(ABC):
+    """Інтерфейс виконання ринкових ордерів для однієї торгової пари.
+
+    Рушій стратегії викликає place_market_order до зміни свого стану, тож
+    відхилений ордер (OrderRejected) не змінює позицію стратегії; стан
+    оновлюється за поверненим виконанням: кількість монет, що фактично
+    прийшли або пішли з рахунку, ціна і комісія `fee` у котирувальній валюті.
+    """
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.fills = []
+
+    @abstractmethod
+    def place_market_order(self, side, quantity, price):
+        """Виставити ринковий ордер `side` ('BUY'/'SELL') і повернути словник виконання."""
+
+    def executable_quantity(self, quantity):
+        """Кількість, яку біржа прийме в ордері (0 - залишок менший за мінімальний крок)."""
+        return quantity
+
+
+class PaperExchange(ExchangeAdapter):
+    """Симуляція виконання за ціною рішення для paper trading."""
+
+    def __init__(self, symbol, fee_rate=0.0):
+        super().__init__(symbol)
+        self.fee_rate = fee_rate
+        self._next_order_id = 1
+
+    def place_market_order(self, side, quantity, price):
+        if quantity <= 0:
+            raise OrderRejected(f"Некоректна кількість для {side}: {quantity}")
+        fill = {
+            'order_id': self._next_order_id,
+            'symbol': self.symbol,
+            'side': side,
+            'quantity': quantity,
+            'price': price,
+            'fee': quantity * price * self.fee_rate,
+            'time': int(time.time() * 1000),
+        }
+        self._next_order_id += 1
+        self.fills.append(fill)
+        logging.info(f"Paper {side} {self.symbol}: {quantity:.6f} за {price:.2f}")
+        return fill
+
+
+class BinanceExchange(ExchangeAdapter):
+    """Ринкові ордери через REST API Binance (python-binance Client).
+
+    Комісія Binance списується в активі `commissionAsset` кожного виконання:
+    у базовому активі (монети купівлі), котирувальному або BNB. Базова комісія
+    зменшує кількість у виконанні й переводиться у `fee` за ціною виконання,
+    котирувальна додається до `fee` як є, а комісії в інших активах (BNB)
+    не змішуються з USDT - вони лише записуються у `fill['commissions']`.
+    """
+
+    def __init__(self, client, symbol, quantity_precision=None, base_asset=None, quote_asset=None):
+        super().__init__(symbol)
+        self.client = client
+        info = {}
+        if quantity_precision is None or base_asset is None or quote_asset is None:
+            info = self.client.get_symbol_info(self.symbol) or {}
+        self.quantity_precision = quantity_precision if quantity_precision is not None else self._precision(info)
+        self.base_asset = base_asset or info.get('baseAsset')
+        self.quote_asset = quote_asset or info.get('quoteAsset')
+
+    @staticmethod
+    def _precision(info):
+        # Кількість знаків кількості з фільтра LOT_SIZE пари
+        for symbol_filter in info.get('filters', []):
+            if symbol_filter.get('filterType') == 'LOT_SIZE':
+                step = float(symbol_filter['stepSize'])
+                return max(0, round(-math.log10(step)))
+        return 6
+
+    def _format_quantity(self, quantity):
+        factor = 10 ** self.quantity_precision
+        return f"{math.floor(quantity * factor) / factor:.{self.quantity_precision}f}"
+
+    def executable_quantity(self, quantity):
+        return float(self._format_quantity(quantity))
+
+    def place_market_order(self, side, quantity, price):
+        from binance.exceptions import BinanceAPIException, BinanceRequestException
+
+        formatted = self._format_quantity(quantity)
+        if float(formatted) <= 0:
+            raise OrderRejected(f"Кількість {quantity} менша за мінімальний крок {self.symbol}")
+        try:
+            response = self.client.create_order(symbol=self.symbol, side=side, type='MARKET', quantity=formatted)
+        except (BinanceAPIException, BinanceRequestException) as e:
+            raise OrderRejected(f"Ордер {side} {self.symbol} {formatted} відхилено: {e}") from e
+
+        executed = float(response.get('executedQty', 0))
+        if executed <= 0:
+            raise OrderRejected(f"Ордер {side} {self.symbol} {formatted} не виконано: {response.get('status')}")
+        quote = float(response.get('cummulativeQuoteQty', 0))
+        fill_price = quote / executed if quote else price
+        commissions = {}
+        for part in response.get('fills', []):
+            asset = part.get('commissionAsset', self.quote_asset)
+            commissions[asset] = commissions.get(asset, 0.0) + float(part.get('commission', 0))
+        base_fee = commissions.get(self.base_asset, 0.0)
+        # Купівля: базова комісія утримується з отриманих монет, тож у позиції лише нетто-кількість;
+        # продаж: монети комісії списуються понад проданий обсяг, тож лише її вартість іде у fee
+        quantity = executed - base_fee if side == 'BUY' else executed
+        fill = {
+            'order_id': response.get('orderId'),
+            'symbol': self.symbol,
+            'side': side,
+            'quantity': quantity,
+            'price': fill_price,
+            'fee': commissions.get(self.quote_asset, 0.0) + base_fee * fill_price,
+            'commissions': commissions,
+            'time': response.get('transactTime', int(time.time() * 1000)),
+        }
+        self.fills.append(fill)
+        logging.info(f"Binance {side} {self.symbol}: {quantity:.6f} за {fill_price:.2f} (ордер {fill['order_id']})")
+        other = {asset: amount for asset, amount in commissions.items()
+                 if asset not in (self.base_asset, self.quote_asset) and amount}
+        if other:
+            logging.info(f"Комісія ордера {fill['order_id']} поза парою {self.symbol}: {other}")
+        return fill
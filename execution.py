@@ -0,0 +1,45 @@
+class ExecutionModel:
+    """Модель виконання угод у бек-тесті: прослизання, комісія та рух ціни всередині бару.
+
+    За замовчуванням (intrabar=False, без витрат) угоди виконуються за ціною
+    закриття бару рішення, як і раніше. З intrabar рівні сітки досягаються
+    мінімумом бару, а тейк-профіт - максимумом.
+
+    Порядок мінімуму й максимуму всередині бару на угоди не впливає: мінімум
+    лише запам'ятовує рівні сітки (купуються вони за close при перетині MA10),
+    а продаж за тейк-профітом очищує сітку разом із запам'ятованими рівнями.
+    Тож бар проходиться одним шляхом O→L→H→C.
+
+    Прослизання - частка ціни, на яку кожне виконання гірше за ціну рішення;
+    комісія - частка вартості угоди у валюті котирування.
+    """
+
+    __slots__ = ('intrabar', 'fee_rate', 'slippage')
+
+    def __init__(self, intrabar=False, fee_rate=0.0, slippage=0.0):
+        if fee_rate < 0 or not 0 <= slippage < 1:
+            raise ValueError(f"Некоректні комісія ({fee_rate}) або прослизання ({slippage})")
+        self.intrabar = bool(intrabar)
+        self.fee_rate = float(fee_rate)
+        self.slippage = float(slippage)
+
+    def points(self, open_price, high, low, close):
+        """Ціни бару в порядку проходження."""
+        return open_price, low, high, close
+
+    def buy_fill(self, price):
+        return price * (1 + self.slippage)
+
+    def sell_fill(self, price):
+        return price * (1 - self.slippage)
+
+    def fee(self, notional):
+        return notional * self.fee_rate
+
+    def cost(self, notional):
+        """Витрати на купівлю разом з комісією."""
+        return notional + notional * self.fee_rate
+
+    def proceeds(self, notional):
+        """Надходження від продажу за вирахуванням комісії."""
+        return notional - notional * self.fee_rate
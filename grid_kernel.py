@@ -0,0 +1,356 @@
+import importlib.util
+
+import numpy as np
+
+# Numba імпортується (~0.3 с) і компілює ядро лише при першому виклику compiled();
+# без Numba функції модуля виконуються як звичайний Python
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Функції ядра, що компілюються разом: run_grid викликає решту як глобальні імена модуля
+_KERNEL_FUNCTIONS = []
+_compiled = False
+
+
+def _kernel(function):
+    _KERNEL_FUNCTIONS.append(function.__name__)
+    return function
+
+
+def compiled():
+    """run_grid, скомпільований Numba (кеш на диску - між процесами)."""
+    global _compiled
+    if not _compiled:
+        from numba import njit
+
+        namespace = globals()
+        for name in _KERNEL_FUNCTIONS:
+            namespace[name] = njit(cache=True)(namespace[name])
+        _compiled = True
+    return run_grid
+
+
+# Сторони угод у масивах ядра (як trade_journal.Side)
+BUY = 0
+SELL = 1
+
+# Колонки масиву угод, який повертає run_grid
+TRADE_BAR, TRADE_SIDE, TRADE_PRICE, TRADE_QUANTITY, TRADE_ORDERS, TRADE_PROFIT, TRADE_FEE = range(7)
+
+
+@_kernel
+def _record(trades, count, bar, side, price, quantity, orders, profit_percent, fee):
+    trades[count, TRADE_BAR] = bar
+    trades[count, TRADE_SIDE] = side
+    trades[count, TRADE_PRICE] = price
+    trades[count, TRADE_QUANTITY] = quantity
+    trades[count, TRADE_ORDERS] = orders
+    trades[count, TRADE_PROFIT] = profit_percent
+    trades[count, TRADE_FEE] = fee
+
+
+@_kernel
+def _sort_grid(prices, count, order, sorted_neg_prices):
+    # Стабільне сортування рівнів за спаданням ціни, як індекс GridOrderBook
+    order[:count] = np.argsort(-prices[:count], kind='mergesort')
+    for k in range(count):
+        sorted_neg_prices[k] = -prices[order[k]]
+
+
+@_kernel
+def _bisect_right(values, count, value):
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if value < values[middle]:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+@_kernel
+def _fill(grid_prices, grid_quantities, grid_filled, grid_count, order_prices, order_quantities, count):
+    # Ордери ототожнюються за значенням: виконуються всі рівні з тією ж ціною та кількістю
+    for k in range(count):
+        for level in range(grid_count):
+            if grid_prices[level] == order_prices[k] and grid_quantities[level] == order_quantities[k]:
+                grid_filled[level] = True
+
+
+@_kernel
+def _remember_reached(price, prices, quantities, filled, order, sorted_neg_prices, grid_count, reached,
+                      rem_prices, rem_quantities, remembered_count):
+    # GridOrderBook.remember_reached: нові невиконані рівні з ціною >= price у порядку сітки
+    count = _bisect_right(sorted_neg_prices, grid_count, -price)
+    if count > reached:
+        for level in np.sort(order[reached:count]):
+            if filled[level]:
+                continue
+            known = False
+            for k in range(remembered_count):
+                if rem_prices[k] == prices[level] and rem_quantities[k] == quantities[level]:
+                    known = True
+                    break
+            if not known:
+                rem_prices[remembered_count] = prices[level]
+                rem_quantities[remembered_count] = quantities[level]
+                remembered_count += 1
+        reached = count
+    return reached, remembered_count
+
+
+@_kernel
+def _profit_percent(price, quantity, total_cost, slippage, fee_rate):
+    # BacktestEngine.profit_percent_at
+    notional = quantity * (price * (1 - slippage))
+    profit = (notional - notional * fee_rate) - total_cost
+    return (profit / total_cost) * 100 if total_cost > 0 else 0.0
+
+
+@_kernel
+def _take_profit_price(quantity, total_cost, bb_upper, slippage, fee_rate,
+                       profit_target_percent, net_profit_target_percent):
+    # BacktestEngine.take_profit_price
+    unit = 1.0 * (1 - slippage)
+    unit_value = (unit - unit * fee_rate) * quantity
+    net_target = total_cost * (1 + net_profit_target_percent / 100) / unit_value
+    target = total_cost * (1 + profit_target_percent / 100) / unit_value
+    if bb_upper > target:
+        target = bb_upper
+    return target if target < net_target else net_target
+
+
+@_kernel
+def _sell(trades, count, bar, price, quantity, total_cost, profit_percent, slippage, fee_rate):
+    # BacktestEngine.sell без скидання стану; повертає прибуток угоди
+    fill_price = price * (1 - slippage)
+    notional = quantity * fill_price
+    fee = notional * fee_rate
+    _record(trades, count, bar, SELL, fill_price, quantity, 0, profit_percent, fee)
+    return notional - fee - total_cost
+
+
+@_kernel
+def run_grid(close, ma, ma_10, bb_lower, bb_upper, open_, high, low, start, stop,
+             initial_balance, number_of_orders, martingale_factor, order_step, profit_target_percent,
+             net_profit_target_percent, purchase_balance_percent, intrabar, fee_rate, slippage,
+             holding, quantity, total_cost, balance, profit, initial_buy_done,
+             grid_prices, grid_quantities, grid_filled, reached, remembered_prices, remembered_quantities):
+    """Стан-машина сітки мартингейла по барах [start, stop) - те саме, що BacktestEngine.on_bar.
+
+    Приймає масиви close/MA/MA10/BB і open/high/low (потрібні лише з intrabar),
+    параметри (order_step і purchase_balance_percent - частки), модель виконання
+    (execution.ExecutionModel) та початковий стан; повертає масив угод (колонки
+    TRADE_*), останній оброблений бар і кінцевий стан, включно з сіткою та
+    запам'ятованими ордерами.
+    """
+    # Розміри буферів оцінюються наперед з кількості перетинів: масиви, перепризначені
+    # всередині циклу, коштували б у Numba підрахунку посилань на кожному барі
+    grid_setups = 0
+    bb_crosses = 0
+    for i in range(start, stop):
+        if ma_10[i - 1] > ma[i - 1] and ma_10[i] < ma[i]:
+            grid_setups += 1
+        if ma_10[i - 1] < bb_lower[i - 1] and ma_10[i] > bb_lower[i]:
+            bb_crosses += 1
+    grid_count = len(grid_prices)
+    capacity = max(number_of_orders, grid_count, 1)
+    remembered_count = len(remembered_prices)
+    # Кожен рівень купується не більше одного разу; продажів не більше, ніж початкових купівель
+    remembered_capacity = remembered_count + grid_count + grid_setups * number_of_orders + 1
+    trades = np.empty((remembered_capacity + 2 * bb_crosses, 7))
+
+    prices = np.empty(capacity)
+    quantities = np.empty(capacity)
+    filled = np.zeros(capacity, dtype=np.bool_)
+    order = np.empty(capacity, dtype=np.int64)
+    sorted_neg_prices = np.empty(capacity)
+    prices[:grid_count] = grid_prices
+    quantities[:grid_count] = grid_quantities
+    filled[:grid_count] = grid_filled
+    _sort_grid(prices, grid_count, order, sorted_neg_prices)
+
+    rem_prices = np.empty(remembered_capacity)
+    rem_quantities = np.empty(remembered_capacity)
+    rem_prices[:remembered_count] = remembered_prices
+    rem_quantities[:remembered_count] = remembered_quantities
+    buy_prices = np.empty(max(capacity, remembered_capacity))
+    buy_quantities = np.empty(max(capacity, remembered_capacity))
+
+    trade_count = 0
+    last_index = -1
+    for i in range(start, stop):
+        last_index = i
+        last_close = close[i]
+        last_ma_10 = ma_10[i]
+        prev_ma_10 = ma_10[i - 1]
+        crossed_bb_lower = prev_ma_10 < bb_lower[i - 1] and last_ma_10 > bb_lower[i]
+
+        # check_intrabar: точки бару O→L→H→C зі смугами попереднього бару
+        if intrabar:
+            previous = open_[i]
+            exit_price = np.nan
+            if holding and quantity > 0 and total_cost > 0 and previous >= _take_profit_price(
+                    quantity, total_cost, bb_upper[i - 1], slippage, fee_rate,
+                    profit_target_percent, net_profit_target_percent):
+                exit_price = previous  # Розрив ціни на відкритті
+            for point in range(3):
+                if not np.isnan(exit_price):
+                    break  # Після продажу сітка порожня: решта шляху нічого не змінює
+                if point == 0:
+                    price = low[i]
+                elif point == 1:
+                    price = high[i]
+                else:
+                    price = last_close
+                if price < previous:
+                    if initial_buy_done and price < bb_lower[i - 1]:
+                        reached, remembered_count = _remember_reached(
+                            price, prices, quantities, filled, order, sorted_neg_prices, grid_count, reached,
+                            rem_prices, rem_quantities, remembered_count)
+                elif price > previous and holding and quantity > 0 and total_cost > 0:
+                    threshold = _take_profit_price(quantity, total_cost, bb_upper[i - 1], slippage, fee_rate,
+                                                   profit_target_percent, net_profit_target_percent)
+                    if price >= threshold:
+                        exit_price = threshold if threshold > previous else previous
+                previous = price
+            if not np.isnan(exit_price):
+                profit += _sell(trades, trade_count, i, exit_price, quantity, total_cost,
+                                _profit_percent(exit_price, quantity, total_cost, slippage, fee_rate),
+                                slippage, fee_rate)
+                trade_count += 1
+                holding = False
+                quantity = 0.0
+                total_cost = 0.0
+                grid_count = 0
+                reached = 0
+                remembered_count = 0
+                initial_buy_done = False
+                balance = initial_balance
+
+        # check_buy_conditions
+        if not holding and prev_ma_10 > ma[i - 1] and last_ma_10 < ma[i]:
+            # setup_conditional_orders: нова сітка від ціни перетину, запам'ятовані ордери лишаються
+            step = order_step * last_close
+            total_sum = 0.0
+            price = last_close
+            for n in range(1, number_of_orders + 1):
+                if n > 1:
+                    price = price - step
+                prices[n - 1] = price
+                total_sum += price * (1 + martingale_factor) ** float(n - 1)
+                filled[n - 1] = False
+            grid_count = number_of_orders
+            level_quantity = initial_balance / total_sum
+            for n in range(number_of_orders):
+                quantities[n] = level_quantity
+                level_quantity = level_quantity * (1 + martingale_factor)
+            _sort_grid(prices, grid_count, order, sorted_neg_prices)
+            reached = 0
+            # Не купувати на першому перетині
+        elif not initial_buy_done:
+            if crossed_bb_lower:
+                # execute_initial_buy_order: невиконані рівні з ціною вище поточної у порядку сітки
+                fill_price = last_close * (1 + slippage)
+                candidates = 0
+                total_orders_cost = 0.0
+                for level in range(grid_count):
+                    if not filled[level] and prices[level] > last_close:
+                        buy_prices[candidates] = prices[level]
+                        buy_quantities[candidates] = quantities[level]
+                        notional = quantities[level] * fill_price
+                        total_orders_cost += notional + notional * fee_rate
+                        candidates += 1
+                if candidates > 0:
+                    to_buy = candidates
+                    cumulative_cost = total_orders_cost
+                    cumulative_quantity = 0.0
+                    if purchase_balance_percent == 0 or total_orders_cost / initial_balance >= purchase_balance_percent:
+                        for k in range(candidates):
+                            cumulative_quantity += buy_quantities[k]
+                    else:
+                        purchase_balance = initial_balance * purchase_balance_percent
+                        if balance < purchase_balance:
+                            purchase_balance = balance
+                        to_buy = 0
+                        cumulative_cost = 0.0
+                        for k in range(candidates):
+                            notional = buy_quantities[k] * fill_price
+                            order_cost = notional + notional * fee_rate
+                            if cumulative_cost + order_cost <= purchase_balance or cumulative_cost == 0.0:
+                                to_buy += 1
+                                cumulative_cost += order_cost
+                                cumulative_quantity += buy_quantities[k]
+                            else:
+                                break
+                    quantity += cumulative_quantity
+                    balance -= cumulative_cost
+                    total_cost += cumulative_cost
+                    holding = True
+                    _fill(prices, quantities, filled, grid_count, buy_prices, buy_quantities, to_buy)
+                    _record(trades, trade_count, i, BUY, fill_price, cumulative_quantity, to_buy, np.nan,
+                            cumulative_quantity * fill_price * fee_rate)
+                    trade_count += 1
+                initial_buy_done = True  # Навіть якщо купувати не було чого, як у рушії
+        else:
+            if last_close < bb_lower[i]:
+                reached, remembered_count = _remember_reached(
+                    last_close, prices, quantities, filled, order, sorted_neg_prices, grid_count, reached,
+                    rem_prices, rem_quantities, remembered_count)
+            if crossed_bb_lower:
+                # execute_remembered_orders: запам'ятовані ордери з ціною вище ціни перетину
+                candidates = 0
+                for k in range(remembered_count):
+                    if rem_prices[k] > last_close:
+                        buy_prices[candidates] = rem_prices[k]
+                        buy_quantities[candidates] = rem_quantities[k]
+                        candidates += 1
+                if candidates > 0:
+                    fill_price = last_close * (1 + slippage)
+                    for k in range(candidates):
+                        notional = buy_quantities[k] * fill_price
+                        order_cost = notional + notional * fee_rate
+                        if balance < order_cost:
+                            break  # Ордери, на які не вистачило балансу, все одно знімаються, як у рушії
+                        quantity += buy_quantities[k]
+                        balance -= order_cost
+                        total_cost += order_cost
+                        _record(trades, trade_count, i, BUY, fill_price, buy_quantities[k], 1, np.nan,
+                                notional * fee_rate)
+                        trade_count += 1
+                    _fill(prices, quantities, filled, grid_count, buy_prices, buy_quantities, candidates)
+                    # forget: прибрати виконані ордери із запам'ятованих зі збереженням порядку
+                    kept = 0
+                    for k in range(remembered_count):
+                        forgotten = False
+                        for m in range(candidates):
+                            if rem_prices[k] == buy_prices[m] and rem_quantities[k] == buy_quantities[m]:
+                                forgotten = True
+                                break
+                        if not forgotten:
+                            rem_prices[kept] = rem_prices[k]
+                            rem_quantities[kept] = rem_quantities[k]
+                            kept += 1
+                    remembered_count = kept
+
+        # check_sell_conditions
+        if holding and quantity > 0:
+            profit_percent = _profit_percent(last_close, quantity, total_cost, slippage, fee_rate)
+            if profit_percent >= net_profit_target_percent or \
+               (last_close > bb_upper[i] and profit_percent >= profit_target_percent):
+                profit += _sell(trades, trade_count, i, last_close, quantity, total_cost, profit_percent,
+                                slippage, fee_rate)
+                trade_count += 1
+                holding = False
+                quantity = 0.0
+                total_cost = 0.0
+                grid_count = 0
+                reached = 0
+                remembered_count = 0
+                initial_buy_done = False
+                balance = initial_balance
+
+    return (trades[:trade_count].copy(), last_index, holding, quantity, total_cost, balance, profit,
+            initial_buy_done, prices[:grid_count].copy(), quantities[:grid_count].copy(),
+            filled[:grid_count].copy(), reached, rem_prices[:remembered_count].copy(),
+            rem_quantities[:remembered_count].copy())
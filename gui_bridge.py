@@ -0,0 +1,76 @@
+import logging
+import queue
+
+
+class GuiBridge:
+    """Черга подій від потоку бота до головного циклу Tk.
+
+    Потік бота лише викликає publish(); обробники виконуються у потоці Tk,
+    який розбирає чергу через root.after з фіксованою частотою кадрів.
+    Події з `coalesce` (кадри графіку), що йдуть підряд, зливаються в одну -
+    обробляється лише найновіша, тож бек-тест не чекає на малювання.
+    """
+
+    def __init__(self, root, fps=20, maxsize=1024, coalesce=('frame',), put_timeout=1.0):
+        self.root = root
+        self.put_timeout = put_timeout
+        self.interval_ms = max(int(1000 / fps), 1)
+        self.coalesce = set(coalesce)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._handlers = {}
+        self.dropped_frames = 0
+        self.dropped_events = 0
+        self.root.after(self.interval_ms, self._drain)
+
+    def subscribe(self, kind, handler):
+        """Зареєструвати обробник подій `kind` (викликається у потоці Tk)."""
+        self._handlers[kind] = handler
+
+    def publish(self, kind, payload=None):
+        """Надіслати подію з будь-якого потоку.
+
+        Кадр при заповненій черзі відкидається (його однаково замінив би
+        наступний), решта подій чекає на місце не довше `put_timeout` секунд:
+        якщо головний цикл Tk зупинився, подія відкидається, а потік бота
+        не блокується.
+        """
+        if kind in self.coalesce:
+            try:
+                self._queue.put_nowait((kind, payload))
+            except queue.Full:
+                self.dropped_frames += 1
+        else:
+            try:
+                self._queue.put((kind, payload), timeout=self.put_timeout)
+            except queue.Full:
+                self.dropped_events += 1
+                logging.warning(f"Черга GUI заповнена, подію '{kind}' відкинуто")
+
+    def _dispatch(self, kind, payload):
+        handler = self._handlers.get(kind)
+        if handler is None:
+            return
+        try:
+            handler(payload)
+        except Exception as e:
+            logging.error(f"Помилка обробки події GUI '{kind}': {e}")
+
+    def _drain(self):
+        # Лише події, що вже є у черзі: потік бота не може утримати Tk у цьому циклі
+        pending = {}
+        for _ in range(self._queue.qsize()):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind in self.coalesce:
+                pending[kind] = payload
+                continue
+            # Порядок зберігається: кадри перед подією обробляються до неї
+            for frame_kind, frame in pending.items():
+                self._dispatch(frame_kind, frame)
+            pending.clear()
+            self._dispatch(kind, payload)
+        for frame_kind, frame in pending.items():
+            self._dispatch(frame_kind, frame)
+        self.root.after(self.interval_ms, self._drain)
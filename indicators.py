@@ -0,0 +1,377 @@
+import hashlib
+import logging
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from ta.trend import SMAIndicator
+from ta.volatility import BollingerBands
+
+
+def calculate_indicators(data, ma_window_size, ma_10_window_size, bb_window_size):
+    """Обчислити індикатори MA та Bollinger Bands."""
+    # Простий рухомий середній (MA)
+    data['ma'] = SMAIndicator(close=data['close'], window=ma_window_size).sma_indicator()
+    data['ma_10'] = SMAIndicator(close=data['close'], window=ma_10_window_size).sma_indicator()
+
+    # Bollinger Bands
+    bb_indicator = BollingerBands(close=data['close'], window=bb_window_size, window_dev=2)
+    data['bb_upper'] = bb_indicator.bollinger_hband()
+    data['bb_lower'] = bb_indicator.bollinger_lband()
+
+    logging.info("Індикатори успішно обчислено.")
+    return data
+
+
+def _rolling_sum(values, window):
+    # Ковзна сума по осі барів через кумулятивну суму; до заповнення вікна - NaN
+    totals = np.cumsum(values, axis=1)
+    result = np.full(values.shape, np.nan)
+    result[:, window - 1] = totals[:, window - 1]
+    result[:, window:] = totals[:, window:] - totals[:, :-window]
+    return result
+
+
+def batch_indicators(close, ma_window_size, ma_10_window_size, bb_window_size):
+    """Індикатори calculate_indicators для пакета рядів цін (масив шляхів × барів) без pandas.
+
+    Стандартне відхилення з ddof=0, як у `ta`; суми рахуються відносно першої
+    ціни кожного шляху, щоб уникнути скорочення розрядів при великих цінах.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    shifted = close - close[:, :1]
+    bb_mean = _rolling_sum(shifted, bb_window_size) / bb_window_size
+    variance = np.maximum(_rolling_sum(shifted * shifted, bb_window_size) / bb_window_size - bb_mean ** 2, 0.0)
+    bb_std = np.sqrt(variance)
+    bb_mean += close[:, :1]
+    return {
+        'close': close,
+        'ma': _rolling_sum(shifted, ma_window_size) / ma_window_size + close[:, :1],
+        'ma_10': _rolling_sum(shifted, ma_10_window_size) / ma_10_window_size + close[:, :1],
+        'bb_upper': bb_mean + 2 * bb_std,
+        'bb_lower': bb_mean - 2 * bb_std,
+    }
+
+
+def dataset_fingerprint(data):
+    """Відбиток набору даних: хеш часових міток і цін закриття."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(data.index.asi8 if isinstance(data.index, pd.DatetimeIndex)
+                                       else data.index.to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(data['close'].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """Мемоізація колонок calculate_indicators за (відбиток даних, індикатор, вікно).
+
+    SMA та смуги Боллінджера кешуються окремо, тож перебір, що змінює лише
+    одне вікно, перераховує тільки його. У пам'яті тримається не більше
+    `max_entries` колонок (LRU); з `directory` вони також зберігаються на диск
+    у .npy і між запусками відкриваються через memory map.
+    """
+
+    def __init__(self, max_entries=32, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Статистика звернень до кешу."""
+        requests = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'hit_rate': (self.hits + self.disk_hits) / requests if requests else 0.0,
+        }
+
+    def _path(self, fingerprint, kind, window):
+        return os.path.join(self.directory, fingerprint, f"{kind}_{window}.npy")
+
+    def _load(self, fingerprint, kind, window):
+        if self.directory is None:
+            return None
+        try:
+            return np.load(self._path(fingerprint, kind, window), mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store(self, fingerprint, kind, window, values):
+        if self.directory is None:
+            return
+        path = self._path(fingerprint, kind, window)
+        tmp_path = path + '.tmp.npy'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.save(tmp_path, values)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Не вдалося зберегти індикатор у кеш '{path}': {e}")
+
+    def _column(self, close, fingerprint, kind, window):
+        key = (fingerprint, kind, window)
+        values = self._entries.get(key)
+        if values is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return values
+
+        values = self._load(fingerprint, kind, window)
+        if values is not None and values.shape[-1] == len(close):
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            if kind == 'sma':
+                values = SMAIndicator(close=close, window=window).sma_indicator().to_numpy(dtype=np.float64)
+            else:
+                bb_indicator = BollingerBands(close=close, window=window, window_dev=2)
+                values = np.vstack([bb_indicator.bollinger_lband().to_numpy(dtype=np.float64),
+                                    bb_indicator.bollinger_hband().to_numpy(dtype=np.float64)])
+            values.flags.writeable = False
+            self._store(fingerprint, kind, window, values)
+
+        self._entries[key] = values
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return values
+
+    def get(self, data, ma_window_size, ma_10_window_size, bb_window_size, fingerprint=None):
+        """Повернути новий DataFrame (close + індикатори) як у calculate_indicators.
+
+        Колонки open/high/low, якщо вони є, передаються без змін (для виконання всередині бару).
+        """
+        fingerprint = fingerprint or dataset_fingerprint(data)
+        close = data['close']
+        bb = self._column(close, fingerprint, 'bb', bb_window_size)
+        columns = {column: data[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low')
+                   if column in data.columns}
+        return pd.DataFrame({
+            **columns,
+            'close': close.to_numpy(dtype=np.float64),
+            'ma': self._column(close, fingerprint, 'sma', ma_window_size),
+            'ma_10': self._column(close, fingerprint, 'sma', ma_10_window_size),
+            'bb_upper': bb[1],
+            'bb_lower': bb[0],
+        }, index=data.index, copy=False)
+
+
+class RollingSMA:
+    """Простий рухомий середній з O(1) оновленням на кожен новий бар.
+
+    Сума вікна ведеться з компенсацією Кехена, тому похибка не накопичується
+    навіть на сотнях тисяч барів. До заповнення вікна значення - NaN, як у `ta`.
+    """
+
+    __slots__ = ('window', '_buffer', '_position', '_count', '_sum', '_compensation', 'value')
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError(f"Розмір вікна має бути додатним: {window}")
+        self.window = window
+        self._buffer = [0.0] * window
+        self._position = 0
+        self._count = 0
+        self._sum = 0.0
+        self._compensation = 0.0
+        self.value = math.nan
+
+    def _add(self, delta):
+        # Кехен-Ноймаєр: компенсація втрачених молодших розрядів
+        total = self._sum + delta
+        if abs(self._sum) >= abs(delta):
+            self._compensation += (self._sum - total) + delta
+        else:
+            self._compensation += (delta - total) + self._sum
+        self._sum = total
+
+    def update(self, value):
+        """Додати нове значення та повернути поточне SMA."""
+        value = float(value)
+        if self._count == self.window:
+            self._add(value - self._buffer[self._position])
+        else:
+            self._add(value)
+            self._count += 1
+        self._buffer[self._position] = value
+        self._position = (self._position + 1) % self.window
+
+        if self._count == self.window:
+            self.value = (self._sum + self._compensation) / self.window
+        return self.value
+
+    def export_state(self):
+        """Повний стан (вікно, буфер, суми) як словник простих значень для знімка."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def restore_state(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state[name])
+
+
+class RollingBollinger:
+    """Смуги Боллінджера (SMA ± k·σ, ddof=0) з O(1) оновленням.
+
+    Суми значень і квадратів рахуються відносно першого значення, щоб
+    уникнути катастрофічного скорочення при великих цінах (BTC ~ 1e5).
+    """
+
+    __slots__ = ('window', 'window_dev', '_buffer', '_position', '_count', '_shift',
+                 '_sum', '_sum_sq', 'upper', 'middle', 'lower')
+
+    def __init__(self, window, window_dev=2):
+        if window < 1:
+            raise ValueError(f"Розмір вікна має бути додатним: {window}")
+        self.window = window
+        self.window_dev = window_dev
+        self._buffer = [0.0] * window
+        self._position = 0
+        self._count = 0
+        self._shift = None
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.upper = self.middle = self.lower = math.nan
+
+    def update(self, value):
+        """Додати нове значення та повернути (upper, middle, lower)."""
+        value = float(value)
+        if self._shift is None:
+            self._shift = value
+        shifted = value - self._shift
+
+        if self._count == self.window:
+            old = self._buffer[self._position]
+            self._sum += shifted - old
+            self._sum_sq += (shifted - old) * (shifted + old)
+        else:
+            self._sum += shifted
+            self._sum_sq += shifted * shifted
+            self._count += 1
+        self._buffer[self._position] = shifted
+        self._position = (self._position + 1) % self.window
+        if self._position == 0 and self._count == self.window:
+            self._rebase()
+
+        if self._count == self.window:
+            mean = self._sum / self.window
+            variance = max(self._sum_sq / self.window - mean * mean, 0.0)
+            std = math.sqrt(variance)
+            self.middle = mean + self._shift
+            self.upper = self.middle + self.window_dev * std
+            self.lower = self.middle - self.window_dev * std
+        return self.upper, self.middle, self.lower
+
+    def export_state(self):
+        """Повний стан (вікно, буфер, суми, зсув) як словник простих значень для знімка."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def restore_state(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state[name])
+
+    def _rebase(self):
+        # Раз на вікно: зсув до поточного середнього та точний перерахунок сум.
+        # O(window) раз на window оновлень - амортизовано O(1).
+        delta = self._sum / self.window
+        self._shift += delta
+        self._buffer = [value - delta for value in self._buffer]
+        self._sum = math.fsum(self._buffer)
+        self._sum_sq = math.fsum(value * value for value in self._buffer)
+
+
+class RollingATR:
+    """ATR з O(1) оновленням.
+
+    method='wilder' відтворює `ta.volatility.AverageTrueRange` (0 до заповнення
+    вікна), method='sma' - просте середнє TR, як `computeATR` у js/main.js.
+    """
+
+    __slots__ = ('window', 'method', '_prev_close', '_count', '_tr_sma', 'value')
+
+    def __init__(self, window, method='wilder'):
+        if method not in ('wilder', 'sma'):
+            raise ValueError(f"Невідомий метод ATR: {method}")
+        self.window = window
+        self.method = method
+        self._prev_close = None
+        self._count = 0
+        self._tr_sma = RollingSMA(window)
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        """Додати бар і повернути поточний ATR."""
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self._count += 1
+
+        mean_tr = self._tr_sma.update(true_range)
+        if self.method == 'sma':
+            # У JS ATR дорівнює 0, поки індекс бару менший за період
+            self.value = mean_tr if self._count > self.window else 0.0
+        elif self._count == self.window:
+            self.value = mean_tr
+        elif self._count > self.window:
+            self.value = (self.value * (self.window - 1) + true_range) / self.window
+        return self.value
+
+
+class Supertrend:
+    """Supertrend у семантиці `buildSupertrend` з js/main.js з O(1) оновленням."""
+
+    __slots__ = ('factor', '_atr', '_count', 'up', 'value')
+
+    def __init__(self, period=10, factor=3.0):
+        self.factor = factor
+        self._atr = RollingATR(period, method='sma')
+        self._count = 0
+        self.up = True
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        """Додати бар і повернути (напрям вгору, значення лінії)."""
+        atr = self._atr.update(high, low, close)
+        hl2 = (high + low) / 2
+        upper = hl2 + self.factor * atr
+        lower = hl2 - self.factor * atr
+
+        if self._count > 0:
+            if close > self.value:
+                self.up = True
+            elif close < self.value:
+                self.up = False
+        self._count += 1
+        self.value = lower if self.up else upper
+        return self.up, self.value
+
+
+class StrategyIndicators:
+    """Інкрементальний аналог calculate_indicators для побарової та live-торгівлі."""
+
+    __slots__ = ('ma', 'ma_10', 'bb')
+
+    def __init__(self, ma_window_size, ma_10_window_size, bb_window_size):
+        self.ma = RollingSMA(ma_window_size)
+        self.ma_10 = RollingSMA(ma_10_window_size)
+        self.bb = RollingBollinger(bb_window_size, window_dev=2)
+
+    def update(self, close):
+        """Додати ціну закриття та повернути (ma, ma_10, bb_lower, bb_upper)."""
+        bb_upper, _, bb_lower = self.bb.update(close)
+        return self.ma.update(close), self.ma_10.update(close), bb_lower, bb_upper
+
+    def export_state(self):
+        """Стан усіх індикаторів: оновлення після restore_state дають ті самі значення, що й без перерви."""
+        return {name: getattr(self, name).export_state() for name in self.__slots__}
+
+    def restore_state(self, state):
+        for name in self.__slots__:
+            getattr(self, name).restore_state(state[name])
@@ -214,10 +214,22 @@ const globals_values_create=k=>{ if(!globals_values?.[k]) globals_values[k]=unde
 /* Charts removed */
 
 /* ---------- INDICATOR HELPERS ------------------------------------------ */
+/* prefix sums per (dataset, field): every window sum is O(1) after one pass */
+const prefixCache=new WeakMap();
+function prefixSums(data,f){
+  let byField=prefixCache.get(data);
+  if(!byField){ byField={}; prefixCache.set(data,byField); }
+  if(!byField[f]){
+    const n=data.length, s=new Float64Array(n+1), ss=new Float64Array(n+1);
+    for(let i=0;i<n;i++){ const v=Number(data[i][f]); s[i+1]=s[i]+v; ss[i+1]=ss[i]+v*v; }
+    byField[f]={s,ss};
+  }
+  return byField[f];
+}
 function computeSMA(data,f,p,idx){
   if(idx<p-1) return 0;
-  let s=0; for(let i=idx-p+1;i<=idx;i++) s+=Number(data[i][f]);
-  return recordIndicator(`SMA_${f}_${p}`,idx,s/p);
+  const {s}=prefixSums(data,f);
+  return recordIndicator(`SMA_${f}_${p}`,idx,(s[idx+1]-s[idx+1-p])/p);
 }
 function computeMACD(data,f,fast,slow,idx){
   const v=computeSMA(data,f,fast,idx)-computeSMA(data,f,slow,idx);
@@ -225,12 +237,9 @@ function computeMACD(data,f,fast,slow,idx){
 }
 function computeStdDev(data,f,p,idx){
   if(idx<p-1) return 0;
-  let s=0,ss=0;
-  for(let i=idx-p+1;i<=idx;i++){
-    const v=Number(data[i][f]); s+=v; ss+=v*v;
-  }
-  const m=s/p;
-  return Math.sqrt((ss/p)-m*m);
+  const {s,ss}=prefixSums(data,f);
+  const m=(s[idx+1]-s[idx+1-p])/p;
+  return Math.sqrt(Math.max((ss[idx+1]-ss[idx+1-p])/p-m*m,0));
 }
 function computeBB(data,f,p=20,m=2,idx){
   const mid=computeSMA(data,f,p,idx);
@@ -251,9 +260,20 @@ function trueRange(data,i){
     Math.abs(data[i].Low -data[i-1].Close)
   );
 }
+const trCache=new WeakMap();
+function prefixTR(data){
+  let tr=trCache.get(data);
+  if(!tr){
+    tr=new Float64Array(data.length+1);
+    for(let k=0;k<data.length;k++) tr[k+1]=tr[k]+trueRange(data,k);
+    trCache.set(data,tr);
+  }
+  return tr;
+}
 function computeATR(data,p,i){
   if(i<p) return 0;
-  let s=0; for(let k=i-p+1;k<=i;k++) s+=trueRange(data,k); return s/p;
+  const tr=prefixTR(data);
+  return (tr[i+1]-tr[i+1-p])/p;
 }
 function buildSupertrend(data,p,f){
   const key=`${p}_${f}`; if(supertrendCache[key]) return supertrendCache[key];
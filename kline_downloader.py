@@ -0,0 +1,193 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+
+# Ліміт ваги запитів Binance Spot REST на хвилину (на IP)
+DEFAULT_WEIGHT_PER_MINUTE = 6000
+
+# HTTP-коди, після яких запит варто повторити
+RETRYABLE_STATUS_CODES = {418, 429, 500, 502, 503, 504}
+
+# Тривалість інтервалів Binance у мілісекундах
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+
+def interval_to_ms(interval):
+    """Перетворити інтервал Binance (наприклад '15m') на мілісекунди."""
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Невідомий інтервал: {interval}") from None
+
+
+class KlineDownloadError(Exception):
+    """Сторінку клайнів не вдалося завантажити після всіх повторів."""
+
+
+def klines_request_weight(limit):
+    """Вага запиту GET /api/v3/klines залежно від ліміту."""
+    if limit <= 100:
+        return 1
+    if limit <= 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def plan_pages(start_ts, end_ts, interval_ms, limit=1000):
+    """Заздалегідь розбити діапазон [start_ts, end_ts] на сторінки по `limit` барів."""
+    span = interval_ms * limit
+    pages = []
+    page_start = start_ts
+    while page_start <= end_ts:
+        page_end = min(page_start + span - 1, end_ts)
+        pages.append((page_start, page_end))
+        page_start += span
+    return pages
+
+
+class RequestWeightLimiter:
+    """Потокобезпечний бюджет ваги запитів у ковзному вікні."""
+
+    def __init__(self, max_weight=DEFAULT_WEIGHT_PER_MINUTE, window=60.0, safety=0.8):
+        self.max_weight = max_weight * safety  # Запас, щоб не впиратися у жорсткий ліміт
+        self.window = window
+        self._spent = deque()
+        self._spent_total = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, weight):
+        """Заблокувати потік, доки у вікні не з'явиться місце для `weight`."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._spent and now - self._spent[0][0] >= self.window:
+                    self._spent_total -= self._spent.popleft()[1]
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._spent_total + weight <= self.max_weight or not self._spent:
+                    self._spent.append((now, weight))
+                    self._spent_total += weight
+                    return
+                else:
+                    wait = self.window - (now - self._spent[0][0])
+                self._condition.wait(timeout=max(wait, 0.001))
+
+    def pause(self, seconds):
+        """Призупинити всі запити (після 429/418 від Binance)."""
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+
+def _retry_after(exception):
+    """Значення Retry-After у секундах з відповіді Binance або None."""
+    response = getattr(exception, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_page(client, symbol, interval, page_start, page_end, limit, limiter,
+               max_retries=5, backoff=0.5):
+    """Завантажити одну сторінку клайнів з повторами та експоненційною затримкою."""
+    from binance.exceptions import BinanceAPIException, BinanceRequestException
+
+    weight = klines_request_weight(limit)
+    for attempt in range(max_retries + 1):
+        limiter.acquire(weight)
+        try:
+            return client.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=limit,
+                startTime=page_start,
+                endTime=page_end
+            )
+        except BinanceAPIException as e:
+            if e.status_code not in RETRYABLE_STATUS_CODES:
+                raise
+            error = e
+            retry_after = _retry_after(e)
+            if e.status_code in (418, 429):
+                # Binance просить пригальмувати: зупиняємо весь пул, а не лише цей потік
+                limiter.pause(retry_after or backoff * 2 ** attempt)
+        except (BinanceRequestException, requests.exceptions.RequestException) as e:
+            error = e
+            retry_after = None
+
+        if attempt == max_retries:
+            break
+        delay = retry_after or backoff * 2 ** attempt * (1 + random.random() * 0.25)
+        logging.warning(f"Помилка завантаження сторінки {pd.to_datetime(page_start, unit='ms')}: {error}. Повтор через {delay:.2f} с.")
+        time.sleep(delay)
+
+    raise KlineDownloadError(f"Не вдалося завантажити клайни {symbol} {interval} з {pd.to_datetime(page_start, unit='ms')}: {error}")
+
+
+def download_klines(client, symbol, interval, start_ts=None, end_ts=None, limit=1000,
+                    max_workers=8, limiter=None, max_retries=5, backoff=0.5):
+    """Паралельно завантажити клайни за діапазон і повернути їх упорядкованими без дублікатів."""
+    step = interval_to_ms(interval)
+    if end_ts is None:
+        end_ts = int(time.time() * 1000)
+    if start_ts is None:
+        start_ts = end_ts - limit * step
+    limiter = limiter or RequestWeightLimiter()
+
+    pages = plan_pages(start_ts, end_ts, step, limit)
+    if not pages:
+        return []
+    logging.info(f"Завантаження {symbol} {interval}: {len(pages)} сторінок у {min(max_workers, len(pages))} потоках.")
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(pages)))
+    try:
+        futures = [
+            executor.submit(fetch_page, client, symbol, interval, page_start, page_end, limit, limiter,
+                            max_retries, backoff)
+            for page_start, page_end in pages
+        ]
+        results = [future.result() for future in futures]
+    finally:
+        # Після першої фатальної помилки решта сторінок не запускається
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # Впорядковане складання з видаленням перекриттів за часом відкриття
+    klines = []
+    last_open_time = None
+    for page in results:
+        for kline in page:
+            if last_open_time is not None and kline[0] <= last_open_time:
+                continue
+            klines.append(kline)
+            last_open_time = kline[0]
+
+    logging.info(f"Загальна кількість завантажених клінів: {len(klines)}")
+    return klines
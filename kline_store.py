@@ -0,0 +1,183 @@
+import argparse
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_source import (KLINE_COLUMNS, columns_to_frame, empty_columns, load_columns, parse_date_ms,
+                         parse_ohlcv_csv, read_columns_meta, save_columns, sort_unique)
+from kline_downloader import download_klines, interval_to_ms
+from resample import cached_resample
+
+
+def klines_to_columns(klines):
+    """Перетворити сирі клайни Binance на словник типізованих колонок."""
+    if not klines:
+        return empty_columns()
+    raw = np.asarray([kline[:6] for kline in klines], dtype=object)
+    columns = {'timestamp': raw[:, 0].astype(np.int64)}
+    for position, column in enumerate(KLINE_COLUMNS[1:], start=1):
+        columns[column] = raw[:, position].astype(np.float64)
+    return columns
+
+
+class KlineStore:
+    """Локальний колонковий кеш клайнів на диску для кожної пари (символ, інтервал)."""
+
+    def __init__(self, root='kline_cache'):
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def read_meta(self, symbol, interval):
+        """Прочитати метадані кешу (покритий діапазон запитів) або None."""
+        return read_columns_meta(self.path(symbol, interval))
+
+    def load(self, symbol, interval, mmap=True):
+        """Завантажити всі кешовані колонки (memory-mapped) або None, якщо кешу немає."""
+        return load_columns(self.path(symbol, interval), mmap=mmap)
+
+    def save(self, symbol, interval, columns, covered_start, covered_end):
+        """Атомарно перезаписати кеш для пари (символ, інтервал)."""
+        save_columns(self.path(symbol, interval), columns, {
+            'symbol': symbol.upper(),
+            'interval': interval,
+            'covered_start': int(covered_start),
+            'covered_end': int(covered_end),
+        })
+
+    def merge(self, symbol, interval, columns, covered_start, covered_end):
+        """Об'єднати нові колонки з кешем, впорядкувати за часом та прибрати дублікати."""
+        cached = self.load(symbol, interval, mmap=False)
+        meta = self.read_meta(symbol, interval)
+        if cached is not None:
+            merged = {column: np.concatenate([cached[column], columns[column]]) for column in KLINE_COLUMNS}
+            covered_start = min(covered_start, meta['covered_start'])
+            covered_end = max(covered_end, meta['covered_end'])
+        else:
+            merged = columns
+
+        # При дублікатах перемагає новіший запис (він іде пізніше)
+        merged = sort_unique(merged)
+
+        self.save(symbol, interval, merged, covered_start, covered_end)
+        return merged
+
+    def missing_ranges(self, symbol, interval, start_ts, end_ts):
+        """Повернути діапазони [start, end], яких бракує в кеші; кеш лишається суцільним."""
+        meta = self.read_meta(symbol, interval)
+        if meta is None:
+            return [(start_ts, end_ts)]
+
+        ranges = []
+        if start_ts < meta['covered_start']:
+            ranges.append((start_ts, meta['covered_start'] - 1))
+        if end_ts > meta['covered_end']:
+            ranges.append((meta['covered_end'] + 1, end_ts))
+        return ranges
+
+    def get(self, client, symbol, interval, start_ts=None, end_ts=None, limit=1000, fetch=None):
+        """Віддати клайни за діапазон з кешу, довантаживши лише відсутні голову та хвіст."""
+        fetch = fetch or download_klines
+        step = interval_to_ms(interval)
+        now_ms = int(time.time() * 1000)
+        if end_ts is None:
+            end_ts = now_ms
+        if start_ts is None:
+            start_ts = end_ts - limit * step
+
+        for gap_start, gap_end in self.missing_ranges(symbol, interval, start_ts, end_ts):
+            # Бари з часом відкриття не пізніше now - step вже закриті й не зміняться
+            completed_end = min(gap_end, now_ms - step)
+            if completed_end < gap_start:
+                continue
+            logging.info(f"Кеш {symbol} {interval}: довантаження {pd.to_datetime(gap_start, unit='ms')} - {pd.to_datetime(completed_end, unit='ms')}")
+            klines = fetch(client, symbol, interval, start_ts=gap_start, end_ts=completed_end, limit=limit)
+            klines = [kline for kline in klines if gap_start <= kline[0] <= completed_end]
+            self.merge(symbol, interval, klines_to_columns(klines), gap_start, completed_end)
+
+        cached = self.load(symbol, interval)
+        if cached is None:
+            return columns_to_frame(empty_columns())
+
+        timestamps = cached['timestamp']
+        first = int(np.searchsorted(timestamps, start_ts, side='left'))
+        last = int(np.searchsorted(timestamps, end_ts, side='right'))
+        # Копія зрізу, щоб не тримати відкритий memory map після повернення
+        return columns_to_frame({column: np.array(cached[column][first:last]) for column in KLINE_COLUMNS})
+
+    def get_resampled(self, client, symbol, interval, timeframe, start_ts=None, end_ts=None, limit=1000, fetch=None):
+        """Бари таймфрейму `timeframe`, зібрані з кешу `interval` без окремого завантаження.
+
+        Агреговані колонки кешуються поруч (`<interval>.<timeframe>`) і
+        перебудовуються лише тоді, коли змінився покритий діапазон базового кешу.
+        """
+        if end_ts is None:
+            end_ts = int(time.time() * 1000)
+        if start_ts is None:
+            start_ts = end_ts - limit * interval_to_ms(timeframe)  # `limit` барів старшого таймфрейму
+        self.get(client, symbol, interval, start_ts=start_ts, end_ts=end_ts, limit=limit, fetch=fetch)
+        cached = self.load(symbol, interval)
+        if cached is None:
+            return columns_to_frame(empty_columns())
+        meta = self.read_meta(symbol, interval)
+        source = {'base_rows': meta['rows'], 'covered_start': meta['covered_start'], 'covered_end': meta['covered_end']}
+        columns = cached_resample(f"{self.path(symbol, interval)}.{timeframe}", cached, timeframe, source)
+
+        timestamps = columns['timestamp']
+        first = int(np.searchsorted(timestamps, start_ts, side='left'))
+        last = int(np.searchsorted(timestamps, end_ts, side='right'))
+        return columns_to_frame({column: np.array(columns[column][first:last]) for column in KLINE_COLUMNS})
+
+    def seed_from_csv(self, path, symbol, interval):
+        """Заповнити кеш з CSV у форматі Time,Open,High,Low,Close,Volume."""
+        columns = parse_ohlcv_csv(path)
+        seed_start, seed_end = int(columns['timestamp'][0]), int(columns['timestamp'][-1])
+
+        # Покритий діапазон має лишатися суцільним, тож CSV повинен торкатися кешу
+        meta = self.read_meta(symbol, interval)
+        step = interval_to_ms(interval)
+        if meta is not None and (seed_start > meta['covered_end'] + step or seed_end < meta['covered_start'] - step):
+            raise ValueError(f"CSV '{path}' не перетинається з кешованим діапазоном {symbol} {interval}.")
+
+        merged = self.merge(symbol, interval, columns, seed_start, seed_end)
+        logging.info(f"Кеш {symbol} {interval} заповнено з '{path}': {len(merged['timestamp'])} рядків.")
+        return merged
+
+
+def get_historical_data(client, symbol, interval, start_date=None, end_date=None, limit=1000, store=None,
+                        timeframe=None):
+    """Отримати історичні дані з Binance через локальний кеш клайнів.
+
+    Кешовані діапазони віддаються з диска, з Binance довантажуються лише
+    прогалини, тож з LazyClient клієнт створюється лише тоді, коли вони є.
+    З `timeframe`, відмінним від `interval`, бари агрегуються з кешу `interval`.
+    """
+    try:
+        start_ts = parse_date_ms(start_date)
+        end_ts = parse_date_ms(end_date)
+    except ValueError as e:
+        logging.error(f"Помилка парсингу дати: {e}")
+        raise
+    store = store or KlineStore()
+    if timeframe and timeframe != interval:
+        data = store.get_resampled(client, symbol, interval, timeframe, start_ts=start_ts, end_ts=end_ts, limit=limit)
+    else:
+        data = store.get(client, symbol, interval, start_ts=start_ts, end_ts=end_ts, limit=limit)
+    logging.info(f"Загальна кількість отриманих даних: {len(data)}")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Заповнення локального кешу клайнів з CSV')
+    parser.add_argument('csv', help='Шлях до CSV у форматі Time,Open,High,Low,Close,Volume')
+    parser.add_argument('--symbol', required=True, help='Торгова пара, наприклад BTCUSDT')
+    parser.add_argument('--interval', default='15m', help='Таймфрейм даних у CSV')
+    parser.add_argument('--root', default='kline_cache', help='Каталог кешу')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    KlineStore(args.root).seed_from_csv(args.csv, args.symbol, args.interval)
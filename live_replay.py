@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import numpy as np
+import websockets
+
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv, parse_ohlcv_csv
+from exchange import PaperExchange
+from indicators import calculate_indicators
+from kline_downloader import interval_to_ms
+from live_trader import LiveTrader
+
+
+class ReplayClient:
+    """Заміна binance Client для офлайн-тестів: get_klines з колонок CSV."""
+
+    def __init__(self, columns, interval='15m'):
+        self.columns = columns
+        self.step = interval_to_ms(interval)
+
+    def kline(self, position):
+        """Клайн у форматі REST API Binance (рядки цін, як повертає біржа)."""
+        open_time = int(self.columns['timestamp'][position])
+        return [
+            open_time,
+            *(repr(float(self.columns[column][position])) for column in ('open', 'high', 'low', 'close', 'volume')),
+            open_time + self.step - 1,
+            '0', 0, '0', '0', '0',
+        ]
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        timestamps = self.columns['timestamp']
+        first = int(np.searchsorted(timestamps, startTime, side='left')) if startTime is not None else 0
+        last = int(np.searchsorted(timestamps, endTime, side='right')) if endTime is not None else len(timestamps)
+        return [self.kline(position) for position in range(first, min(last, first + limit))]
+
+
+class ReplayKlineServer:
+    """Локальний WebSocket, що відтворює бари CSV у форматі потоку kline Binance.
+
+    Для кожного бару надсилається незакрите оновлення (x=false) і закритий
+    бар (x=true) з часом події E = поточний час, щоб вимірювати затримку.
+    Позиції з `drop` пропускаються - так перевіряється довантаження прогалин.
+    """
+
+    def __init__(self, columns, start, stop=None, symbol='BTCUSDT', interval='15m', delay=0.0, drop=()):
+        self.columns = columns
+        self.start = start
+        self.stop = len(columns['timestamp']) if stop is None else stop
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.step = interval_to_ms(interval)
+        self.delay = delay
+        self.drop = set(drop)
+        self.now_ms = int(columns['timestamp'][start])  # Час "біржі": бар start ще не закрився
+        self.server = None
+
+    def clock(self):
+        return self.now_ms
+
+    @property
+    def url(self):
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/ws/{{symbol}}@kline_{{interval}}"
+
+    def event(self, position, closed):
+        columns = self.columns
+        open_time = int(columns['timestamp'][position])
+        return json.dumps({
+            'e': 'kline',
+            'E': int(time.time() * 1000),
+            's': self.symbol,
+            'k': {
+                't': open_time,
+                'T': open_time + self.step - 1,
+                's': self.symbol,
+                'i': self.interval,
+                'o': repr(float(columns['open'][position])),
+                'c': repr(float(columns['close'][position])),
+                'h': repr(float(columns['high'][position])),
+                'l': repr(float(columns['low'][position])),
+                'v': repr(float(columns['volume'][position])),
+                'x': closed,
+            },
+        })
+
+    async def _handler(self, websocket):
+        for position in range(self.start, self.stop):
+            self.now_ms = int(self.columns['timestamp'][position]) + self.step
+            if position in self.drop:
+                continue
+            await websocket.send(self.event(position, closed=False))
+            await websocket.send(self.event(position, closed=True))
+            if self.delay:
+                await asyncio.sleep(self.delay)
+
+    async def __aenter__(self):
+        self.server = await websockets.serve(self._handler, '127.0.0.1', 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def replay(columns, start, stop, windows, params=None, interval='15m', symbol='BTCUSDT', delay=0.0, drop=(),
+                 checkpoint=None, trade_sink=None):
+    """Paper trading на відтворених барах [start, stop); повертає LiveTrader після завершення.
+
+    Зі знімком `checkpoint` трейдер продовжує зі збереженого стану, як після перезапуску;
+    угоди до знімка продовжуються у приймачі `trade_sink` (той самий файл, що й до перезапуску).
+    """
+    async with ReplayKlineServer(columns, start, stop, symbol=symbol, interval=interval, delay=delay,
+                                 drop=drop) as server:
+        trader = LiveTrader(ReplayClient(columns, interval), symbol, interval, PaperExchange(symbol),
+                            params or {}, windows, warmup_bars=start, stream_url=server.url, clock=server.clock,
+                            max_bars=len(set(range(start, stop)) - set(drop)), checkpoint=checkpoint,
+                            trade_sink=trade_sink)
+        await trader.run()
+    return trader
+
+
+def backtest_reference(path, start, stop, windows, params=None):
+    """Бек-тест на барах [start, stop) CSV з індикаторами calculate_indicators - еталон для replay()."""
+    data = calculate_indicators(load_ohlcv(path).iloc[:stop][['close']].copy(), *windows)
+    engine = BacktestEngine.from_params(data, params or {}, log=lambda message: None)
+    engine.run(start=start)
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Офлайн paper trading: відтворення CSV через локальний WebSocket')
+    parser.add_argument('csv', help='CSV у форматі Time,Open,High,Low,Close,Volume')
+    parser.add_argument('--start', type=int, default=1000, help='Кількість барів для прогріву перед потоком')
+    parser.add_argument('--bars', type=int, default=2000, help='Кількість барів у потоці')
+    parser.add_argument('--windows', default='320,10,320', help='Вікна MA, MA10 та BB через кому')
+    parser.add_argument('--interval', default='15m', help='Таймфрейм даних у CSV')
+    parser.add_argument('--delay', type=float, default=0.002, help='Пауза між барами, с (0 - якнайшвидше)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    columns = parse_ohlcv_csv(args.csv)
+    windows = tuple(int(value) for value in args.windows.split(','))
+    stop = min(args.start + args.bars, len(columns['timestamp']))
+    trader = asyncio.run(replay(columns, args.start, stop, windows, interval=args.interval, delay=args.delay))
+
+    # Бек-тест з індикаторами calculate_indicators на тих самих барах має дати ті самі угоди
+    engine = trader.engine
+    backtest = backtest_reference(args.csv, args.start, stop, windows)
+    live_trades = engine.trade_history_frame()
+    backtest_trades = backtest.trade_history_frame()
+    print(f"Барів у потоці: {trader.stream_bars}, угод: {len(live_trades)}, ордерів на paper-біржі: {len(engine.exchange.fills)}")
+    print(f"Збіг з бек-тестом: {live_trades.equals(backtest_trades)}")
+    print(json.dumps(trader.latency.summary(), indent=2))
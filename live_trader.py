@@ -0,0 +1,378 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+import websockets
+
+from backtest_engine import BacktestEngine, engine_params
+from checkpoint import engine_snapshot, read_snapshot, restore_engine, write_snapshot
+from data_source import columns_to_frame
+from exchange import PaperExchange
+from indicators import StrategyIndicators
+from kline_downloader import download_klines, interval_to_ms
+from kline_store import KlineStore, klines_to_columns
+from metrics import instrument_engine, metrics
+
+
+# Потік клайнів Binance Spot для однієї пари
+STREAM_URL = 'wss://stream.binance.com:9443/ws/{symbol}@kline_{interval}'
+
+# Скільки останніх барів тримає LiveEngine для графіку, аналітики та хвоста знімка
+HISTORY_BARS = 20_000
+
+
+class LiveEngine(BacktestEngine):
+    """Рушій стратегії, що доповнюється закритими барами з потоку.
+
+    Індикатори рахуються інкрементально (StrategyIndicators), тож новий бар
+    не потребує повторного завантаження чи перерахунку історії. Зберігаються
+    лише останні `history_bars` барів (не менше за найбільше вікно): пам'ять
+    не росте з часом роботи, а позиції барів (і last_index) зсуваються при обрізанні.
+    """
+
+    def __init__(self, history, ma_window_size, ma_10_window_size, bb_window_size, history_bars=HISTORY_BARS,
+                 **engine_kwargs):
+        self.indicators = StrategyIndicators(ma_window_size, ma_10_window_size, bb_window_size)
+        self.history_bars = max(int(history_bars), ma_window_size + 1, ma_10_window_size + 1, bb_window_size + 1)
+        values = [self.indicators.update(close) for close in history['close'].tolist()]
+        columns = np.array(values, dtype=np.float64).reshape(-1, 4)
+        data = pd.DataFrame({
+            'close': history['close'].to_numpy(dtype=np.float64),
+            'ma': columns[:, 0],
+            'ma_10': columns[:, 1],
+            'bb_lower': columns[:, 2],
+            'bb_upper': columns[:, 3],
+        }, index=history.index).iloc[-self.history_bars:]
+        super().__init__(data, **engine_kwargs)
+
+        # Списки доповнюються за O(1) на бар, на відміну від масивів NumPy
+        self.index = list(self.index)
+        self.close = self.close.tolist()
+        self.ma = self.ma.tolist()
+        self.ma_10 = self.ma_10.tolist()
+        self.bb_lower = self.bb_lower.tolist()
+        self.bb_upper = self.bb_upper.tolist()
+
+    @property
+    def last_open_time(self):
+        return self.index[-1] if self.index else None
+
+    def run(self, start=None, stop=None):
+        """Пакетний прогін недоступний: бари потоку застосовуються по одному через append_bar().
+
+        Історія рушія обрізається, а індикатори вже пройшли всі бари, тож
+        повторний прогін дав би інші рішення, ніж торгівля наживо.
+        """
+        raise TypeError("LiveEngine обробляє бари через append_bar(); для прогону історії - BacktestEngine.")
+
+    def _trim(self):
+        # Найстаріші бари відкидаються пачкою: O(history_bars) раз на history_bars барів - амортизовано O(1)
+        dropped = len(self.close) - self.history_bars
+        for name in ('index', 'close', 'ma', 'ma_10', 'bb_lower', 'bb_upper'):
+            del getattr(self, name)[:dropped]
+        state = self.state
+        if state.last_index is not None:
+            # Бар останнього рішення міг випасти з історії, якщо стратегія довго не виконувалась (should_trade)
+            state.last_index = state.last_index - dropped if state.last_index >= dropped else None
+
+    def append_bar(self, timestamp, close, trade=True):
+        """Додати закритий бар, оновити індикатори та (якщо trade) застосувати стратегію.
+
+        Повертає True, якщо стратегія оцінювалась на цьому барі.
+        """
+        ma, ma_10, bb_lower, bb_upper = self.indicators.update(close)
+        self.index.append(timestamp)
+        self.close.append(float(close))
+        self.ma.append(ma)
+        self.ma_10.append(ma_10)
+        self.bb_lower.append(bb_lower)
+        self.bb_upper.append(bb_upper)
+        if len(self.close) >= 2 * self.history_bars:
+            self._trim()
+
+        i = len(self.close) - 1
+        if not trade or i < 1:
+            return False
+        prev_ma, prev_ma_10, prev_bb_lower = self.ma[i - 1], self.ma_10[i - 1], self.bb_lower[i - 1]
+        # Як і бек-тест, стратегія стартує з першого бару з валідними поточними та попередніми значеннями
+        if not all(map(math.isfinite, (ma, ma_10, bb_lower, bb_upper, prev_ma, prev_ma_10, prev_bb_lower))):
+            return False
+        self.on_bar(i, float(close), ma, ma_10, bb_lower, bb_upper, prev_ma, prev_ma_10, prev_bb_lower)
+        return True
+
+    def snapshot(self, tail_bars=None):
+        """Знімок стану (checkpoint.engine_snapshot) разом зі станом індикаторів і хвостом барів.
+
+        Хвіст (за замовчуванням - найбільше вікно індикаторів) дає відновленому
+        рушію попередні значення для перетинів і графік без завантаження історії.
+        """
+        snapshot = engine_snapshot(self)
+        tail_bars = tail_bars or max(self.indicators.ma.window, self.indicators.ma_10.window, self.indicators.bb.window)
+        first = max(len(self.close) - tail_bars, 0)
+        snapshot['indicators'] = self.indicators.export_state()
+        snapshot['tail'] = {
+            'start': first,
+            'timestamp': [int(pd.Timestamp(timestamp).value // 1_000_000) for timestamp in self.index[first:]],
+            **{name: getattr(self, name)[first:] for name in ('close', 'ma', 'ma_10', 'bb_lower', 'bb_upper')},
+        }
+        return snapshot
+
+    @classmethod
+    def from_snapshot(cls, snapshot, ma_window_size, ma_10_window_size, bb_window_size, **engine_kwargs):
+        """Відновити рушій зі знімка snapshot() без історії: індикатори продовжують з того ж стану."""
+        tail = snapshot['tail']
+        history = pd.DataFrame({'close': tail['close']},
+                               index=pd.DatetimeIndex(pd.to_datetime(tail['timestamp'], unit='ms'), name='timestamp'))
+        engine = cls(history, ma_window_size, ma_10_window_size, bb_window_size, **engine_kwargs)
+        for name in ('ma', 'ma_10', 'bb_lower', 'bb_upper'):
+            setattr(engine, name, [float(value) for value in tail[name]])
+        engine.indicators.restore_state(snapshot['indicators'])
+        bar = snapshot['bar']
+        # Бар останнього рішення старший за хвіст, якщо стратегія довго не торгувала (should_trade)
+        restore_engine(engine, snapshot, bar=bar - tail['start'] if bar is not None and bar >= tail['start'] else None)
+        return engine
+
+    def frame(self, start=0):
+        """Ціни та індикатори барів з позиції `start` як DataFrame (для графіку та історії)."""
+        return pd.DataFrame({
+            'close': self.close[start:],
+            'ma': self.ma[start:],
+            'ma_10': self.ma_10[start:],
+            'bb_lower': self.bb_lower[start:],
+            'bb_upper': self.bb_upper[start:],
+        }, index=pd.DatetimeIndex(self.index[start:], name='timestamp'))
+
+
+class LatencyStats:
+    """Затримки від закриття бару (час події Binance) до рішення стратегії."""
+
+    def __init__(self):
+        self.decision_ms = []
+        self.processing_ms = []
+
+    def record(self, decision_ms, processing_ms):
+        self.decision_ms.append(decision_ms)
+        self.processing_ms.append(processing_ms)
+
+    def summary(self):
+        """Словник з кількістю вимірів та p50/p95/max обох затримок у мс."""
+        result = {'bars': len(self.decision_ms)}
+        for name, values in (('decision', self.decision_ms), ('processing', self.processing_ms)):
+            if values:
+                p50, p95 = np.percentile(values, [50, 95])
+                result.update({f'{name}_p50_ms': float(p50), f'{name}_p95_ms': float(p95),
+                               f'{name}_max_ms': float(max(values))})
+        return result
+
+    def report(self):
+        summary = self.summary()
+        if summary['bars']:
+            logging.info(
+                f"Затримка рішення ({summary['bars']} барів): від закриття бару p50 {summary['decision_p50_ms']:.1f} мс, "
+                f"p95 {summary['decision_p95_ms']:.1f} мс, max {summary['decision_max_ms']:.1f} мс; "
+                f"обробка p50 {summary['processing_p50_ms']:.3f} мс, p95 {summary['processing_p95_ms']:.3f} мс"
+            )
+        return summary
+
+
+class LiveTrader:
+    """Торгівля наживо: прогрів історією через REST, далі закриті клайни з WebSocket.
+
+    Ордери стратегії йдуть через адаптер біржі (PaperExchange для paper
+    trading). Пропущені через розрив з'єднання бари довантажуються через REST.
+    """
+
+    def __init__(self, client, symbol, interval, exchange, params, windows, warmup_bars=1000,
+                 stream_url=STREAM_URL, store=None, clock=None, log=None, on_bar=None,
+                 should_trade=None, max_bars=None, instrument=False, trade_sink=None, checkpoint=None):
+        self.client = client
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.step = interval_to_ms(interval)
+        self.exchange = exchange
+        self.params = params
+        self.windows = windows  # (ma_window_size, ma_10_window_size, bb_window_size)
+        self.warmup_bars = max(int(warmup_bars), max(windows) + 1)
+        self.stream_url = stream_url.format(symbol=self.symbol.lower(), interval=interval)
+        self.store = store
+        self.clock = clock or (lambda: int(time.time() * 1000))  # Поточний час біржі у мс: які бари вже закриті
+        self.log = log or logging.info
+        self.on_bar = on_bar
+        self.should_trade = should_trade or (lambda: True)
+        self.max_bars = max_bars
+        self.instrument = instrument  # Таймери та лічильники на гарячих методах рушія (--profile)
+        self.trade_sink = trade_sink  # Приймач журналу угод (дописування під час торгівлі)
+        self.checkpoint = checkpoint  # Файл знімка стану: оновлюється після кожного бару, відновлюється при старті
+
+        self.engine = None
+        self.latency = LatencyStats()
+        self.stream_bars = 0
+        self._loop = None
+        self._task = None
+        self._stop_requested = False
+
+    def _fetch_closed(self, start_ts, end_ts):
+        """Закриті бари [start_ts, end_ts] як DataFrame (з кешу, якщо він є)."""
+        end_ts = min(end_ts, self.clock() - self.step)
+        if end_ts < start_ts:
+            return columns_to_frame(klines_to_columns([]))
+        if self.store is not None:
+            return self.store.get(self.client, self.symbol, self.interval, start_ts=start_ts, end_ts=end_ts)
+        klines = download_klines(self.client, self.symbol, self.interval, start_ts=start_ts, end_ts=end_ts)
+        return columns_to_frame(klines_to_columns([kline for kline in klines if start_ts <= kline[0] <= end_ts]))
+
+    def warm_up(self):
+        """Завантажити останні закриті бари та прогріти індикатори рушія.
+
+        Якщо є знімок для тієї ж пари, таймфрейму та вікон, рушій відновлюється
+        з нього, а довантажуються лише бари, закриті після знімка.
+        """
+        snapshot = read_snapshot(self.checkpoint) if self.checkpoint else None
+        if snapshot is not None and snapshot.get('symbol') == self.symbol and snapshot.get('interval') == self.interval \
+                and tuple(snapshot.get('windows', ())) == tuple(self.windows):
+            return self.resume(snapshot)
+        if snapshot is not None:
+            logging.warning(f"Знімок '{self.checkpoint}' для іншої пари, таймфрейму або вікон - прогрів з історії.")
+
+        end_ts = self.clock() - self.step
+        with metrics.timer('get_historical_data'):
+            history = self._fetch_closed(end_ts - self.warmup_bars * self.step, end_ts)
+        if len(history) <= max(self.windows):
+            raise ValueError(f"Недостатньо історії для прогріву: {len(history)} барів, потрібно {max(self.windows) + 1}")
+        with metrics.timer('calculate_indicators'):
+            self.engine = LiveEngine(history, *self.windows, log=self.log, exchange=self.exchange,
+                                     trade_sink=self.trade_sink, **engine_params(self.params))
+        if self.instrument:
+            instrument_engine(self.engine)
+        self.log(f"Індикатори прогріто на {len(history)} барах до {history.index[-1]}.")
+        return self.engine
+
+    def resume(self, snapshot):
+        """Відновити рушій зі знімка та догнати бари, закриті після нього."""
+        self.engine = LiveEngine.from_snapshot(snapshot, *self.windows, log=self.log, exchange=self.exchange,
+                                               trade_sink=self.trade_sink, **engine_params(self.params))
+        if self.instrument:
+            instrument_engine(self.engine)
+        last = self.engine.last_open_time
+        self.log(f"Стан відновлено зі знімка '{self.checkpoint}': останній бар {last}, "
+                 f"баланс {self.engine.balance:.2f}, у позиції: {self.engine.holding_coins}.")
+        missing = self._fetch_closed(int(last.value // 1_000_000) + self.step, self.clock() - self.step)
+        for timestamp, close in zip(missing.index, missing['close'].tolist()):
+            self.process_kline({'t': timestamp.value // 1_000_000, 'c': close}, trade=self.should_trade())
+        if len(missing):
+            self.log(f"Догнано {len(missing)} барів після знімка.")
+            self.save_checkpoint()
+        return self.engine
+
+    def save_checkpoint(self):
+        """Атомарно записати знімок стану рушія (якщо задано файл знімка)."""
+        if self.checkpoint is None or self.engine is None:
+            return
+        snapshot = self.engine.snapshot()
+        snapshot.update({'symbol': self.symbol, 'interval': self.interval, 'windows': list(self.windows)})
+        write_snapshot(self.checkpoint, snapshot)
+
+    def process_kline(self, kline, trade=True):
+        """Застосувати закритий бар; дублікати та бари з минулого ігноруються."""
+        timestamp = pd.to_datetime(int(kline['t']), unit='ms')
+        last = self.engine.last_open_time
+        if last is not None and timestamp <= last:
+            return False
+        return self.engine.append_bar(timestamp, float(kline['c']), trade=trade)
+
+    def _backfill(self, open_time):
+        # Бари між останнім відомим і отриманим пропущені через розрив з'єднання
+        last = int(self.engine.last_open_time.value // 1_000_000)
+        if open_time - last <= self.step:
+            return
+        missing = self._fetch_closed(last + self.step, open_time - self.step)
+        logging.warning(f"Пропущено {(open_time - last) // self.step - 1} барів, довантажено {len(missing)} через REST.")
+        for timestamp, close in zip(missing.index, missing['close'].tolist()):
+            self.process_kline({'t': timestamp.value // 1_000_000, 'c': close}, trade=self.should_trade())
+
+    def handle_message(self, message):
+        """Обробити повідомлення потоку; повертає True, коли досягнуто max_bars."""
+        received = time.perf_counter()
+        event = json.loads(message)
+        kline = event.get('k')
+        if event.get('e') != 'kline' or kline is None or not kline.get('x'):
+            return False  # Бар ще формується - рішення приймаються лише на закритих
+
+        open_time = int(kline['t'])
+        if open_time <= self.engine.last_open_time.value // 1_000_000:
+            return False  # Повтор після перепідключення
+        self._backfill(open_time)
+        evaluated = self.process_kline(kline, trade=self.should_trade())
+        if evaluated:
+            # Затримка від часу події (Binance надсилає закритий бар одразу після закриття) за годинником системи
+            decision_ms = time.time() * 1000 - int(event.get('E', kline['T']))
+            processing_ms = (time.perf_counter() - received) * 1000
+            self.latency.record(decision_ms, processing_ms)
+            metrics.observe('decision_latency_seconds', max(decision_ms, 0.0) / 1000)
+            metrics.observe('bar_processing_seconds', processing_ms / 1000)
+        self.save_checkpoint()
+        self.stream_bars += 1
+        if self.on_bar is not None:
+            self.on_bar(self.engine)
+        return self.max_bars is not None and self.stream_bars >= self.max_bars
+
+    async def run(self):
+        """Прогріти рушій і обробляти потік до request_stop() або max_bars."""
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        if self._stop_requested:
+            return self.engine  # request_stop() надійшов до запуску циклу подій
+        try:
+            if self.engine is None:
+                await asyncio.to_thread(self.warm_up)
+            # websockets.connect як асинхронний ітератор перепідключається після розриву
+            async for websocket in websockets.connect(self.stream_url):
+                self.log(f"Підключено до потоку {self.stream_url}")
+                try:
+                    async for message in websocket:
+                        if self.handle_message(message):
+                            return self.engine
+                except websockets.ConnectionClosed as e:
+                    logging.warning(f"З'єднання з потоком розірвано: {e}. Перепідключення.")
+        except asyncio.CancelledError:
+            self.log("Торгівлю наживо зупинено.")
+        finally:
+            self.latency.report()
+        return self.engine
+
+    def start(self):
+        """Запустити run() у власному циклі подій (блокує потік, що викликає)."""
+        return asyncio.run(self.run())
+
+    def request_stop(self):
+        """Зупинити run() з будь-якого потоку."""
+        self._stop_requested = True
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Paper trading стратегії на потоці клайнів Binance')
+    parser.add_argument('--symbol', default='BTCUSDT', help='Торгова пара')
+    parser.add_argument('--interval', default='15m', help='Таймфрейм клайнів')
+    parser.add_argument('--windows', default='320,10,320', help='Вікна MA, MA10 та BB через кому')
+    parser.add_argument('--warmup-bars', type=int, default=1000, help='Кількість історичних барів для прогріву')
+    parser.add_argument('--cache', default='kline_cache', help='Каталог кешу клайнів')
+    parser.add_argument('--checkpoint', help='Файл знімка стану для продовження після перезапуску')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from binance.client import Client
+
+    windows = tuple(int(value) for value in args.windows.split(','))
+    trader = LiveTrader(Client(), args.symbol, args.interval, PaperExchange(args.symbol), {}, windows,
+                        warmup_bars=args.warmup_bars, store=KlineStore(args.cache), checkpoint=args.checkpoint)
+    try:
+        trader.start()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import queue
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """FileHandler, що пише записи пачками: за заповненням буфера, за часом або одразу для ERROR."""
+
+    def __init__(self, filename, capacity=256, flush_interval=1.0, encoding='utf-8'):
+        super().__init__(filename, encoding=encoding)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def emit(self, record):
+        try:
+            self._pending.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._pending) >= self.capacity or record.levelno >= logging.ERROR \
+                or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._pending and self.stream is not None:
+                self.stream.write(''.join(self._pending))
+                self._pending.clear()
+            super().flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener, що скидає буфери обробників, коли черга простоює."""
+
+    def __init__(self, log_queue, *handlers, flush_interval=1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+    def stop(self):
+        if self._thread is not None:  # Повторна зупинка (з atexit після ручної) нічого не робить
+            super().stop()
+
+
+def setup_logging(level=logging.INFO, log_file='trading_bot.log', console=True, capacity=256, flush_interval=1.0):
+    """Налаштувати кореневий логер: консоль і файл обслуговує фоновий потік через чергу.
+
+    Потік, що логує, лише кладе запис у чергу; запис у файл відбувається пачками.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())  # Логи у консоль
+    if log_file:
+        handlers.append(BatchingFileHandler(log_file, capacity=capacity, flush_interval=flush_interval))  # Логи у файл
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(level)
+
+    listener = FlushingQueueListener(log_queue, *handlers, flush_interval=flush_interval)
+    listener.start()
+    # Зупинка слухача дочитує чергу до того, як logging.shutdown закриє файли
+    atexit.register(listener.stop)
+    return listener
+
+
+class GuiLogBuffer:
+    """Кільцевий буфер логу для tk.Text.
+
+    append() можна викликати з будь-якого потоку; віджет оновлюється лише
+    з потоку Tk через root.after пачками, і в ньому лишається не більше
+    `max_lines` останніх рядків.
+    """
+
+    def __init__(self, root, text_widget, max_lines=1000, interval_ms=100):
+        self.root = root
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._pending = deque(maxlen=max_lines)  # Старші повідомлення однаково були б обрізані
+        self._lines = 0
+        self.root.after(self.interval_ms, self._drain)
+
+    def append(self, message):
+        self._pending.append(message)
+
+    def _drain(self):
+        if self._pending:
+            messages = []
+            while self._pending:
+                messages.append(self._pending.popleft())
+            self.text_widget.insert('end', ''.join(f"{message}\n" for message in messages))
+            self._lines += sum(message.count('\n') + 1 for message in messages)
+
+            excess = self._lines - self.max_lines
+            if excess > 0:
+                self.text_widget.delete('1.0', f"{excess + 1}.0")
+                self._lines -= excess
+            self.text_widget.see('end')
+        self.root.after(self.interval_ms, self._drain)
@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Межі кошиків гістограм затримок у секундах (як le у Prometheus)
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+# Префікс назв метрик у форматі Prometheus
+METRIC_PREFIX = 'trading_bot_'
+
+
+class Histogram:
+    """Гістограма з фіксованими кошиками: кількість, сума, максимум та оцінка квантилів."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Останній кошик - +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Верхня межа кошика, у який потрапляє квантиль q (для +Inf - максимум)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Metrics:
+    """Реєстр лічильників і гістограм; потокобезпечний (бот, Tk та HTTP-потік читають/пишуть одночасно)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """Виміряти тривалість блоку як стадію `stage` (гістограма stage_seconds)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, stage=stage)
+
+    def timed(self, stage):
+        """Декоратор: кожен виклик функції вимірюється як стадія `stage`."""
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe('stage_seconds', time.perf_counter() - started, stage=stage)
+            return wrapper
+        return decorate
+
+    def _snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (histogram.count, histogram.total, histogram.max, histogram.quantile(0.5),
+                                histogram.quantile(0.95), list(histogram.counts), histogram.buckets)
+                          for key, histogram in self.histograms.items()}
+        return counters, histograms
+
+    def report(self):
+        """Текстовий звіт: лічильники та стадії з кількістю викликів, сумою, p50/p95/max."""
+        counters, histograms = self._snapshot()
+        lines = ["Звіт профілювання:"]
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(f"  {name}{_format_labels(labels)}: {value}")
+        if histograms:
+            lines.append(f"  {'гістограма':<48}{'викликів':>10}{'сума, с':>11}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}")
+        for (name, labels), (count, total, maximum, p50, p95, _, _) in sorted(histograms.items()):
+            lines.append(f"  {name + _format_labels(labels):<48}{count:>10}{total:>11.3f}"
+                         f"{p50 * 1000:>10.3f}{p95 * 1000:>10.3f}{maximum * 1000:>10.3f}")
+        return '\n'.join(lines)
+
+    def render_prometheus(self):
+        """Метрики у текстовому форматі експозиції Prometheus 0.0.4."""
+        counters, histograms = self._snapshot()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+            for (histogram_name, labels), (count, total, _, _, _, counts, buckets) in sorted(histograms.items()):
+                if histogram_name != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+# Спільний реєстр процесу (як кореневий логер)
+metrics = Metrics()
+
+
+def instrument_engine(engine, registry=None):
+    """Обгорнути гарячі методи рушія таймерами та лічильниками.
+
+    Обгортки ставляться на екземпляр, тож без профілювання цикл рушія
+    не має жодних додаткових витрат.
+    """
+    registry = registry or metrics
+    for stage in ('check_buy_conditions', 'check_sell_conditions'):
+        setattr(engine, stage, registry.timed(stage)(getattr(engine, stage)))
+
+    on_bar = engine.on_bar
+
+    def counted_on_bar(*args):
+        registry.inc('bars_processed_total')
+        return on_bar(*args)
+
+    submit_order = engine.submit_order
+
+    def counted_submit_order(side, quantity, price):
+        registry.inc('orders_placed_total', side=side)
+        fill = submit_order(side, quantity, price)  # OrderRejected пролітає далі, ордер не рахується виконаним
+        registry.inc('orders_filled_total', side=side)
+        return fill
+
+    setup_conditional_orders = engine.setup_conditional_orders
+
+    def counted_setup_conditional_orders(crossing_price):
+        registry.inc('grids_placed_total')
+        return setup_conditional_orders(crossing_price)
+
+    engine.on_bar = counted_on_bar
+    engine.submit_order = counted_submit_order
+    engine.setup_conditional_orders = counted_setup_conditional_orders
+    return engine
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"metrics: {format % args}")
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=None):
+    """Запустити HTTP-ендпоінт /metrics у фоновому потоці-демоні; повертає сервер (shutdown() зупиняє)."""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry or metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logging.info(f"Метрики доступні на http://{host}:{server.server_address[1]}/metrics")
+    return server
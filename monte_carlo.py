@@ -0,0 +1,235 @@
+import argparse
+import csv
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analytics import mark_to_market, trade_cycles
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv
+from indicators import batch_indicators
+from optimizer import INDICATOR_PARAMS, add_sweep_arguments, build_grid, engine_metrics, ranges_from_args, silent
+
+
+# Метрики одного синтетичного шляху
+PATH_FIELDS = ['profit', 'final_equity', 'return_percent', 'max_drawdown', 'max_levels', 'max_depth_percent',
+               'trades', 'open_position']
+
+# Метрики, для яких у підсумку рахуються розподіли
+DISTRIBUTION_FIELDS = ('return_percent', 'max_drawdown', 'max_levels', 'max_depth_percent')
+PERCENTILES = (5, 50, 95)
+
+
+def block_starts(lengths, block_size):
+    """Допустимі початки блоків у зшитому ряді прибутковостей: блок не перетинає межу наборів даних."""
+    starts = []
+    offset = 0
+    for length in lengths:
+        starts.append(offset + np.arange(max(length - block_size + 1, 0)))
+        offset += length
+    starts = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+    if not len(starts):
+        raise ValueError(f"Замало барів для блоків по {block_size}.")
+    return starts
+
+
+def bootstrap_paths(returns, starts, n_paths, bars, block_size, start_price, rng):
+    """Пакет синтетичних шляхів цін (n_paths × bars) блочним бутстрепом логарифмічних прибутковостей.
+
+    Блоки по `block_size` сусідніх прибутковостей зберігають волатильність,
+    кластери та автокореляцію всередині блоку. Всі шляхи генеруються одним
+    набором операцій NumPy без циклу по шляхах.
+    """
+    blocks = -(-(bars - 1) // block_size)
+    chosen = rng.choice(starts, size=(n_paths, blocks))
+    positions = (chosen[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :bars - 1]
+    log_paths = np.cumsum(returns[positions], axis=1)
+    return start_price * np.exp(np.concatenate((np.zeros((n_paths, 1)), log_paths), axis=1))
+
+
+def evaluate_path(columns, position, index, params, balance):
+    """Бек-тест ядром сітки на одному шляху пакета; повертає метрики PATH_FIELDS."""
+    frame = pd.DataFrame({name: values[position] for name, values in columns.items()}, index=index, copy=False)
+    engine = BacktestEngine.from_params(frame, {'balance': balance, **params}, log=silent, kernel=True)
+    engine.run()
+    trades = engine.journal.arrays()
+    curves = mark_to_market(engine.close, index, trades, balance)
+    equity = curves['equity'][engine.warmup:]
+    cycles = trade_cycles(trades, engine.close, index, curves['quantity'], curves['cost'])
+    metrics = engine_metrics(engine, equity, balance)
+    return {
+        'profit': metrics['profit'],
+        'final_equity': metrics['final_equity'],
+        'return_percent': (metrics['final_equity'] / balance - 1) * 100,
+        'max_drawdown': metrics['max_drawdown'],
+        'max_levels': int(cycles['levels'].max()) if len(cycles) else 0,
+        'max_depth_percent': float(cycles['depth_percent'].max()) if len(cycles) else 0.0,
+        'trades': metrics['trades'],
+        'open_position': bool(metrics['open_quantity'] > 0),
+    }
+
+
+# Стан процесу-воркера: прибутковості наборів даних передаються один раз при запуску
+_worker_returns = None
+_worker_starts = None
+_worker_index = None
+_worker_start_price = None
+
+
+def _init_worker(returns, starts, index, start_price):
+    global _worker_returns, _worker_starts, _worker_index, _worker_start_price
+    logging.disable(logging.INFO)
+    _worker_returns = returns
+    _worker_starts = starts
+    _worker_index = index
+    _worker_start_price = start_price
+
+
+def simulate_batch(first_path, seed, n_paths, block_size, grid, balance):
+    """Згенерувати пакет шляхів з власним генератором і прогнати на ньому всі комбінації параметрів.
+
+    Генератор пакета створюється з дочірнього SeedSequence, тож результат
+    не залежить ні від кількості процесів, ні від порядку виконання пакетів,
+    а всі комбінації бачать ті самі шляхи.
+    """
+    rng = np.random.default_rng(seed)
+    paths = bootstrap_paths(_worker_returns, _worker_starts, n_paths, len(_worker_index), block_size,
+                            _worker_start_price, rng)
+    indicators = {}
+    rows = []
+    for params in grid:
+        windows = tuple(params[name] for name in INDICATOR_PARAMS)
+        if windows not in indicators:
+            indicators[windows] = batch_indicators(paths, *windows)
+        for position in range(n_paths):
+            metrics = evaluate_path(indicators[windows], position, _worker_index, params, balance)
+            rows.append({**params, 'path': first_path + position, **metrics})
+    return rows
+
+
+def summarize(rows, grid, balance):
+    """Розподіли метрик по шляхах для кожної комбінації параметрів.
+
+    Рівні сітки циклу рахуються за виконаними ордерами (analytics.trade_cycles) і
+    можуть перевищувати number_of_orders: запам'ятовані ордери переживають перестворення сітки.
+    """
+    by_params = {}
+    for row in rows:
+        by_params.setdefault(tuple(row[name] for name in grid[0]), []).append(row)
+    summary = []
+    for params in grid:
+        selected = by_params.get(tuple(params.values()), [])
+        values = {name: np.array([row[name] for row in selected], dtype=np.float64) for name in PATH_FIELDS}
+        result = {
+            **params,
+            'paths': len(selected),
+            'loss_probability': float(np.mean(values['final_equity'] < balance)),
+            # Ціна пішла нижче останнього рівня сітки ((N - 1) кроків від ціни входу)
+            'below_grid_probability': float(np.mean(
+                values['max_depth_percent'] > (params['number_of_orders'] - 1) * params['order_step_percentage'])),
+            'open_position_probability': float(np.mean(values['open_position'])),
+            'worst_levels': int(values['max_levels'].max()),
+            'worst_drawdown': float(values['max_drawdown'].max()),
+        }
+        for name in DISTRIBUTION_FIELDS:
+            result[f'{name}_mean'] = float(values[name].mean())
+            for percentile, value in zip(PERCENTILES, np.percentile(values[name], PERCENTILES)):
+                result[f'{name}_p{percentile}'] = float(value)
+        summary.append(result)
+    return summary
+
+
+def load_returns(csv_paths, start_date=None, end_date=None, timeframe=None):
+    """Логарифмічні прибутковості close кожного набору даних та перший набір (для ціни й часу старту)."""
+    returns = []
+    first = None
+    for path in csv_paths:
+        data = load_ohlcv(path, start_date=start_date, end_date=end_date, timeframe=timeframe)
+        close = data['close'].to_numpy(dtype=np.float64)
+        returns.append(np.diff(np.log(close)))
+        first = data if first is None else first
+    return returns, first
+
+
+def run_monte_carlo(csv_paths, ranges, output, paths_output=None, n_paths=1000, bars=None, block_size=96,
+                    batch_size=16, seed=0, balance=5000.0, start_date=None, end_date=None, timeframe=None,
+                    workers=None):
+    """Бек-тести на синтетичних шляхах з блочного бутстрепу паралельно у пулі процесів.
+
+    Повертає підсумок по комбінаціях параметрів (розподіли прибутку, просадки та
+    глибини сітки) і записує його в `output`; метрики окремих шляхів - у `paths_output`.
+    """
+    grid = build_grid(ranges)
+    returns, first = load_returns(csv_paths, start_date, end_date, timeframe)
+    starts = block_starts([len(values) for values in returns], block_size)
+    bars = bars or len(first)
+    step = (first.index[1:] - first.index[:-1]).min()
+    index = pd.DatetimeIndex(first.index[0] + step * np.arange(bars), name='timestamp')
+    start_price = float(first['close'].iloc[0])
+
+    batches = [(offset, min(batch_size, n_paths - offset)) for offset in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    started = time.perf_counter()
+    logging.info(f"Monte Carlo: {n_paths} шляхів по {bars} барів (блоки по {block_size}), {len(grid)} комбінацій, "
+                 f"{workers or os.cpu_count()} процесів.")
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(np.concatenate(returns), starts, index, start_price)) as executor:
+        futures = [executor.submit(simulate_batch, offset, batch_seed, size, block_size, grid, balance)
+                   for (offset, size), batch_seed in zip(batches, seeds)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            rows.extend(future.result())
+            if done % max(1, len(batches) // 10) == 0 or done == len(batches):
+                logging.info(f"Виконано {done}/{len(batches)} пакетів за {time.perf_counter() - started:.1f} с.")
+
+    rows.sort(key=lambda row: row['path'])
+    summary = summarize(rows, grid, balance)
+    param_names = list(grid[0])
+    if paths_output:
+        with open(paths_output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=param_names + ['path'] + PATH_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0]))
+        writer.writeheader()
+        writer.writerows(summary)
+
+    for result in summary:
+        logging.info(f"{', '.join(f'{name}={result[name]}' for name in param_names)}: "
+                     f"прибутковість p5/p50/p95 {result['return_percent_p5']:.1f}/{result['return_percent_p50']:.1f}/"
+                     f"{result['return_percent_p95']:.1f}%, просадка p95 {result['max_drawdown_p95']:.1f}% "
+                     f"(гірша {result['worst_drawdown']:.1f}%), рівнів сітки p95 {result['max_levels_p95']:.0f} "
+                     f"(гірше {result['worst_levels']}), збиток у {result['loss_probability']:.1%} шляхів, "
+                     f"ціна нижче сітки у {result['below_grid_probability']:.1%}.")
+    logging.info(f"Monte Carlo завершено за {time.perf_counter() - started:.1f} с. Підсумок у '{output}'.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Стійкість параметрів сітки на синтетичних шляхах (блочний бутстреп)')
+    parser.add_argument('--csv', nargs='+', required=True, help='CSV з даними OHLCV - джерела прибутковостей')
+    parser.add_argument('--from', dest='from_date', help='Початкова дата у форматі YYYY-MM-DD')
+    parser.add_argument('--to', dest='to_date', help='Кінцева дата у форматі YYYY-MM-DD')
+    parser.add_argument('--timeframe', help='Таймфрейм стратегії, напр. 1h (агрегується з даних CSV)')
+    parser.add_argument('--paths', type=int, default=1000, help='Кількість синтетичних шляхів')
+    parser.add_argument('--bars', type=int, default=None, help='Довжина шляху в барах (за замовчуванням - як перший CSV)')
+    parser.add_argument('--block-size', type=int, default=96, help='Довжина блоку бутстрепу в барах (96 × 15m = доба)')
+    parser.add_argument('--batch-size', type=int, default=16, help='Кількість шляхів в одному завданні')
+    parser.add_argument('--seed', type=int, default=0, help='Зерно генератора (результат відтворюваний)')
+    parser.add_argument('--balance', type=float, default=5000.0, help='Початковий баланс')
+    parser.add_argument('--workers', type=int, default=None, help='Кількість процесів (за замовчуванням - усі ядра)')
+    parser.add_argument('--output', default='monte_carlo_summary.csv', help='Файл з розподілами по комбінаціях')
+    parser.add_argument('--paths-output', default=None, help='Файл з метриками кожного шляху')
+    add_sweep_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_monte_carlo(args.csv, ranges_from_args(args), args.output, paths_output=args.paths_output,
+                    n_paths=args.paths, bars=args.bars, block_size=args.block_size, batch_size=args.batch_size,
+                    seed=args.seed, balance=args.balance, start_date=args.from_date, end_date=args.to_date,
+                    timeframe=args.timeframe, workers=args.workers)
@@ -0,0 +1,142 @@
+import argparse
+import csv
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backtest_engine import BacktestEngine, max_drawdown
+from data_source import load_ohlcv
+from indicators import IndicatorCache, dataset_fingerprint
+from sweep_params import (INDICATOR_PARAMS, RESULT_FIELDS, SWEEP_PARAMS, add_sweep_arguments, parse_range,
+                          ranges_from_args)
+from trade_journal import Side
+
+
+def build_grid(ranges):
+    """Декартів добуток діапазонів, впорядкований так, щоб однакові індикатори йшли поруч."""
+    names = sorted(ranges, key=lambda name: (name not in INDICATOR_PARAMS, name))
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[name] for name in names))]
+
+
+def silent(message):
+    """Лог рушія, що нічого не пише (перебори запускають тисячі бек-тестів)."""
+
+
+# Стан процесу-воркера (спільний з walk_forward.py): дані відкриваються один раз через memory map
+_worker_data = None
+_worker_fingerprint = None
+_worker_cache = None
+
+
+def _init_worker(csv_path, start_date, end_date, cache_dir, timeframe=None):
+    global _worker_data, _worker_fingerprint, _worker_cache
+    logging.disable(logging.INFO)
+    # Бінарний кеш CSV вже створено батьківським процесом, тож тут лише memory map
+    _worker_data = load_ohlcv(csv_path, start_date=start_date, end_date=end_date, timeframe=timeframe)
+    _worker_fingerprint = dataset_fingerprint(_worker_data)
+    _worker_cache = IndicatorCache(directory=cache_dir)
+
+
+def worker_indicators(params):
+    """Дані воркера з індикаторами для вікон `params` (з кешу індикаторів процесу)."""
+    return _worker_cache.get(_worker_data, *(params[name] for name in INDICATOR_PARAMS),
+                             fingerprint=_worker_fingerprint)
+
+
+def engine_metrics(engine, equity, balance):
+    """Метрики RESULT_FIELDS прогону `engine` за його кривою капіталу `equity`."""
+    return {
+        'profit': engine.profit,
+        'final_equity': float(equity[-1]) if len(equity) else balance,
+        'max_drawdown': max_drawdown(equity),
+        'trades': len(engine.journal),
+        'buys': engine.journal.count(Side.BUY),
+        'sells': engine.journal.count(Side.SELL),
+        'open_quantity': engine.bought_quantity,
+    }
+
+
+def evaluate(params, balance):
+    """Прогнати один бек-тест і повернути метрики."""
+    engine = BacktestEngine.from_params(worker_indicators(params), {'balance': balance, **params}, log=silent,
+                                        kernel=True)
+    start = max(params['ma_window_size'], params['ma_10_window_size'], params['bb_window_size'])
+    engine.run(start=start)
+    return engine_metrics(engine, engine.equity_curve()[start:], balance)
+
+
+def evaluate_batch(batch, balance):
+    rows = [{**params, **evaluate(params, balance)} for params in batch]
+    return rows, (os.getpid(), _worker_cache.stats())
+
+
+def run_sweep(csv_path, ranges, output, balance=5000.0, start_date=None, end_date=None,
+              workers=None, batch_size=16, rank_by='profit', indicator_cache_dir=None, timeframe=None):
+    """Паралельний перебір параметрів з потоковим записом результатів і фінальним ранжуванням."""
+    grid = build_grid(ranges)
+    columns = list(grid[0]) + RESULT_FIELDS
+
+    # Створення бінарного кешу до запуску воркерів, щоб вони не парсили CSV одночасно
+    load_ohlcv(csv_path, start_date=start_date, end_date=end_date, timeframe=timeframe)
+
+    batches = [grid[i:i + batch_size] for i in range(0, len(grid), batch_size)]
+    partial_path = output + '.partial'
+    results = []
+    cache_stats = {}
+    started = time.perf_counter()
+    logging.info(f"Перебір {len(grid)} комбінацій у {workers or os.cpu_count()} процесах.")
+
+    with open(partial_path, 'w', newline='', encoding='utf-8') as partial, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(csv_path, start_date, end_date, indicator_cache_dir, timeframe)) as executor:
+        writer = csv.DictWriter(partial, fieldnames=columns)
+        writer.writeheader()
+        futures = [executor.submit(evaluate_batch, batch, balance) for batch in batches]
+        for done, future in enumerate(as_completed(futures), start=1):
+            rows, (pid, stats) = future.result()
+            cache_stats[pid] = stats
+            writer.writerows(rows)
+            partial.flush()  # Результати не губляться, якщо перебір перервано
+            results.extend(rows)
+            if done % max(1, len(batches) // 20) == 0 or done == len(batches):
+                logging.info(f"Виконано {len(results)}/{len(grid)} комбінацій за {time.perf_counter() - started:.1f} с.")
+
+    hits = sum(stats['hits'] + stats['disk_hits'] for stats in cache_stats.values())
+    misses = sum(stats['misses'] for stats in cache_stats.values())
+    logging.info(f"Кеш індикаторів: {hits} влучань, {misses} промахів.")
+
+    reverse = rank_by != 'max_drawdown'  # Просадку мінімізуємо, решту метрик - максимізуємо
+    results.sort(key=lambda row: row[rank_by], reverse=reverse)
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['rank'] + columns)
+        writer.writeheader()
+        for rank, row in enumerate(results, start=1):
+            writer.writerow({'rank': rank, **row})
+    os.remove(partial_path)
+
+    logging.info(f"Перебір завершено за {time.perf_counter() - started:.1f} с. Результати у '{output}'.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Багатоядерний перебір параметрів стратегії')
+    parser.add_argument('--csv', required=True, help='CSV з даними OHLCV (Time,Open,High,Low,Close,Volume)')
+    parser.add_argument('--from', dest='from_date', help='Початкова дата у форматі YYYY-MM-DD')
+    parser.add_argument('--to', dest='to_date', help='Кінцева дата у форматі YYYY-MM-DD')
+    parser.add_argument('--timeframe', help='Таймфрейм стратегії, напр. 1h (агрегується з даних CSV)')
+    parser.add_argument('--balance', type=float, default=5000.0, help='Початковий баланс')
+    parser.add_argument('--workers', type=int, default=None, help='Кількість процесів (за замовчуванням - усі ядра)')
+    parser.add_argument('--batch-size', type=int, default=16, help='Кількість комбінацій в одному завданні')
+    parser.add_argument('--rank-by', default='profit', choices=RESULT_FIELDS, help='Метрика для ранжування')
+    parser.add_argument('--output', default='sweep_results.csv', help='Файл з ранжованими результатами')
+    parser.add_argument('--indicator-cache', default=None, help='Каталог для збереження індикаторів між запусками')
+    add_sweep_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_sweep(args.csv, ranges_from_args(args), args.output, balance=args.balance,
+              start_date=args.from_date, end_date=args.to_date, workers=args.workers,
+              batch_size=args.batch_size, rank_by=args.rank_by, indicator_cache_dir=args.indicator_cache,
+              timeframe=args.timeframe)
@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right
+
+
+class GridOrderBook:
+    """Сітка умовних ордерів мартингейла з індексом за ціною.
+
+    Рівні зберігаються у порядку створення разом з індексом, відсортованим
+    за спаданням ціни, тож рівні, яких досягла ціна, знаходяться через bisect.
+    Ордер - це пара (ціна, кількість); як і при порівнянні словників раніше,
+    однакові за значенням ордери вважаються одним і тим самим ордером.
+    Запам'ятовані ордери переживають перестворення сітки - їх очищує лише clear().
+    """
+
+    __slots__ = ('prices', 'quantities', 'filled', 'remembered', '_remembered_keys',
+                 '_levels_by_key', '_order', '_sorted_neg_prices', '_reached')
+
+    def __init__(self):
+        self.remembered = []
+        self._remembered_keys = set()
+        self.set_grid([], [])
+
+    def set_grid(self, prices, quantities):
+        """Замінити сітку новими рівнями (запам'ятовані ордери лишаються)."""
+        self.prices = list(prices)
+        self.quantities = list(quantities)
+        self.filled = [False] * len(self.prices)
+        self._levels_by_key = {}
+        for level, key in enumerate(zip(self.prices, self.quantities)):
+            self._levels_by_key.setdefault(key, []).append(level)
+        # Стабільне сортування: рівні з однаковою ціною лишаються у порядку сітки
+        self._order = sorted(range(len(self.prices)), key=lambda level: -self.prices[level])
+        self._sorted_neg_prices = [-self.prices[level] for level in self._order]
+        self._reached = 0  # Скільки рівнів з початку індексу вже оброблено remember_reached
+
+    def clear(self):
+        """Очистити сітку та запам'ятовані ордери (після продажу)."""
+        self.remembered = []
+        self._remembered_keys = set()
+        self.set_grid([], [])
+
+    def open_orders(self):
+        """Невиконані ордери сітки у порядку створення."""
+        return [(price, quantity) for price, quantity, filled in zip(self.prices, self.quantities, self.filled)
+                if not filled]
+
+    def orders_above(self, price):
+        """Невиконані ордери з ціною строго вище `price` у порядку сітки."""
+        count = bisect_left(self._sorted_neg_prices, -price)
+        return [(self.prices[level], self.quantities[level]) for level in sorted(self._order[:count])
+                if not self.filled[level]]
+
+    def remember_reached(self, price):
+        """Запам'ятати невиконані ордери з ціною >= `price` і повернути нові з них.
+
+        Рівні, оброблені на попередніх барах, уже запам'ятовані або виконані,
+        тож на кожен бар припадає лише bisect, а кожен рівень переглядається один раз.
+        """
+        count = bisect_right(self._sorted_neg_prices, -price)
+        if count <= self._reached:
+            return []
+        remembered = []
+        for level in sorted(self._order[self._reached:count]):
+            if self.filled[level]:
+                continue
+            key = (self.prices[level], self.quantities[level])
+            if key not in self._remembered_keys:
+                self._remembered_keys.add(key)
+                self.remembered.append(key)
+                remembered.append(key)
+        self._reached = count
+        return remembered
+
+    def fill(self, orders):
+        """Прибрати з сітки всі рівні, що збігаються з `orders` за ціною та кількістю."""
+        for key in orders:
+            for level in self._levels_by_key.get(key, ()):
+                self.filled[level] = True
+
+    def export_state(self):
+        """Стан книги як (ціни, кількості, виконані, оброблено рівнів індексу, запам'ятовані) для ядра сітки."""
+        return list(self.prices), list(self.quantities), list(self.filled), self._reached, list(self.remembered)
+
+    def restore_state(self, prices, quantities, filled, reached, remembered):
+        """Відновити стан, отриманий з export_state() або з ядра сітки."""
+        self.set_grid(prices, quantities)
+        self.filled = [bool(value) for value in filled]
+        self._reached = int(reached)
+        self.remembered = [(float(price), float(quantity)) for price, quantity in remembered]
+        self._remembered_keys = set(self.remembered)
+
+    def forget(self, orders):
+        """Прибрати `orders` із запам'ятованих."""
+        keys = set(orders)
+        self.remembered = [key for key in self.remembered if key not in keys]
+        self._remembered_keys -= keys
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+import websockets
+
+from backtest_engine import INDICATOR_COLUMNS, BacktestEngine, engine_params
+from data_source import load_ohlcv
+from exchange import PaperExchange
+from indicators import StrategyIndicators
+from kline_downloader import interval_to_ms
+from kline_store import KlineStore
+from trade_journal import Side
+
+
+# Об'єднаний потік клайнів Binance Spot для кількох пар
+COMBINED_STREAM_URL = 'wss://stream.binance.com:9443/stream?streams={streams}'
+
+# Способи розподілу капіталу між парами
+CAPITAL_MODES = ('partitioned', 'shared')
+
+
+class CapitalPool:
+    """Спільний капітал портфеля.
+
+    Покупка будь-якої пари зменшує залишок, продаж повертає вартість циклу
+    (прибуток, як і у бек-тесті однієї пари, у пул не реінвестується).
+    """
+
+    __slots__ = ('total', 'available', 'max_used')
+
+    def __init__(self, total):
+        self.total = float(total)
+        self.available = self.total
+        self.max_used = 0.0
+
+    def debit(self, amount):
+        self.available -= amount
+        self.max_used = max(self.max_used, self.total - self.available)
+
+    def credit(self, amount):
+        self.available += amount
+
+
+class StreamingEngine(BacktestEngine):
+    """Рушій однієї пари портфеля, що тримає лише поточний бар.
+
+    Пам'ять на пару - стан стратегії, сітка ордерів та буфери індикаторів
+    (O(вікно)), незалежно від тривалості роботи; стратегія викликається з
+    індексом 0, за яким у self.index/self.close лежить поточний бар.
+    """
+
+    def __init__(self, symbol, ma_window_size, ma_10_window_size, bb_window_size, **engine_kwargs):
+        empty = pd.DataFrame({column: [math.nan] for column in INDICATOR_COLUMNS},
+                             index=pd.DatetimeIndex([pd.NaT], name='timestamp'))
+        super().__init__(empty, **engine_kwargs)
+        self.symbol = symbol
+        self.indicators = StrategyIndicators(ma_window_size, ma_10_window_size, bb_window_size)
+        self.index = [None]
+        self.close = [math.nan]
+        self.ma = self.ma_10 = self.bb_lower = self.bb_upper = None  # Історія індикаторів не зберігається
+        self.previous = (math.nan, math.nan, math.nan)
+        self.last_open_time = None
+
+    def update(self, timestamp, close, trade=True):
+        """Додати закритий бар і (якщо trade) застосувати стратегію; True, якщо вона оцінювалась."""
+        ma, ma_10, bb_lower, bb_upper = self.indicators.update(close)
+        prev_ma, prev_ma_10, prev_bb_lower = self.previous
+        self.previous = (ma, ma_10, bb_lower)
+        self.index[0] = timestamp
+        self.close[0] = close
+        self.last_open_time = timestamp
+        if not trade or not all(map(math.isfinite, (ma, ma_10, bb_lower, bb_upper, prev_ma, prev_ma_10, prev_bb_lower))):
+            return False
+        self.on_bar(0, close, ma, ma_10, bb_lower, bb_upper, prev_ma, prev_ma_10, prev_bb_lower)
+        return True
+
+
+class BarFeed:
+    """Спільне джерело барів для всіх пар: бари групуються в пакети за часом відкриття.
+
+    Колонки всіх пар зливаються в одне впорядковане за (час, пара) сховище,
+    тож пакет - це зріз масивів, а не окремий запит для кожної пари.
+    """
+
+    def __init__(self, columns_by_symbol, yield_every=64):
+        self.symbols = list(columns_by_symbol)
+        timestamps = [np.asarray(columns['timestamp'], dtype=np.int64) for columns in columns_by_symbol.values()]
+        closes = [np.asarray(columns['close'], dtype=np.float64) for columns in columns_by_symbol.values()]
+        positions = [np.full(len(values), position, dtype=np.int32) for position, values in enumerate(timestamps)]
+
+        timestamps = np.concatenate(timestamps) if timestamps else np.empty(0, dtype=np.int64)
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int32)
+        order = np.lexsort((positions, timestamps))
+        self.timestamps = timestamps[order]
+        self.positions = positions[order]
+        self.closes = (np.concatenate(closes) if closes else np.empty(0))[order]
+        self.bounds = np.concatenate(([0], np.flatnonzero(np.diff(self.timestamps)) + 1, [len(self.timestamps)]))
+        self.yield_every = yield_every  # Як часто віддавати керування циклу подій
+
+    @classmethod
+    def from_csv(cls, paths, start_date=None, end_date=None, **kwargs):
+        """Джерело з CSV для кожної пари: {символ: шлях}."""
+        columns_by_symbol = {}
+        for symbol, path in paths.items():
+            frame = load_ohlcv(path, start_date=start_date, end_date=end_date)
+            columns_by_symbol[symbol] = {'timestamp': frame.index.as_unit('ms').asi8, 'close': frame['close'].to_numpy()}
+        return cls(columns_by_symbol, **kwargs)
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def batches(self):
+        """Пакети (час відкриття у мс, [(символ, ціна закриття), ...]) у порядку часу."""
+        symbols = self.symbols
+        positions = self.positions.tolist()
+        closes = self.closes.tolist()
+        timestamps = self.timestamps
+        bounds = self.bounds.tolist()
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            yield int(timestamps[first]), [(symbols[positions[k]], closes[k]) for k in range(first, last)]
+
+    async def __aiter__(self):
+        for count, batch in enumerate(self.batches(), start=1):
+            yield batch
+            if count % self.yield_every == 0:
+                await asyncio.sleep(0)
+
+
+class CombinedKlineFeed:
+    """Закриті клайни кількох пар з одного об'єднаного WebSocket Binance.
+
+    Бари одного часу відкриття віддаються одним пакетом, щойно надійшли всі
+    пари (або коли прийшов новіший бар). Пропущені через розрив бари пари
+    довантажуються через REST перед новим баром цієї пари.
+    """
+
+    def __init__(self, client, symbols, interval, store=None, url=COMBINED_STREAM_URL):
+        self.client = client
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self._rank = {symbol: position for position, symbol in enumerate(self.symbols)}
+        self.interval = interval
+        self.step = interval_to_ms(interval)
+        self.store = store or KlineStore()
+        streams = '/'.join(f"{symbol.lower()}@kline_{interval}" for symbol in self.symbols)
+        self.url = url.format(streams=streams)
+        self.last_open = {}
+        self._pending = {}
+
+    def history(self, bars, end_ts):
+        """Останні `bars` закритих барів усіх пар до end_ts як BarFeed (для прогріву)."""
+        columns_by_symbol = {}
+        for symbol in self.symbols:
+            frame = self.store.get(self.client, symbol, self.interval, start_ts=end_ts - bars * self.step, end_ts=end_ts)
+            columns_by_symbol[symbol] = {'timestamp': frame.index.as_unit('ms').asi8, 'close': frame['close'].to_numpy()}
+            if len(frame):
+                self.last_open[symbol] = int(columns_by_symbol[symbol]['timestamp'][-1])
+        return BarFeed(columns_by_symbol)
+
+    def _backfill(self, symbol, open_time):
+        last = self.last_open.get(symbol)
+        if last is None or open_time - last <= self.step:
+            return []
+        frame = self.store.get(self.client, symbol, self.interval, start_ts=last + self.step, end_ts=open_time - self.step)
+        logging.warning(f"{symbol}: пропущено {(open_time - last) // self.step - 1} барів, довантажено {len(frame)} через REST.")
+        return [(int(timestamp), [(symbol, close)])
+                for timestamp, close in zip(frame.index.as_unit('ms').asi8, frame['close'].tolist())]
+
+    def handle_message(self, message):
+        """Розібрати повідомлення потоку та повернути готові пакети."""
+        data = json.loads(message).get('data', {})
+        kline = data.get('k')
+        if data.get('e') != 'kline' or kline is None or not kline.get('x'):
+            return []
+        symbol, open_time = kline['s'], int(kline['t'])
+        if open_time <= self.last_open.get(symbol, -1):
+            return []  # Повтор після перепідключення
+
+        ready = self._backfill(symbol, open_time)
+        self.last_open[symbol] = open_time
+        # Старіші неповні пакети вже не доповняться вчасно - віддаються як є
+        for pending_time in sorted(time for time in self._pending if time < open_time):
+            ready.append((pending_time, self._ordered(self._pending.pop(pending_time))))
+        batch = self._pending.setdefault(open_time, [])
+        batch.append((symbol, float(kline['c'])))
+        if len(batch) == len(self.symbols):
+            ready.append((open_time, self._ordered(self._pending.pop(open_time))))
+        return ready
+
+    def _ordered(self, batch):
+        # Порядок пар у пакеті не залежить від порядку надходження повідомлень
+        return sorted(batch, key=lambda bar: self._rank.get(bar[0], len(self._rank)))
+
+    async def __aiter__(self):
+        async for websocket in websockets.connect(self.url):
+            try:
+                async for message in websocket:
+                    for batch in self.handle_message(message):
+                        yield batch
+            except websockets.ConnectionClosed as e:
+                logging.warning(f"З'єднання з потоком розірвано: {e}. Перепідключення.")
+
+
+class Portfolio:
+    """Стратегія сітки на багатьох парах в одному процесі та одному циклі подій asyncio.
+
+    Джерело барів - єдина задача вводу-виводу; пакет барів розсилається
+    рушіям пар синхронно, у порядку `symbols`, тож при спільному капіталі
+    черговість покупок детермінована. Капітал: 'partitioned' - кожна пара
+    має власну частку, 'shared' - частка визначає розмір сітки, а купівлі
+    обмежені залишком спільного пулу.
+    """
+
+    def __init__(self, symbols, params=None, windows=(320, 10, 320), capital_mode='partitioned',
+                 exchange_factory=None, log=None):
+        if capital_mode not in CAPITAL_MODES:
+            raise ValueError(f"Невідомий режим капіталу: {capital_mode}")
+        if not symbols:
+            raise ValueError("Портфель має містити хоча б одну пару.")
+        kwargs = engine_params(params or {})
+        total = kwargs.pop('initial_balance')
+        self.capital = CapitalPool(total) if capital_mode == 'shared' else None
+        self.capital_mode = capital_mode
+        self.total_balance = total
+        log = log or logging.info
+
+        self.engines = {}
+        for symbol in symbols:
+            self.engines[symbol] = StreamingEngine(
+                symbol, *windows,
+                initial_balance=total / len(symbols),
+                log=lambda message, symbol=symbol: log(f"[{symbol}] {message}"),
+                exchange=exchange_factory(symbol) if exchange_factory is not None else None,
+                capital=self.capital,
+                **kwargs,
+            )
+        self.bars = 0
+
+    def on_batch(self, timestamp, bars, trade=True):
+        """Застосувати пакет барів одного часу відкриття (мс) до відповідних пар."""
+        timestamp = pd.Timestamp(timestamp, unit='ms')
+        engines = self.engines
+        for symbol, close in bars:
+            engine = engines.get(symbol)
+            if engine is None:
+                continue
+            engine.update(timestamp, close, trade)
+        self.bars += len(bars)
+
+    def warm_up(self, feed):
+        """Прогріти індикатори історичними барами без торгівлі."""
+        for timestamp, bars in feed.batches():
+            self.on_batch(timestamp, bars, trade=False)
+
+    async def run(self, feed):
+        """Обробляти пакети з асинхронного джерела до його вичерпання або скасування задачі."""
+        async for timestamp, bars in feed:
+            self.on_batch(timestamp, bars)
+        return self.summary()
+
+    def summary(self):
+        """Підсумок по парах як DataFrame."""
+        rows = []
+        for symbol, engine in self.engines.items():
+            rows.append({
+                'symbol': symbol,
+                'profit': engine.profit,
+                'buys': engine.journal.count(Side.BUY),
+                'sells': engine.journal.count(Side.SELL),
+                'open_quantity': engine.bought_quantity,
+                'open_cost': engine.total_cost,
+                'last_close': engine.last_close,
+            })
+        return pd.DataFrame(rows).set_index('symbol')
+
+
+def _parse_csv_arguments(values):
+    paths = {}
+    for value in values:
+        symbol, separator, path = value.partition('=')
+        if not separator:
+            raise argparse.ArgumentTypeError(f"Очікується СИМВОЛ=шлях.csv, отримано '{value}'")
+        paths[symbol.upper()] = path
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Стратегія сітки на кількох парах в одному процесі')
+    parser.add_argument('--csv', action='append', default=[], metavar='SYMBOL=PATH',
+                        help='Бек-тест: CSV для пари (можна повторювати)')
+    parser.add_argument('--symbols', help='Paper trading наживо: пари через кому, наприклад BTCUSDT,XMRUSDT')
+    parser.add_argument('--interval', default='15m', help='Таймфрейм клайнів')
+    parser.add_argument('--from', dest='from_date', help='Початкова дата бек-тесту YYYY-MM-DD')
+    parser.add_argument('--to', dest='to_date', help='Кінцева дата бек-тесту YYYY-MM-DD')
+    parser.add_argument('--balance', type=float, default=5000.0, help='Загальний капітал портфеля')
+    parser.add_argument('--capital', choices=CAPITAL_MODES, default='partitioned', help='Розподіл капіталу між парами')
+    parser.add_argument('--windows', default='320,10,320', help='Вікна MA, MA10 та BB через кому')
+    parser.add_argument('--warmup-bars', type=int, default=1000, help='Бари історії для прогріву наживо')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    windows = tuple(int(value) for value in args.windows.split(','))
+
+    if args.csv:
+        paths = _parse_csv_arguments(args.csv)
+        portfolio = Portfolio(list(paths), {'balance': args.balance}, windows, args.capital)
+        feed = BarFeed.from_csv(paths, start_date=args.from_date, end_date=args.to_date)
+        summary = asyncio.run(portfolio.run(feed))
+    elif args.symbols:
+        from binance.client import Client
+
+        symbols = [symbol.strip().upper() for symbol in args.symbols.split(',') if symbol.strip()]
+        portfolio = Portfolio(symbols, {'balance': args.balance}, windows, args.capital, exchange_factory=PaperExchange)
+        feed = CombinedKlineFeed(Client(), symbols, args.interval)
+        step = interval_to_ms(args.interval)
+        portfolio.warm_up(feed.history(args.warmup_bars, int(time.time() * 1000) - step))
+        try:
+            asyncio.run(portfolio.run(feed))
+        except KeyboardInterrupt:
+            pass
+        summary = portfolio.summary()
+    else:
+        parser.error('Потрібно вказати --csv або --symbols')
+
+    print(summary.to_string())
+    print(f"Загальний прибуток: {summary['profit'].sum():.2f} USDT")
+    if portfolio.capital is not None:
+        print(f"Максимально задіяний спільний капітал: {portfolio.capital.max_used:.2f} з {portfolio.capital.total:.2f} USDT")
@@ -0,0 +1,260 @@
+import matplotlib.dates as mdates
+import mplcursors
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from trade_journal import JOURNAL_DTYPES, Side
+
+
+# Частка повного діапазону даних, на яку розширюється вісь X, щоб не перемальовувати фон на кожному оновленні
+X_LIMIT_STEP = 0.1
+
+# Запас по осі Y, як стандартні margins у matplotlib
+Y_MARGIN = 0.05
+
+
+def minmax_decimate(y, buckets):
+    """Індекси точок, що зберігають мінімум і максимум у кожному з `buckets` кошиків.
+
+    Лінія з 2·buckets точок візуально не відрізняється від повної, якщо
+    кошиків стільки ж, скільки пікселів по ширині осей (M4/LTTB-подібно).
+    """
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(rows, size)
+    finite = np.isfinite(blocks)
+    offsets = np.arange(rows) * size
+    lows = np.where(finite, blocks, np.inf).argmin(axis=1) + offsets
+    highs = np.where(finite, blocks, -np.inf).argmax(axis=1) + offsets
+    indices = np.unique(np.concatenate(([0, n - 1], lows, highs)))
+    return indices[indices < n]
+
+
+class PriceChart:
+    """Графік ціни, MA, BB, умовних ордерів та угод з постійними artist-ами.
+
+    Оновлення змінює дані наявних ліній і scatter-ів; якщо межі осей не
+    змінились, перемальовуються лише вони поверх збереженого фону (blitting).
+    """
+
+    def __init__(self, figure, ax, canvas):
+        self.figure = figure
+        self.ax = ax
+        self.canvas = canvas
+
+        self.price_line, = ax.plot([], [], label='Ціна', color='blue', animated=True)
+        self.ma_line, = ax.plot([], [], label='MA', color='orange', animated=True)
+        self.ma_10_line, = ax.plot([], [], label='MA 10', color='purple', animated=True)
+        self.bb_upper_line, = ax.plot([], [], label='BB Верхня', color='green', animated=True)
+        self.bb_lower_line, = ax.plot([], [], label='BB Нижня', color='red', animated=True)
+        # Умовні ордери - одна колекція горизонтальних ліній на всю ширину осей, як axhline
+        self.order_lines = LineCollection([], linestyles='--', colors='grey', alpha=0.5,
+                                          transform=ax.get_yaxis_transform(), animated=True)
+        ax.add_collection(self.order_lines, autolim=False)
+        self.buy_scatter = ax.scatter([], [], marker='^', color='green', label='Купівля', animated=True)
+        self.sell_scatter = ax.scatter([], [], marker='v', color='red', label='Продаж', animated=True)
+        self.animated = [self.price_line, self.ma_line, self.ma_10_line, self.bb_upper_line, self.bb_lower_line,
+                         self.order_lines, self.buy_scatter, self.sell_scatter]
+
+        # Форматування осі x для відображення дати та часу
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+
+        # Один курсор на весь час роботи замість нового на кожне оновлення
+        self.cursor = mplcursors.cursor([self.buy_scatter, self.sell_scatter], hover=True)
+        self.cursor.connect("add", self._annotate)
+
+        self._background = None
+        self._legend_key = None
+        self._annotations = []
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.load(None)
+
+    def load(self, data, ma_label='MA', ma_10_label='MA 10'):
+        """Прив'язати графік до нового набору даних і очистити попередній стан."""
+        if data is not None:
+            self.x = mdates.date2num(data.index.to_numpy())
+            self.series = self._columns(data)
+        else:
+            self.x = np.empty(0)
+            self.series = {}
+        # Буфери з запасом ємності для append(); x та series - їх view на завантажені бари
+        self._x_buffer = self.x
+        self._series_buffers = dict(self.series)
+        self.ma_line.set_label(ma_label)
+        self.ma_10_line.set_label(ma_10_label)
+
+        self.trades = {name: np.empty(0, dtype=dtype) for name, dtype in JOURNAL_DTYPES.items()}
+        self._buy_rows = np.empty(0, dtype=np.intp)
+        self._sell_rows = np.empty(0, dtype=np.intp)
+        self._xlim = None
+        self._ylim = None
+        self._legend_key = None
+        for line in (self.price_line, self.ma_line, self.ma_10_line, self.bb_upper_line, self.bb_lower_line):
+            line.set_data([], [])
+        self.order_lines.set_segments([])
+        self.buy_scatter.set_offsets(np.empty((0, 2)))
+        self.sell_scatter.set_offsets(np.empty((0, 2)))
+        for annotation in self._annotations:
+            annotation.remove()
+        self._annotations = []
+
+    def _columns(self, data):
+        return {
+            self.price_line: data['close'].to_numpy(dtype=np.float64),
+            self.ma_line: data['ma'].to_numpy(dtype=np.float64),
+            self.ma_10_line: data['ma_10'].to_numpy(dtype=np.float64),
+            self.bb_upper_line: data['bb_upper'].to_numpy(dtype=np.float64),
+            self.bb_lower_line: data['bb_lower'].to_numpy(dtype=np.float64),
+        }
+
+    def append(self, data):
+        """Дописати нові бари в кінець завантажених даних (торгівля наживо) без скидання графіку.
+
+        Буфери ростуть подвоєнням ємності, тож бар коштує амортизовано O(1).
+        """
+        if not self.series:
+            self.load(data, ma_label=self.ma_line.get_label(), ma_10_label=self.ma_10_line.get_label())
+            return
+        size, count = len(self.x), len(data)
+        if size + count > len(self._x_buffer):
+            capacity = max(2 * len(self._x_buffer), size + count)
+            self._x_buffer = np.resize(self._x_buffer, capacity)
+            self._series_buffers = {line: np.resize(values, capacity) for line, values in self._series_buffers.items()}
+        self._x_buffer[size:size + count] = mdates.date2num(data.index.to_numpy())
+        for line, values in self._columns(data).items():
+            self._series_buffers[line][size:size + count] = values
+        self.x = self._x_buffer[:size + count]
+        self.series = {line: values[:size + count] for line, values in self._series_buffers.items()}
+
+    def clear(self):
+        """Прибрати всі дані з графіку, зберігши межі осей."""
+        self.load(None)
+        self.canvas.draw()
+
+    def update(self, stop, conditional_orders, trades, show_ma=True, show_bb=True):
+        """Показати перші `stop` барів завантажених даних (None - усі) разом з ордерами та угодами.
+
+        `trades` - знімок колонок журналу угод (TradeJournal.snapshot()).
+        """
+        buckets = max(int(self.ax.bbox.width), 1)
+        x = self.x[:stop]
+        y_low, y_high = np.inf, -np.inf
+
+        visible = {self.price_line: True, self.ma_line: show_ma, self.ma_10_line: show_ma,
+                   self.bb_upper_line: show_bb, self.bb_lower_line: show_bb}
+        for line, values in self.series.items():
+            line.set_visible(visible[line])
+            if not visible[line]:
+                continue
+            y = values[:stop]
+            indices = minmax_decimate(y, buckets)
+            line.set_data(x[indices], y[indices])
+            finite = y[indices][np.isfinite(y[indices])]
+            if len(finite):
+                y_low, y_high = min(y_low, finite.min()), max(y_high, finite.max())
+
+        order_prices = [order['price'] for order in conditional_orders]
+        self.order_lines.set_segments([[(0, price), (1, price)] for price in order_prices])
+
+        # Колонки журналу конвертуються у точки векторно, без проходу по угодах
+        self.trades = trades
+        trade_x = mdates.date2num(trades['timestamp'].astype('datetime64[ns]'))
+        is_sell = trades['side'] == Side.SELL
+        self._buy_rows = np.flatnonzero(~is_sell)
+        self._sell_rows = np.flatnonzero(is_sell)
+        for scatter, rows in ((self.buy_scatter, self._buy_rows), (self.sell_scatter, self._sell_rows)):
+            scatter.set_offsets(np.column_stack((trade_x[rows], trades['price'][rows])))
+
+        # З --intrabar угоди виконуються за high/low бару, поза лінією закриття, тож межі по Y
+        # розширюють і ціни угод, і умовні ордери
+        if len(trades['price']):
+            y_low, y_high = min(y_low, trades['price'].min()), max(y_high, trades['price'].max())
+        if order_prices:
+            y_low, y_high = min(y_low, min(order_prices)), max(y_high, max(order_prices))
+
+        changed = self._update_limits(x, y_low, y_high)
+        changed = self._update_legend(show_ma, show_bb) or changed
+        self._render(changed)
+
+    def annotate(self, timestamp, price, text, **kwargs):
+        """Додати текстову позначку в точці (час, ціна)."""
+        self._annotations.append(self.ax.text(mdates.date2num(timestamp), price, text, **kwargs))
+        self.canvas.draw()
+
+    def _update_limits(self, x, y_low, y_high):
+        changed = False
+        if len(x):
+            x_first, x_last = self.x[0], self.x[-1]
+            if self._xlim is None or x[-1] > self._xlim[1]:
+                step = (x_last - x_first) * X_LIMIT_STEP
+                self._xlim = (x_first, max(min(x[-1] + step, x_last), x_first + 1e-3))
+                self.ax.set_xlim(*self._xlim)
+                changed = True
+
+        if np.isfinite(y_low) and np.isfinite(y_high):
+            if self._ylim is None or y_low < self._ylim[0] or y_high > self._ylim[1]:
+                low = y_low if self._ylim is None else min(y_low, self._ylim[0])
+                high = y_high if self._ylim is None else max(y_high, self._ylim[1])
+                margin = (high - low) * Y_MARGIN or abs(high) * Y_MARGIN or 1.0
+                self._ylim = (low - margin, high + margin)
+                self.ax.set_ylim(*self._ylim)
+                changed = True
+        return changed
+
+    def _update_legend(self, show_ma, show_bb):
+        key = (show_ma, show_bb, len(self._buy_rows) > 0, len(self._sell_rows) > 0)
+        if key == self._legend_key:
+            return False
+        self._legend_key = key
+        handles = [self.price_line]
+        if show_ma:
+            handles += [self.ma_line, self.ma_10_line]
+        if show_bb:
+            handles += [self.bb_upper_line, self.bb_lower_line]
+        if key[2]:
+            handles.append(self.buy_scatter)
+        if key[3]:
+            handles.append(self.sell_scatter)
+        self.ax.legend(handles=handles)
+        self.figure.tight_layout()
+        return True
+
+    def _render(self, full):
+        if full or self._background is None:
+            self.canvas.draw()  # Фон і анімовані artist-и малює _on_draw
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
+
+    def _on_draw(self, event):
+        # Після кожного повного малювання (у тому числі від панелі інструментів) зберігаємо фон
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self.animated:
+            self.ax.draw_artist(artist)
+
+    def _annotate(self, sel):
+        trades = self.trades
+        if sel.artist is self.buy_scatter:
+            row = self._buy_rows[sel.index]
+            sel.annotation.set_text(
+                f"Купівля\nЦіна: {trades['price'][row]:.2f} USDT\n"
+                f"Кількість: {trades['quantity'][row]:.6f}\n"
+                f"Ордерів: {trades['orders_executed'][row]}"
+            )
+        else:
+            row = self._sell_rows[sel.index]
+            sel.annotation.set_text(
+                f"Продаж\nЦіна: {trades['price'][row]:.2f} USDT\n"
+                f"Кількість: {trades['quantity'][row]:.6f}\n"
+                f"Прибуток: {trades['profit_percent'][row]:.2f}%"
+            )
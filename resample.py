@@ -0,0 +1,94 @@
+import argparse
+import logging
+
+import numpy as np
+
+from data_source import load_columns, read_columns_meta, save_columns
+from kline_downloader import interval_to_ms
+
+
+# Тижневі бари Binance відкриваються в понеділок 00:00 UTC, а 1970-01-01 - четвер
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60_000
+
+
+def bucket_starts(timestamps, interval):
+    """Час відкриття бару старшого таймфрейму для кожного бару (мс Unix, межі як у Binance)."""
+    step = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval == '1w' else 0
+    return (timestamps - offset) // step * step + offset
+
+
+def base_step(timestamps):
+    """Крок базового ряду: найменша різниця між сусідніми барами (None для одного бару)."""
+    if len(timestamps) < 2:
+        return None
+    return int(np.diff(timestamps).min())
+
+
+def resample_columns(columns, interval):
+    """Зібрати бари таймфрейму `interval` з колонок OHLCV молодшого таймфрейму.
+
+    Межі груп знаходяться одним порівнянням сусідніх міток часу, агрегати -
+    через reduceat: open - перший, high - максимум, low - мінімум, close -
+    останній, volume - сума.
+
+    Неповні групи не відкидаються. Якщо ряд починається не на межі бару, перший
+    бар має мітку цієї межі (раніше за перший базовий бар), але агрегує лише
+    наявні бари: його open - open першого базового бару, а volume - неповний.
+    Так само останній бар може бути неповним (як поточний бар у Binance), а
+    групи, в яких немає жодного базового бару (пропуски), не створюються.
+    """
+    timestamps = columns['timestamp']
+    step = base_step(timestamps)
+    target = interval_to_ms(interval)
+    if step is not None and (target < step or target % step):
+        raise ValueError(f"Таймфрейм {interval} не кратний кроку даних ({step // 60_000} хв).")
+    if step == target or not len(timestamps):
+        return columns
+
+    buckets = bucket_starts(np.asarray(timestamps, dtype=np.int64), interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    return {
+        'timestamp': buckets[starts],
+        'open': np.asarray(columns['open'])[starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': np.asarray(columns['close'])[ends],
+        'volume': np.add.reduceat(columns['volume'], starts),
+    }
+
+
+def cached_resample(directory, columns, interval, source):
+    """Колонки таймфрейму `interval` з кешу `directory` або агрегацією з повторним записом кешу.
+
+    `source` - опис базових даних (розмір і mtime файлу, покритий діапазон тощо);
+    кеш використовується, лише якщо він збігається. Без `source` кеш не ведеться.
+    """
+    if source is not None:
+        meta = read_columns_meta(directory)
+        if meta is not None and meta.get('interval') == interval and \
+                all(meta.get(key) == value for key, value in source.items()):
+            return load_columns(directory)
+
+    resampled = resample_columns(columns, interval)
+    if resampled is not columns and source is not None:
+        try:
+            save_columns(directory, resampled, {'interval': interval, **source})
+        except OSError as e:
+            logging.warning(f"Не вдалося зберегти кеш таймфрейму {interval} '{directory}': {e}")
+    return resampled
+
+
+if __name__ == "__main__":
+    from data_source import load_ohlcv
+
+    parser = argparse.ArgumentParser(description='Побудова та кешування старшого таймфрейму з CSV')
+    parser.add_argument('csv', help='Шлях до CSV у форматі Time,Open,High,Low,Close,Volume')
+    parser.add_argument('timeframes', nargs='+', help='Таймфрейми, наприклад 1h 4h 1d')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for timeframe in args.timeframes:
+        data = load_ohlcv(args.csv, timeframe=timeframe)
+        logging.info(f"{timeframe}: {len(data)} барів з {data.index.min()} до {data.index.max()}")
@@ -0,0 +1,49 @@
+import argparse
+import math
+
+# Лише стандартна бібліотека: cli.py будує аргументи перебору без імпорту pandas і рушія
+
+
+# Параметри, які можна перебирати, та їх типи (значення за замовчуванням - як у TradingBotApp.params)
+SWEEP_PARAMS = {
+    'number_of_orders': (int, '20'),
+    'martingale_factor': (float, '0.1'),
+    'order_step_percentage': (float, '2.0'),
+    'profit_target_percent': (float, '1.9'),
+    'net_profit_target_percent': (float, '4.24'),
+    'purchase_balance_percent': (float, '25.0'),
+    'ma_window_size': (int, '320'),
+    'ma_10_window_size': (int, '10'),
+    'bb_window_size': (int, '320'),
+}
+
+# Параметри, від яких залежать індикатори
+INDICATOR_PARAMS = ('ma_window_size', 'ma_10_window_size', 'bb_window_size')
+
+RESULT_FIELDS = ['profit', 'final_equity', 'max_drawdown', 'trades', 'buys', 'sells', 'open_quantity']
+
+
+def parse_range(text, cast):
+    """Розібрати '10:30:5' (включно), '0.1,0.2,0.3' або одне значення."""
+    text = text.strip()
+    if ':' in text:
+        parts = text.split(':')
+        if len(parts) != 3:
+            raise argparse.ArgumentTypeError(f"Діапазон має формат start:stop:step, отримано '{text}'")
+        start, stop, step = (float(part) for part in parts)
+        if step <= 0:
+            raise argparse.ArgumentTypeError(f"Крок діапазону має бути додатним: '{text}'")
+        count = math.floor((stop - start) / step + 1e-9) + 1
+        values = [start + step * i for i in range(count)]
+        return [cast(round(value, 10)) for value in values]
+    return [cast(value) for value in text.split(',') if value.strip()]
+
+
+def add_sweep_arguments(parser):
+    for name, (cast, default) in SWEEP_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, default=default,
+                            help=f"Значення або діапазон start:stop:step чи список через кому (за замовчуванням {default})")
+
+
+def ranges_from_args(args):
+    return {name: parse_range(getattr(args, name), cast) for name, (cast, _) in SWEEP_PARAMS.items()}
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv
+from indicators import calculate_indicators
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Закріплені результати параметрів за замовчуванням (вікна 320/10/320) на CSV репозиторію:
+# кількість угод і прибуток; самі угоди - у tests/data/baseline_<csv>.csv
+BASELINES = {
+    'btc_binance_15m_main': (162, 669.358049),
+    'XMRUSDT_binance_15m_23-25': (80, 115.402239),
+}
+
+
+@pytest.fixture(scope='module', params=sorted(BASELINES))
+def dataset(request):
+    name = request.param
+    data = calculate_indicators(load_ohlcv(os.path.join(ROOT, f'{name}.csv'))[['close']].copy(), 320, 10, 320)
+    baseline = pd.read_csv(os.path.join(ROOT, 'tests', 'data', f'baseline_{name}.csv'), parse_dates=['timestamp'],
+                           float_precision='round_trip')
+    return name, data, baseline
+
+
+@pytest.mark.parametrize('kernel', [False, True], ids=['loop', 'kernel'])
+def test_matches_baseline(dataset, kernel):
+    name, data, baseline = dataset
+    engine = BacktestEngine(data, log=lambda message: None, kernel=kernel)
+    if kernel and not engine.uses_kernel():
+        pytest.skip('Numba недоступна - ядро сітки не використовується')
+    engine.run()
+    trades = engine.trade_history_frame()
+
+    count, profit = BASELINES[name]
+    assert len(trades) == len(baseline) == count
+    assert engine.profit == pytest.approx(profit, abs=1e-6)
+    assert trades['type'].tolist() == baseline['type'].tolist()
+    assert (trades['timestamp'].to_numpy() == baseline['timestamp'].to_numpy()).all()
+    assert trades['orders_executed'].fillna(0).tolist() == baseline['orders_executed'].fillna(0).astype(int).tolist()
+    # Ціни та кількості - з тих самих формул, допуск лише на відмінності libm між платформами
+    for column in ('price', 'quantity', 'profit_percent', 'fee'):
+        np.testing.assert_allclose(trades[column].to_numpy(dtype=np.float64), baseline[column].to_numpy(dtype=np.float64),
+                                   rtol=1e-9, equal_nan=True, err_msg=column)
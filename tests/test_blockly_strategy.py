@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from blockly_strategy import CompiledStrategy, UnsupportedBlockError, load_strategy_text, read_strategy_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Журнал дій стратегії `test` на btc_binance_15m_main.csv (поле Output конструктора)
+GOLDEN_LOG = os.path.join(ROOT, 'tests', 'data', 'blockly_test_btc_binance_15m_main.log')
+GOLDEN_TRADES = 178
+
+
+def workspace(*blocks):
+    return f'<xml xmlns="https://developers.google.com/blockly/xml">{"".join(blocks)}</xml>'
+
+
+@pytest.fixture(scope='module')
+def simulator():
+    strategy = CompiledStrategy.from_xml(load_strategy_text(os.path.join(ROOT, 'test')))
+    return strategy.run(read_strategy_csv(os.path.join(ROOT, 'btc_binance_15m_main.csv')))
+
+
+def test_tracked_strategy_matches_golden_log(simulator):
+    with open(GOLDEN_LOG, encoding='utf-8') as f:
+        golden = f.read().rstrip('\n').split('\n')
+
+    summary = '\n'.join(golden[-5:])
+    assert summary.startswith('=== RESULT ===')
+    assert simulator.logs[-1] == summary
+    assert len(simulator.trades) == GOLDEN_TRADES
+    assert '\n'.join(simulator.logs).split('\n') == golden
+
+
+@pytest.mark.parametrize('block', [
+    '<block type="controls_for" x="0" y="0"><field name="VAR">i</field></block>',
+    '<block type="procedures_defnoreturn" x="0" y="0"><field name="NAME">do_something</field></block>',
+    '<block type="procedures_callnoreturn" x="0" y="0"><mutation name="do_something"></mutation></block>',
+])
+def test_unsupported_statement_blocks_raise(block):
+    with pytest.raises(UnsupportedBlockError):
+        CompiledStrategy.from_xml(workspace(block))
+
+
+def test_unsupported_value_block_raises():
+    block = ('<block type="buy_action" x="0" y="0"><value name="AMT">'
+             '<block type="procedures_callreturn"><mutation name="amount"></mutation></block></value></block>')
+    with pytest.raises(UnsupportedBlockError):
+        CompiledStrategy.from_xml(workspace(block))
@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+
+import pytest
+
+from backtest_engine import BacktestEngine
+from checkpoint import engine_snapshot, read_snapshot, restore_engine, write_snapshot
+from data_source import load_ohlcv
+from indicators import calculate_indicators
+from trade_journal import CsvTradeSink
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def data():
+    return calculate_indicators(load_ohlcv(os.path.join(ROOT, 'btc_binance_15m_main.csv'))[['close']].copy(),
+                                320, 10, 320)
+
+
+def silent(message):
+    pass
+
+
+@pytest.mark.parametrize('keep', [True, False])
+def test_resume_continues_trade_sink(data, tmp_path, keep):
+    reference = BacktestEngine(data, log=silent)
+    reference.run()
+
+    trades, state = str(tmp_path / 'trades.csv'), str(tmp_path / 'state.json')
+    engine = BacktestEngine(data, log=silent, trade_sink=CsvTradeSink(trades), keep_trades=keep)
+    engine.run(stop=20000)
+    write_snapshot(state, engine_snapshot(engine))
+    # Угоди після знімка до "збою" мають бути відкинуті при відновленні
+    engine.run(start=20000, stop=30000)
+    engine.journal.flush()
+
+    snapshot = read_snapshot(state)
+    assert 'columns' not in snapshot['journal'] and len(json.dumps(snapshot)) < 4096
+
+    resumed = BacktestEngine(data, log=silent, trade_sink=CsvTradeSink(trades), keep_trades=keep)
+    resumed.run(start=restore_engine(resumed, snapshot))
+    resumed.journal.close()
+    assert resumed.profit == reference.profit and resumed.balance == reference.balance
+    assert len(resumed.journal) == len(reference.journal) and resumed.journal.counts == reference.journal.counts
+    assert resumed.trade_history_frame().equals(reference.trade_history_frame())
+
+
+def test_resume_without_sink_warns(data, caplog):
+    engine = BacktestEngine(data, log=silent)
+    engine.run(stop=20000)
+    snapshot = engine_snapshot(engine)
+
+    resumed = BacktestEngine(data, log=silent)
+    with caplog.at_level(logging.WARNING):
+        restore_engine(resumed, snapshot)
+    assert resumed.profit == engine.profit and len(resumed.journal) == 0
+    assert 'не відновлюються' in caplog.text
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_build_parser_does_not_import_heavy_modules():
+    # Окремий процес: у процесі pytest pandas і рушій уже імпортовані іншими тестами
+    code = ("import sys, cli; cli.build_parser(); "
+            "print(','.join(m for m in ('numpy', 'pandas', 'optimizer', 'backtest_engine') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_sweep_arguments_parse_ranges():
+    from cli import build_parser
+    from sweep_params import ranges_from_args
+
+    args = build_parser().parse_args(['sweep', '--csv', 'x.csv', '--order-step-percentage', '1:2:0.5'])
+    assert ranges_from_args(args)['order_step_percentage'] == [1.0, 1.5, 2.0]
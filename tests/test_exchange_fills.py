@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from exchange import BinanceExchange, OrderRejected, PaperExchange
+
+pytest.importorskip('binance')
+
+
+class StubClient:
+    """Клієнт Binance з наперед заданими відповідями create_order (крок лоту 0.001).
+
+    Відповідь - (executedQty, ціна, комісія) і, за потреби, актив комісії (за замовчуванням USDT).
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.orders = []
+
+    def get_symbol_info(self, symbol):
+        return {'baseAsset': 'BTC', 'quoteAsset': 'USDT',
+                'filters': [{'filterType': 'LOT_SIZE', 'stepSize': '0.00100000'}]}
+
+    def create_order(self, **order):
+        self.orders.append(order)
+        executed, price, commission, *asset = self.responses.pop(0)
+        return {'orderId': len(self.orders), 'status': 'FILLED', 'executedQty': executed,
+                'cummulativeQuoteQty': str(float(executed) * price),
+                'fills': [{'commission': commission, 'commissionAsset': asset[0] if asset else 'USDT'}]}
+
+
+class RejectingExchange(PaperExchange):
+    """Paper-біржа, що відхиляє ордери сторін `rejected`."""
+
+    def __init__(self, rejected):
+        super().__init__('BTCUSDT')
+        self.rejected = set(rejected)
+
+    def place_market_order(self, side, quantity, price):
+        if side in self.rejected:
+            raise OrderRejected(f"{side} відхилено")
+        return super().place_market_order(side, quantity, price)
+
+
+def make_engine(responses=None, exchange=None):
+    index = pd.date_range('2024-01-01', periods=4, freq='15min', name='timestamp')
+    data = pd.DataFrame({name: np.full(4, 100.0) for name in ('close', 'ma', 'ma_10', 'bb_lower', 'bb_upper')},
+                        index=index)
+    client = StubClient(responses or [])
+    exchange = exchange or BinanceExchange(client, 'BTCUSDT')
+    engine = BacktestEngine(data, log=lambda message: None, exchange=exchange)
+    engine.setup_conditional_orders(100.0)
+    return engine, client
+
+
+def buy(engine):
+    engine.execute_initial_buy_order(1, 99.0)
+    engine.state.initial_buy_done = True  # Як check_buy_conditions
+    return engine.state.total_cost
+
+
+def test_buy_books_partial_fill():
+    engine, client = make_engine([('1.0005', 101.0, '0.1')])
+    cost = buy(engine)
+
+    # Запитана кількість округлена вниз до кроку лоту, біржа виконала лише частину
+    requested = client.orders[0]['quantity']
+    assert requested == f"{float(requested):.3f}" and float(requested) > 1.0005
+    assert engine.bought_quantity == 1.0005
+    assert cost == pytest.approx(1.0005 * 101.0 + 0.1)
+    assert engine.balance == pytest.approx(5000.0 - cost)
+    trade = engine.journal.records()[0]
+    assert trade['quantity'] == 1.0005 and trade['price'] == pytest.approx(101.0) and trade['fee'] == 0.1
+
+
+def test_base_asset_commission_reduces_bought_quantity():
+    engine, client = make_engine([('1.000', 100.0, '0.001', 'BTC'), ('0.999', 110.0, '0.1')])
+    cost = buy(engine)
+
+    # Комісія в BTC утримана з купленого: у позиції лише монети, що є на рахунку, а вартість - сплачені USDT
+    assert engine.bought_quantity == pytest.approx(0.999)
+    assert cost == pytest.approx(100.0)
+    trade = engine.journal.records()[0]
+    assert trade['quantity'] == pytest.approx(0.999) and trade['fee'] == pytest.approx(0.1)
+
+    engine.sell(2, 110.0, engine.profit_percent_at(110.0))
+    assert client.orders[1]['quantity'] == '0.999'
+    assert not engine.holding_coins and engine.bought_quantity == pytest.approx(0.0)
+    assert engine.profit == pytest.approx(0.999 * 110.0 - 0.1 - 100.0)
+
+
+def test_bnb_commission_is_recorded_apart_from_fee():
+    exchange = BinanceExchange(StubClient([('1.000', 100.0, '0.0005', 'BNB')]), 'BTCUSDT')
+    fill = exchange.place_market_order('BUY', 1.0, 100.0)
+
+    assert fill['quantity'] == 1.0 and fill['fee'] == 0.0
+    assert fill['commissions'] == {'BNB': 0.0005}
+
+
+def test_floored_sell_keeps_dust():
+    engine, client = make_engine([('1.0005', 101.0, '0.1'), ('1.000', 110.0, '0.2')])
+    cost = buy(engine)
+    engine.sell(2, 110.0, engine.profit_percent_at(110.0))
+
+    assert client.orders[1]['quantity'] == '1.000'
+    assert engine.profit == pytest.approx(1.0 * 110.0 - 0.2 - cost * 1.0 / 1.0005)
+    # Залишок менший за крок лоту: цикл завершено, але монети лишаються в позиції наступного циклу
+    assert not engine.holding_coins and not engine.initial_buy_done
+    assert engine.bought_quantity == pytest.approx(0.0005)
+    assert engine.total_cost == pytest.approx(cost * 0.0005 / 1.0005)
+    assert engine.journal.records()[1]['quantity'] == 1.0
+
+
+def test_partial_sell_keeps_position_open():
+    engine, client = make_engine([('1.0005', 101.0, '0.1'), ('0.5', 110.0, '0.0')])
+    cost = buy(engine)
+    engine.sell(2, 110.0, engine.profit_percent_at(110.0))
+
+    assert engine.holding_coins and engine.initial_buy_done
+    assert engine.bought_quantity == pytest.approx(0.5005)
+    assert engine.total_cost == pytest.approx(cost * 0.5005 / 1.0005)
+    assert engine.profit == pytest.approx(0.5 * 110.0 - cost * 0.5 / 1.0005)
+
+
+def test_rejected_buy_leaves_state_unchanged():
+    engine, _ = make_engine(exchange=RejectingExchange({'BUY'}))
+    buy(engine)
+
+    assert not engine.holding_coins and engine.bought_quantity == 0 and engine.balance == 5000.0
+    assert len(engine.journal) == 0 and engine.order_book.open_orders()
+
+
+def test_rejected_sell_keeps_position_and_bar_continues():
+    exchange = RejectingExchange({'SELL'})
+    engine, _ = make_engine(exchange=exchange)
+    cost = buy(engine)
+    # Бар з умовою продажу: відхилення не перериває обробку бару
+    engine.on_bar(2, 110.0, 100.0, 100.0, 90.0, 105.0, 100.0, 100.0, 90.0)
+
+    assert engine.holding_coins and engine.total_cost == cost and len(engine.journal) == 1
+    exchange.rejected.clear()
+    engine.on_bar(3, 110.0, 100.0, 100.0, 90.0, 105.0, 100.0, 100.0, 90.0)
+    assert not engine.holding_coins and len(engine.journal) == 2
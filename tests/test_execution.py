@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv
+from execution import ExecutionModel
+from indicators import calculate_indicators
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def silent(message):
+    pass
+
+
+def test_fee_and_slippage_math():
+    execution = ExecutionModel(fee_rate=0.001, slippage=0.0005)
+
+    assert execution.buy_fill(100.0) == pytest.approx(100.05)
+    assert execution.sell_fill(100.0) == pytest.approx(99.95)
+    assert execution.fee(2000.0) == pytest.approx(2.0)
+    assert execution.cost(2000.0) == pytest.approx(2002.0)
+    assert execution.proceeds(2000.0) == pytest.approx(1998.0)
+    # Без витрат - рівно ціна рішення
+    assert ExecutionModel().buy_fill(123.45) == 123.45 and ExecutionModel().fee(1000.0) == 0.0
+
+
+@pytest.mark.parametrize('kwargs', [{'fee_rate': -0.001}, {'slippage': 1.0}, {'slippage': -0.1}])
+def test_rejects_invalid_costs(kwargs):
+    with pytest.raises(ValueError):
+        ExecutionModel(**kwargs)
+
+
+def flat_bars(closes, highs=None, lows=None):
+    closes = np.asarray(closes, dtype=np.float64)
+    index = pd.date_range('2024-01-01', periods=len(closes), freq='15min', name='timestamp')
+    return pd.DataFrame({'close': closes, 'open': closes,
+                         'high': closes if highs is None else np.asarray(highs, dtype=np.float64),
+                         'low': closes if lows is None else np.asarray(lows, dtype=np.float64),
+                         'ma': 100.0, 'ma_10': 100.0, 'bb_lower': 90.0, 'bb_upper': 1000.0}, index=index)
+
+
+def test_intrabar_high_hits_take_profit_at_threshold():
+    data = flat_bars([100.0, 100.0, 100.0], highs=[100.0, 100.0, 120.0])
+    engine = BacktestEngine(data, log=silent, execution=ExecutionModel(intrabar=True, fee_rate=0.001))
+    engine.setup_conditional_orders(101.0)
+    engine.execute_initial_buy_order(1, 100.0)
+    engine.state.initial_buy_done = True
+    threshold = engine.take_profit_price(1000.0)
+    assert 100.0 < threshold < 120.0
+
+    engine.step(2)
+    # Продаж за тейк-профітом усередині бару, а не за close, що нижчий за поріг
+    sell = engine.journal.records()[-1]
+    assert sell['type'] == 'Sell' and sell['price'] == pytest.approx(threshold)
+    assert sell['profit_percent'] == pytest.approx(engine.net_profit_target_percent)
+    assert not engine.holding_coins
+
+
+def test_intrabar_low_remembers_grid_levels():
+    data = flat_bars([100.0, 100.0, 95.0], lows=[100.0, 100.0, 85.0])
+    engine = BacktestEngine(data, log=silent, execution=ExecutionModel(intrabar=True))
+    engine.setup_conditional_orders(101.0)
+    engine.execute_initial_buy_order(1, 100.0)
+    engine.state.initial_buy_done = True
+
+    engine.step(2)
+    # Мінімум бару нижчий за смугу (90) досягає рівнів до 85, хоча close (95) вище за смугу
+    remembered = [price for price, _ in engine.order_book.remembered]
+    assert remembered and min(remembered) >= 85.0
+    assert all(price <= 100.0 for price in remembered)
+
+
+@pytest.fixture(scope='module', params=['btc_binance_15m_main', 'XMRUSDT_binance_15m_23-25'])
+def ohlc(request):
+    data = load_ohlcv(os.path.join(ROOT, f'{request.param}.csv'))
+    indicators = calculate_indicators(data[['close']].copy(), 320, 10, 320)
+    return indicators.join(data[['open', 'high', 'low']])
+
+
+@pytest.mark.parametrize('execution', [
+    ExecutionModel(intrabar=True),
+    ExecutionModel(fee_rate=0.001, slippage=0.0005),
+    ExecutionModel(intrabar=True, fee_rate=0.001, slippage=0.0005),
+], ids=['intrabar', 'costs', 'intrabar-costs'])
+def test_kernel_matches_loop(ohlc, execution):
+    loop = BacktestEngine(ohlc, log=silent, execution=execution)
+    kernel = BacktestEngine(ohlc, log=silent, execution=execution, kernel=True)
+    if not kernel.uses_kernel():
+        pytest.skip('Numba недоступна - ядро сітки не використовується')
+    loop.run()
+    kernel.run()
+
+    loop_trades, kernel_trades = loop.trade_history_frame(), kernel.trade_history_frame()
+    assert len(loop_trades) > 0
+    assert loop_trades['type'].tolist() == kernel_trades['type'].tolist()
+    assert (loop_trades['timestamp'].to_numpy() == kernel_trades['timestamp'].to_numpy()).all()
+    for column in ('price', 'quantity', 'profit_percent', 'fee'):
+        np.testing.assert_allclose(kernel_trades[column].to_numpy(dtype=np.float64),
+                                   loop_trades[column].to_numpy(dtype=np.float64), rtol=1e-9, equal_nan=True,
+                                   err_msg=column)
+    assert kernel.profit == pytest.approx(loop.profit, rel=1e-9) and kernel.balance == pytest.approx(loop.balance)
+
+
+def test_intrabar_fills_stay_inside_bar_and_costs_reduce_profit(ohlc):
+    plain = BacktestEngine(ohlc, log=silent)
+    intrabar = BacktestEngine(ohlc, log=silent, execution=ExecutionModel(intrabar=True))
+    costly = BacktestEngine(ohlc, log=silent, execution=ExecutionModel(intrabar=True, fee_rate=0.001,
+                                                                       slippage=0.0005))
+    for engine in (plain, intrabar, costly):
+        engine.run()
+
+    trades = intrabar.trade_history_frame().set_index('timestamp')
+    bars = ohlc.loc[trades.index]
+    assert ((trades['price'] >= bars['low'] - 1e-9) & (trades['price'] <= bars['high'] + 1e-9)).all()
+    # Частина продажів виконана всередині бару, а не за close
+    sells = trades[trades['type'] == 'Sell']
+    assert (sells['price'] != bars.loc[sells.index, 'close']).any()
+    assert not plain.trade_history_frame().equals(intrabar.trade_history_frame())
+    assert (costly.trade_history_frame()['fee'] > 0).all()
+    assert costly.profit < intrabar.profit
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+from ta.volatility import AverageTrueRange
+
+from data_source import load_ohlcv
+from indicators import RollingATR, RollingBollinger, RollingSMA, calculate_indicators
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Допуски (відносні): SMA з компенсацією Кехена збігається з `ta` до округлення double;
+# смуги Боллінджера відрізняються від ковзної дисперсії pandas на ~4e-11, тож допуск 1e-9
+SMA_RTOL = 1e-12
+BB_RTOL = 1e-9
+ATR_RTOL = 1e-12
+
+
+@pytest.fixture(scope='module')
+def data():
+    return load_ohlcv(os.path.join(ROOT, 'btc_binance_15m_main.csv'))
+
+
+def assert_series_close(actual, expected, rtol):
+    expected = np.asarray(expected, dtype=np.float64)
+    # NaN до заповнення вікна - у тих самих позиціях
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=rtol, atol=0)
+
+
+def test_streaming_sma_and_bollinger_match_calculate_indicators(data):
+    reference = calculate_indicators(data[['close']].copy(), 320, 10, 320)
+    ma, ma_10, bb = RollingSMA(320), RollingSMA(10), RollingBollinger(320, window_dev=2)
+    close = data['close'].tolist()
+
+    assert_series_close([ma.update(value) for value in close], reference['ma'], SMA_RTOL)
+    assert_series_close([ma_10.update(value) for value in close], reference['ma_10'], SMA_RTOL)
+    bands = np.array([bb.update(value) for value in close])
+    assert_series_close(bands[:, 0], reference['bb_upper'], BB_RTOL)
+    assert_series_close(bands[:, 2], reference['bb_lower'], BB_RTOL)
+
+
+def test_streaming_atr_matches_ta(data):
+    atr = RollingATR(14)
+    values = [atr.update(high, low, close)
+              for high, low, close in zip(data['high'].tolist(), data['low'].tolist(), data['close'].tolist())]
+    expected = AverageTrueRange(data['high'], data['low'], data['close'], window=14).average_true_range()
+
+    assert_series_close(values, expected, ATR_RTOL)
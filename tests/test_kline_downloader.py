@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from kline_downloader import KlineDownloadError, RequestWeightLimiter, download_klines, fetch_page, interval_to_ms
+from live_replay import ReplayClient
+
+exceptions = pytest.importorskip('binance.exceptions')
+
+STEP = interval_to_ms('15m')
+START = 1_700_000_100_000 // STEP * STEP
+
+
+def make_columns(bars):
+    close = 100.0 + np.arange(bars, dtype=np.float64)
+    return {'timestamp': START + STEP * np.arange(bars, dtype=np.int64), 'open': close, 'high': close,
+            'low': close, 'close': close, 'volume': np.ones(bars)}
+
+
+class OverlappingClient(ReplayClient):
+    """Сторінки перекриваються на два бари, а пізніші сторінки повертаються раніше."""
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        time.sleep(max(0.0, 0.02 - (startTime - START) / STEP * 1e-4))
+        return super().get_klines(symbol, interval, limit=limit + 2, startTime=startTime - 2 * STEP, endTime=endTime)
+
+
+class Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = ''
+
+
+def api_error(status_code, retry_after=None):
+    headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    return exceptions.BinanceAPIException(Response(status_code, headers), status_code,
+                                          json.dumps({'code': -1003, 'msg': 'Too many requests'}))
+
+
+class FailingClient(ReplayClient):
+    """Перші запити завершуються помилками `errors`, далі - звичайні сторінки."""
+
+    def __init__(self, columns, errors):
+        super().__init__(columns)
+        self.errors = list(errors)
+        self.calls = 0
+
+    def get_klines(self, *args, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().get_klines(*args, **kwargs)
+
+
+class RecordingLimiter(RequestWeightLimiter):
+    def __init__(self):
+        super().__init__()
+        self.pauses = []
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+        super().pause(seconds)
+
+
+def test_pages_reassembled_in_order_without_duplicates():
+    columns = make_columns(250)
+    klines = download_klines(OverlappingClient(columns), 'BTCUSDT', '15m', start_ts=int(columns['timestamp'][20]),
+                             end_ts=int(columns['timestamp'][-1]), limit=10, max_workers=8)
+    open_times = [kline[0] for kline in klines]
+
+    # Перекриття відкинуто, порядок - за часом відкриття, хоч сторінки завершувались у зворотному порядку
+    assert open_times == sorted(set(open_times))
+    assert open_times == columns['timestamp'][18:].tolist()
+
+
+@pytest.mark.parametrize('status_code, retry_after, expected_pause', [(429, '0.05', 0.05), (418, None, 0.01)])
+def test_throttling_pauses_the_whole_pool(status_code, retry_after, expected_pause):
+    columns = make_columns(20)
+    client = FailingClient(columns, [api_error(status_code, retry_after)])
+    limiter = RecordingLimiter()
+
+    started = time.monotonic()
+    page = fetch_page(client, 'BTCUSDT', '15m', START, START + 9 * STEP, 10, limiter, backoff=0.01)
+    assert len(page) == 10 and client.calls == 2
+    assert limiter.pauses == [pytest.approx(expected_pause)]
+    assert time.monotonic() - started >= expected_pause
+
+    # Поки пауза діє, інші потоки пулу теж чекають
+    limiter.pause(0.1)
+    waited = []
+    worker = threading.Thread(target=lambda: (limiter.acquire(1), waited.append(time.monotonic())))
+    paused_at = time.monotonic()
+    worker.start()
+    worker.join()
+    assert waited[0] - paused_at >= 0.09
+
+
+def test_server_errors_retry_without_pause():
+    client = FailingClient(make_columns(20), [api_error(503)])
+    limiter = RecordingLimiter()
+    assert len(fetch_page(client, 'BTCUSDT', '15m', START, START + 9 * STEP, 10, limiter, backoff=0.001)) == 10
+    assert limiter.pauses == []
+
+
+def test_gives_up_after_retries():
+    client = FailingClient(make_columns(20), [api_error(429, '0.001')] * 3)
+    with pytest.raises(KlineDownloadError):
+        fetch_page(client, 'BTCUSDT', '15m', START, START + 9 * STEP, 10, RecordingLimiter(), max_retries=2)
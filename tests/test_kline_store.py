@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pytest
+
+from kline_downloader import interval_to_ms
+from kline_store import KlineStore, klines_to_columns, parse_date_ms
+from live_replay import ReplayClient
+
+STEP = interval_to_ms('15m')
+START = 1_700_000_100_000 // STEP * STEP
+
+
+def make_columns(bars):
+    close = 100.0 + np.arange(bars, dtype=np.float64)
+    return {'timestamp': START + STEP * np.arange(bars, dtype=np.int64), 'open': close - 0.5, 'high': close + 1.0,
+            'low': close - 1.0, 'close': close, 'volume': np.ones(bars)}
+
+
+class CountingClient(ReplayClient):
+    """ReplayClient, що запам'ятовує діапазони запитів get_klines."""
+
+    def __init__(self, columns):
+        super().__init__(columns)
+        self.requests = []
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        self.requests.append((startTime, endTime))
+        return super().get_klines(symbol, interval, limit=limit, startTime=startTime, endTime=endTime)
+
+
+def ts(position):
+    return START + position * STEP
+
+
+def test_get_fills_only_head_and_tail_gaps(tmp_path):
+    columns = make_columns(600)
+    client = CountingClient(columns)
+    store = KlineStore(str(tmp_path))
+
+    first = store.get(client, 'BTCUSDT', '15m', start_ts=ts(200), end_ts=ts(300), limit=100)
+    assert len(first) == 101 and len(client.requests) == 2  # 101 бар - дві сторінки по 100
+
+    client.requests.clear()
+    data = store.get(client, 'BTCUSDT', '15m', start_ts=ts(100), end_ts=ts(450), limit=1000)
+    # Довантажено лише голову [100, 200) і хвіст (300, 450], середина - з кешу
+    assert client.requests == [(ts(100), ts(200) - 1), (ts(300) + 1, ts(450))]
+    np.testing.assert_array_equal(data['close'].to_numpy(), columns['close'][100:451])
+    assert data.index.is_monotonic_increasing and not data.index.has_duplicates
+    meta = store.read_meta('BTCUSDT', '15m')
+    assert (meta['covered_start'], meta['covered_end']) == (ts(100), ts(450))
+
+    client.requests.clear()
+    store.get(client, 'BTCUSDT', '15m', start_ts=ts(150), end_ts=ts(400))
+    assert client.requests == []
+
+
+def test_merge_orders_and_keeps_newer_duplicates(tmp_path):
+    columns = make_columns(50)
+    client = ReplayClient(columns)
+    store = KlineStore(str(tmp_path))
+    store.merge('BTCUSDT', '15m', klines_to_columns([client.kline(position) for position in range(20, 40)]),
+                ts(20), ts(39))
+
+    revised = [client.kline(position) for position in (35, 10, 30)]
+    revised[0][4] = '999.0'  # Новіша версія бару 35
+    merged = store.merge('BTCUSDT', '15m', klines_to_columns(revised), ts(10), ts(35))
+
+    np.testing.assert_array_equal(merged['timestamp'], np.sort(np.unique(merged['timestamp'])))
+    assert len(merged['timestamp']) == 21
+    assert merged['close'][merged['timestamp'] == ts(35)][0] == 999.0
+
+
+def test_get_rejects_unknown_interval(tmp_path):
+    with pytest.raises(ValueError):
+        KlineStore(str(tmp_path)).get(ReplayClient(make_columns(10)), 'BTCUSDT', '7m')
+
+
+def test_dates_are_utc_regardless_of_local_timezone(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    if hasattr(time, 'tzset'):
+        time.tzset()
+    try:
+        assert parse_date_ms('2024-01-01') == 1_704_067_200_000
+        assert parse_date_ms(None) is None
+    finally:
+        monkeypatch.undo()
+        if hasattr(time, 'tzset'):
+            time.tzset()
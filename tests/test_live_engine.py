@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv
+from indicators import calculate_indicators
+from live_trader import LiveEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def silent(message):
+    pass
+
+
+@pytest.fixture(scope='module')
+def data():
+    return load_ohlcv(os.path.join(ROOT, 'btc_binance_15m_main.csv')).iloc[:12000]
+
+
+def test_history_is_bounded_and_trades_match_backtest(data):
+    start = 1000
+    engine = LiveEngine(data.iloc[:start], 320, 10, 320, history_bars=500, log=silent)
+    lengths = []
+    for timestamp, close in zip(data.index[start:], data['close'].tolist()[start:]):
+        engine.append_bar(timestamp, close)
+        lengths.append(len(engine.close))
+
+    assert max(lengths) < 2 * engine.history_bars
+    assert len(engine.index) == len(engine.ma) == len(engine.bb_upper) == len(engine.close)
+    assert engine.last_timestamp == data.index[-1] and engine.last_close == data['close'].iloc[-1]
+
+    backtest = BacktestEngine(calculate_indicators(data[['close']].copy(), 320, 10, 320), log=silent)
+    backtest.run(start=start)
+    assert len(backtest.journal) > 0
+    assert engine.trade_history_frame().equals(backtest.trade_history_frame())
+    assert engine.profit == backtest.profit
+
+
+def test_batch_run_is_rejected(data):
+    engine = LiveEngine(data.iloc[:400], 320, 10, 320, log=silent)
+    with pytest.raises(TypeError):
+        engine.run()
+    assert len(engine.journal) == 0
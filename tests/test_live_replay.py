@@ -0,0 +1,23 @@
+import asyncio
+import os
+
+from data_source import parse_ohlcv_csv
+from live_replay import backtest_reference, replay
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, 'btc_binance_15m_main.csv')
+WINDOWS = (320, 10, 320)
+
+
+def test_live_replay_matches_backtest():
+    start, stop = 1000, 9000
+    columns = parse_ohlcv_csv(CSV)
+    # Пропущені у потоці бари довантажуються через REST і мають дати ті самі рішення
+    trader = asyncio.run(replay(columns, start, stop, WINDOWS, drop={1500, 1501, 2222}))
+    backtest = backtest_reference(CSV, start, stop, WINDOWS)
+
+    live_trades = trader.engine.trade_history_frame()
+    assert len(live_trades) > 0
+    assert live_trades.equals(backtest.trade_history_frame())
+    assert trader.engine.profit == backtest.profit and trader.engine.balance == backtest.balance
+    assert trader.engine.last_timestamp == backtest.last_timestamp
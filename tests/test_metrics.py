@@ -0,0 +1,107 @@
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from exchange import OrderRejected, PaperExchange
+from metrics import Histogram, Metrics, instrument_engine, start_metrics_server
+
+
+class RejectingExchange(PaperExchange):
+    """Paper-біржа, що відхиляє ордери сторін `rejected`."""
+
+    def __init__(self, rejected):
+        super().__init__('BTCUSDT')
+        self.rejected = set(rejected)
+
+    def place_market_order(self, side, quantity, price):
+        if side in self.rejected:
+            raise OrderRejected(f"{side} відхилено")
+        return super().place_market_order(side, quantity, price)
+
+
+def test_histogram_quantile_is_bucket_upper_bound():
+    histogram = Histogram(buckets=(1.0, 2.0, 5.0))
+    assert histogram.quantile(0.5) == 0.0
+    for value in (0.5, 0.7, 1.5, 1.8, 1.9, 4.0, 4.5, 9.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 3, 2, 1]
+    assert histogram.quantile(0.25) == 1.0
+    assert histogram.quantile(0.5) == 2.0
+    assert histogram.quantile(0.8) == 5.0
+    # Квантиль у кошику +Inf - спостережений максимум
+    assert histogram.quantile(0.99) == 9.0
+    # Межа кошика не перевищує максимуму
+    single = Histogram(buckets=(1.0, 2.0))
+    single.observe(0.3)
+    assert single.quantile(0.5) == 0.3
+
+
+def test_render_prometheus_exposition():
+    registry = Metrics()
+    registry.inc('orders_placed_total', side='BUY')
+    registry.inc('orders_placed_total', 2, side='SELL')
+    histogram = registry.histograms[('stage_seconds', (('stage', 'sell'),))] = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    assert registry.render_prometheus() == (
+        '# TYPE trading_bot_orders_placed_total counter\n'
+        'trading_bot_orders_placed_total{side="BUY"} 1\n'
+        'trading_bot_orders_placed_total{side="SELL"} 2\n'
+        '# TYPE trading_bot_stage_seconds histogram\n'
+        'trading_bot_stage_seconds_bucket{stage="sell",le="0.1"} 1\n'
+        'trading_bot_stage_seconds_bucket{stage="sell",le="1.0"} 3\n'
+        'trading_bot_stage_seconds_bucket{stage="sell",le="+Inf"} 4\n'
+        'trading_bot_stage_seconds_sum{stage="sell"} 4.25\n'
+        'trading_bot_stage_seconds_count{stage="sell"} 4\n'
+    )
+
+
+def make_engine(exchange):
+    index = pd.date_range('2024-01-01', periods=4, freq='15min', name='timestamp')
+    data = pd.DataFrame({name: np.full(4, 100.0) for name in ('close', 'ma', 'ma_10', 'bb_lower', 'bb_upper')},
+                        index=index)
+    return BacktestEngine(data, log=lambda message: None, exchange=exchange)
+
+
+def test_instrumented_engine_counts_rejected_orders_as_placed_only():
+    registry = Metrics()
+    exchange = RejectingExchange({'BUY'})
+    engine = instrument_engine(make_engine(exchange), registry)
+    engine.setup_conditional_orders(100.0)
+    engine.execute_initial_buy_order(1, 99.0)
+
+    assert registry.counters[('grids_placed_total', ())] == 1
+    assert registry.counters[('orders_placed_total', (('side', 'BUY'),))] == 1
+    assert ('orders_filled_total', (('side', 'BUY'),)) not in registry.counters
+    assert len(engine.journal) == 0
+
+    exchange.rejected.clear()
+    engine.execute_initial_buy_order(2, 99.0)
+    assert registry.counters[('orders_placed_total', (('side', 'BUY'),))] == 2
+    assert registry.counters[('orders_filled_total', (('side', 'BUY'),))] == 1
+
+    engine.on_bar(3, 100.0, 100.0, 100.0, 90.0, 105.0, 100.0, 100.0, 90.0)
+    assert registry.counters[('bars_processed_total', ())] == 1
+    assert registry.histograms[('stage_seconds', (('stage', 'check_sell_conditions'),))].count == 1
+
+
+def test_metrics_server_serves_exposition():
+    registry = Metrics()
+    registry.inc('bars_processed_total', 3)
+    server = start_metrics_server(0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert response.read().decode('utf-8') == registry.render_prometheus()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,81 @@
+from order_book import GridOrderBook
+
+PRICES = [100.0, 98.0, 96.0, 94.0, 92.0]
+QUANTITIES = [1.0, 1.1, 1.21, 1.331, 1.4641]
+
+
+def make_book():
+    book = GridOrderBook()
+    book.set_grid(PRICES, QUANTITIES)
+    return book
+
+
+def test_remember_reached_returns_each_level_once():
+    book = make_book()
+
+    assert book.remember_reached(101.0) == []
+    assert book.remember_reached(97.0) == [(100.0, 1.0), (98.0, 1.1)]
+    assert book._reached == 2
+    # Той самий або вищий мінімум не переглядає рівні повторно
+    assert book.remember_reached(99.0) == [] and book.remember_reached(97.0) == []
+    assert book._reached == 2
+    # Ціна рівно на рівні - рівень досягнуто
+    assert book.remember_reached(94.0) == [(96.0, 1.21), (94.0, 1.331)]
+    assert book._reached == 4
+    assert book.remembered == list(zip(PRICES[:4], QUANTITIES[:4]))
+
+
+def test_filled_levels_are_not_remembered_or_offered():
+    book = make_book()
+    book.fill([(98.0, 1.1)])
+
+    assert book.open_orders() == [(100.0, 1.0), (96.0, 1.21), (94.0, 1.331), (92.0, 1.4641)]
+    assert book.orders_above(95.0) == [(100.0, 1.0), (96.0, 1.21)]
+    assert book.remember_reached(95.0) == [(100.0, 1.0), (96.0, 1.21)]
+
+
+def test_orders_above_is_strict_and_in_grid_order():
+    book = GridOrderBook()
+    book.set_grid([96.0, 100.0, 98.0], [3.0, 1.0, 2.0])
+
+    assert book.orders_above(98.0) == [(100.0, 1.0)]
+    assert book.orders_above(95.0) == [(96.0, 3.0), (100.0, 1.0), (98.0, 2.0)]
+
+
+def test_remembered_survive_new_grid_until_clear_or_forget():
+    book = make_book()
+    book.remember_reached(97.0)
+    book.set_grid([90.0, 88.0], [2.0, 2.2])
+
+    # Нова сітка скидає покажчик, але не запам'ятовані ордери
+    assert book._reached == 0 and book.remembered == [(100.0, 1.0), (98.0, 1.1)]
+    assert book.remember_reached(89.0) == [(90.0, 2.0)]
+
+    book.forget([(100.0, 1.0)])
+    assert book.remembered == [(98.0, 1.1), (90.0, 2.0)]
+    book.clear()
+    assert book.remembered == [] and book.open_orders() == []
+
+
+def test_duplicate_levels_are_one_order():
+    book = GridOrderBook()
+    book.set_grid([100.0, 100.0, 99.0], [1.0, 1.0, 1.0])
+
+    assert book.remember_reached(99.5) == [(100.0, 1.0)]
+    book.fill([(100.0, 1.0)])
+    assert book.filled == [True, True, False]
+
+
+def test_export_restore_round_trip():
+    book = make_book()
+    book.remember_reached(95.0)
+    book.fill([(100.0, 1.0)])
+    state = book.export_state()
+
+    restored = GridOrderBook()
+    restored.restore_state(*state)
+    assert restored.export_state() == state
+    # Відновлена книга продовжує з того ж покажчика: старі рівні не повертаються вдруге
+    assert restored.remember_reached(93.0) == book.remember_reached(93.0) == [(94.0, 1.331)]
+    assert restored.export_state() == book.export_state()
+    assert restored.open_orders() == book.open_orders()
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_source import load_ohlcv, parse_ohlcv_csv
+from kline_downloader import interval_to_ms
+from resample import resample_columns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, 'btc_binance_15m_main.csv')
+
+# Правила pandas для тих самих меж: тижні Binance починаються з понеділка (1970-01-05)
+PANDAS_RULES = {'1h': {'rule': '1h'}, '4h': {'rule': '4h'}, '1d': {'rule': '24h'},
+                '1w': {'rule': '168h', 'origin': pd.Timestamp('1970-01-05')}}
+
+
+@pytest.fixture(scope='module')
+def columns():
+    return parse_ohlcv_csv(CSV)
+
+
+def pandas_resample(columns, interval):
+    frame = pd.DataFrame({name: columns[name] for name in ('open', 'high', 'low', 'close', 'volume')},
+                         index=pd.to_datetime(columns['timestamp'], unit='ms'))
+    options = PANDAS_RULES[interval]
+    resampled = frame.resample(options['rule'], origin=options.get('origin', 'epoch'), label='left',
+                               closed='left').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                                   'volume': 'sum'})
+    # Порожні групи (пропуски в даних) resample_columns не створює
+    return resampled[resampled['open'].notna()]
+
+
+@pytest.mark.parametrize('interval', sorted(PANDAS_RULES))
+def test_matches_pandas_resample(columns, interval):
+    resampled = resample_columns(columns, interval)
+    expected = pandas_resample(columns, interval)
+
+    np.testing.assert_array_equal(resampled['timestamp'],
+                                  expected.index.to_numpy(dtype='datetime64[ms]').astype(np.int64))
+    for name in ('open', 'high', 'low', 'close'):
+        np.testing.assert_array_equal(resampled[name], expected[name].to_numpy(), err_msg=name)
+    np.testing.assert_allclose(resampled['volume'], expected['volume'].to_numpy(), rtol=1e-12)
+
+
+def test_partial_leading_and_trailing_buckets():
+    step = interval_to_ms('15m')
+    hour = interval_to_ms('1h')
+    # Перший бар - третій у годині, останній - перший у годині
+    timestamps = 1_700_000_000_000 // hour * hour + step * np.arange(2, 2 + 7, dtype=np.int64)
+    values = np.arange(1.0, 8.0)
+    columns = {'timestamp': timestamps, 'open': values, 'high': values + 10, 'low': values - 10,
+               'close': values + 0.5, 'volume': np.ones(7)}
+    resampled = resample_columns(columns, '1h')
+
+    # Неповні групи лишаються: мітка - межа години, агрегати - лише з наявних барів
+    np.testing.assert_array_equal(resampled['timestamp'], timestamps[0] - 2 * step + hour * np.arange(3))
+    np.testing.assert_array_equal(resampled['open'], [1.0, 3.0, 7.0])
+    np.testing.assert_array_equal(resampled['close'], [2.5, 6.5, 7.5])
+    np.testing.assert_array_equal(resampled['high'], [12.0, 16.0, 17.0])
+    np.testing.assert_array_equal(resampled['low'], [-9.0, -7.0, -3.0])
+    np.testing.assert_array_equal(resampled['volume'], [2.0, 4.0, 1.0])
+
+
+def test_rejects_timeframe_not_multiple_of_step(columns):
+    with pytest.raises(ValueError):
+        resample_columns(columns, '5m')
+
+
+def test_load_ohlcv_timeframe_uses_resampled_columns(tmp_path):
+    path = str(tmp_path / 'btc.csv')
+    with open(CSV, encoding='utf-8') as source, open(path, 'w', encoding='utf-8') as target:
+        target.writelines(line for _, line in zip(range(3001), source))
+    expected = resample_columns(parse_ohlcv_csv(path), '4h')
+
+    for _ in range(2):  # Другий раз - з кешу <path>.4h.cache
+        data = load_ohlcv(path, timeframe='4h')
+        assert len(data) == len(expected['timestamp'])
+        np.testing.assert_array_equal(data.index.to_numpy(dtype='datetime64[ms]').astype(np.int64),
+                                      expected['timestamp'])
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            np.testing.assert_array_equal(data[name].to_numpy(), expected[name], err_msg=name)
+    assert os.path.isdir(path + '.4h.cache')
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trade_journal import CsvTradeSink, ParquetTradeSink, Side, TradeJournal, frame_columns, open_trade_sink
+
+START = pd.Timestamp('2024-01-01').value
+STEP = pd.Timedelta('15min').value
+
+
+def fill(journal, trades=10):
+    for n in range(trades):
+        if n % 2:
+            journal.append(Side.SELL, START + n * STEP, 100.0 + n, 0.5 + n / 7, profit_percent=1.9 + n / 3, fee=0.01)
+        else:
+            journal.append(Side.BUY, START + n * STEP, 100.0 - n, 0.25 + n / 3, orders_executed=n + 1, fee=0.02)
+
+
+def parquet_engine():
+    try:
+        pd.io.parquet.get_engine('auto')
+    except ImportError:
+        pytest.skip('Немає pyarrow/fastparquet')
+
+
+@pytest.fixture(params=['csv', 'parquet'])
+def sink_path(request, tmp_path):
+    if request.param == 'parquet':
+        parquet_engine()
+    return str(tmp_path / f'trades.{request.param}')
+
+
+@pytest.mark.parametrize('keep', [True, False])
+def test_sink_round_trip(sink_path, keep):
+    reference = TradeJournal()
+    fill(reference)
+    journal = TradeJournal(sink=open_trade_sink(sink_path), chunk_size=3, keep=keep)
+    fill(journal)
+
+    assert len(journal) == 10 and journal.count(Side.BUY) == journal.count(Side.SELL) == 5
+    # З keep=False у пам'яті лише хвіст після останньої пачки
+    assert journal.size == (10 if keep else 1)
+    assert journal.records() == reference.records()
+    pd.testing.assert_frame_equal(journal.to_frame(), reference.to_frame())
+
+    journal.close()
+    written = frame_columns(journal.sink.read())
+    for name, values in reference.snapshot().items():
+        np.testing.assert_array_equal(written[name], values, err_msg=name)
+
+
+def test_records_without_keep_reads_back_dropped_trades(tmp_path):
+    journal = TradeJournal(sink=CsvTradeSink(str(tmp_path / 'trades.csv')), chunk_size=4, keep=False)
+    fill(journal, 9)
+
+    assert journal.dropped == 8 and journal.size == 1
+    records = journal.records()
+    assert len(records) == 9
+    assert [record['type'] for record in records] == ['Buy', 'Sell'] * 4 + ['Buy']
+    assert records[3]['profit_percent'] == pytest.approx(2.9) and 'orders_executed' not in records[3]
+    assert records[8]['orders_executed'] == 9 and records[8]['timestamp'] == pd.Timestamp(START + 8 * STEP)
+
+
+def test_csv_sink_truncates_previous_run_on_first_write(tmp_path):
+    path = str(tmp_path / 'trades.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('old,contents\n1,2\n')
+    sink = CsvTradeSink(path)
+    # Відкриття не обрізає файл: resume() ще може продовжити попередню історію
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'old,contents\n1,2\n'
+
+    journal = TradeJournal(sink=sink, chunk_size=2)
+    fill(journal, 3)
+    journal.close()
+    assert len(sink.read()) == 3
+
+
+def test_empty_csv_sink_has_header(tmp_path):
+    path = str(tmp_path / 'trades.csv')
+    journal = TradeJournal(sink=CsvTradeSink(path))
+    journal.close()
+
+    assert journal.sink.read().empty and len(journal.records()) == 0
+    with open(path, encoding='utf-8') as f:
+        assert f.read().strip() == 'type,price,quantity,timestamp,orders_executed,profit_percent,fee'
+
+
+def test_parquet_sink_resume_truncates_parts(tmp_path):
+    parquet_engine()
+    path = str(tmp_path / 'trades.parquet')
+    journal = TradeJournal(sink=ParquetTradeSink(path), chunk_size=3)
+    fill(journal)
+    journal.close()
+
+    resumed = ParquetTradeSink(path)
+    resumed.resume(7)  # Посередині третьої частини
+    frame = resumed.read()
+    assert len(frame) == 7
+    np.testing.assert_array_equal(frame_columns(frame)['price'], journal.snapshot()['price'][:7])
+    with pytest.raises(ValueError):
+        ParquetTradeSink(path).resume(8)
@@ -0,0 +1,317 @@
+import math
+import os
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+
+class Side(IntEnum):
+    BUY = 0
+    SELL = 1
+
+
+# Назви сторін у історії торгівлі (колонка type)
+SIDE_LABELS = ('Buy', 'Sell')
+
+# Типізовані колонки журналу; час - наносекунди Unix
+JOURNAL_DTYPES = {
+    'timestamp': np.int64,
+    'side': np.int8,
+    'price': np.float64,
+    'quantity': np.float64,
+    'orders_executed': np.int32,
+    'profit_percent': np.float64,
+    'fee': np.float64,
+}
+
+# Колонки історії торгівлі у файлі (як у попередньому форматі trade_history.csv)
+EXPORT_COLUMNS = ['type', 'price', 'quantity', 'timestamp', 'orders_executed', 'profit_percent', 'fee']
+
+
+def journal_frame(columns):
+    """DataFrame історії торгівлі з колонок журналу: orders_executed лише у покупок, profit_percent - у продажів."""
+    is_sell = columns['side'] == Side.SELL
+    return pd.DataFrame({
+        'type': np.where(is_sell, SIDE_LABELS[Side.SELL], SIDE_LABELS[Side.BUY]),
+        'price': columns['price'],
+        'quantity': columns['quantity'],
+        'timestamp': pd.to_datetime(columns['timestamp'], unit='ns'),
+        'orders_executed': pd.Series(columns['orders_executed'], dtype='Int64').mask(is_sell),
+        'profit_percent': np.where(is_sell, columns['profit_percent'], np.nan),
+        'fee': columns['fee'],
+    }, columns=EXPORT_COLUMNS)
+
+
+def journal_record(columns, position):
+    """Угода `position` з колонок журналу як словник у форматі історії торгівлі."""
+    side = int(columns['side'][position])
+    record = {
+        'type': SIDE_LABELS[side],
+        'price': float(columns['price'][position]),
+        'quantity': float(columns['quantity'][position]),
+        'timestamp': pd.Timestamp(int(columns['timestamp'][position]), unit='ns'),
+        'fee': float(columns['fee'][position]),
+    }
+    if side == Side.BUY:
+        record['orders_executed'] = int(columns['orders_executed'][position])
+    else:
+        record['profit_percent'] = float(columns['profit_percent'][position])
+    return record
+
+
+def frame_columns(frame):
+    """Зворотне перетворення: колонки журналу з DataFrame історії торгівлі (наприклад, прочитаного з файлу).
+
+    У файлах, записаних до появи колонки fee, комісія вважається нульовою.
+    """
+    is_sell = (frame['type'] == SIDE_LABELS[Side.SELL]).to_numpy()
+    return {
+        'timestamp': pd.to_datetime(frame['timestamp']).to_numpy(dtype='datetime64[ns]').astype(np.int64),
+        'side': is_sell.astype(np.int8),
+        'price': frame['price'].to_numpy(dtype=np.float64),
+        'quantity': frame['quantity'].to_numpy(dtype=np.float64),
+        'orders_executed': pd.to_numeric(frame['orders_executed']).fillna(0).to_numpy(dtype=np.int32),
+        'profit_percent': pd.to_numeric(frame['profit_percent']).to_numpy(dtype=np.float64),
+        'fee': (pd.to_numeric(frame['fee']).fillna(0).to_numpy(dtype=np.float64) if 'fee' in frame
+                else np.zeros(len(frame))),
+    }
+
+
+class CsvTradeSink:
+    """Дописування історії торгівлі у CSV пачками; кожна пачка одразу скидається на диск.
+
+    Попередній вміст файлу обрізається першим записом, а не при відкритті:
+    resume() продовжує історію запуску, перерваного після знімка стану.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._header = True
+        self._fresh = True
+
+    def resume(self, rows):
+        """Лишити у файлі заголовок і перші `rows` угод; нові угоди дописуються після них."""
+        if not rows:
+            return
+        with open(self.path, 'r+b') as f:
+            for _ in range(rows + 1):
+                if not f.readline():
+                    raise ValueError(f"У '{self.path}' менше угод, ніж у знімку стану ({rows}).")
+            f.truncate(f.tell())
+        self._header = False
+        self._fresh = False
+
+    def write(self, frame):
+        if self._fresh:
+            self._file.truncate(0)
+            self._fresh = False
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self._file.flush()
+
+    def read(self):
+        return pd.read_csv(self.path, parse_dates=['timestamp'], float_precision='round_trip')
+
+    def close(self):
+        if self._header:
+            self.write(pd.DataFrame(columns=EXPORT_COLUMNS))  # Файл без угод містить лише заголовок
+        self._file.close()
+
+
+class ParquetTradeSink:
+    """Історія торгівлі як каталог Parquet: кожна пачка - окремий файл part-NNNNN.parquet.
+
+    Файл Parquet читається лише після запису футера, тож пачка, записана
+    до аварійного завершення, лишається читабельною. Потрібен pyarrow або fastparquet.
+    """
+
+    def __init__(self, path):
+        pd.io.parquet.get_engine('auto')  # ImportError одразу, а не після першої пачки
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._parts = None  # None - частини попереднього запуску ще не видалено (див. resume)
+
+    def _part_names(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith('part-') and name.endswith('.parquet'))
+
+    def resume(self, rows):
+        """Лишити перші `rows` угод попереднього запуску; частини після них видаляються."""
+        names = self._part_names()
+        kept = 0
+        for position, name in enumerate(names):
+            if kept == rows:
+                break
+            part = os.path.join(self.path, name)
+            frame = pd.read_parquet(part)
+            if kept + len(frame) > rows:
+                frame.iloc[:rows - kept].to_parquet(part + '.tmp', index=False)
+                os.replace(part + '.tmp', part)
+                frame = frame.iloc[:rows - kept]
+            kept += len(frame)
+        else:
+            position = len(names)
+        if kept < rows:
+            raise ValueError(f"У '{self.path}' менше угод, ніж у знімку стану ({rows}).")
+        for name in names[position:]:
+            os.remove(os.path.join(self.path, name))
+        self._parts = position
+
+    def write(self, frame):
+        if self._parts is None:
+            for name in self._part_names():
+                os.remove(os.path.join(self.path, name))  # Залишки попереднього запуску
+            self._parts = 0
+        part = os.path.join(self.path, f"part-{self._parts:05d}.parquet")
+        frame.to_parquet(part + '.tmp', index=False)
+        os.replace(part + '.tmp', part)
+        self._parts += 1
+
+    def read(self):
+        if not self._parts:
+            return pd.DataFrame(columns=EXPORT_COLUMNS)
+        return pd.read_parquet(self.path)
+
+    def close(self):
+        pass
+
+
+def open_trade_sink(path):
+    """Приймач історії торгівлі за розширенням: .parquet - каталог Parquet, інакше CSV."""
+    if path.endswith('.parquet'):
+        return ParquetTradeSink(path)
+    return CsvTradeSink(path)
+
+
+class TradeJournal:
+    """Журнал угод: типізовані колонки NumPy з подвоєнням ємності замість списків словників.
+
+    З приймачем (`sink`) кожні `chunk_size` угод дописуються у файл, тож аварійне
+    завершення не губить історію. З keep=False записані угоди звільняються з
+    пам'яті (пам'ять не росте на довгих прогонах); to_frame() дочитує їх з файлу.
+    """
+
+    __slots__ = ('columns', 'size', 'sink', 'chunk_size', 'keep', 'flushed', 'dropped', 'counts')
+
+    def __init__(self, capacity=64, sink=None, chunk_size=1024, keep=True):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in JOURNAL_DTYPES.items()}
+        self.size = 0
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.keep = keep or sink is None
+        self.flushed = 0  # Скільки рядків у пам'яті вже записано у приймач
+        self.dropped = 0  # Скільки записаних рядків звільнено з пам'яті
+        self.counts = [0, 0]
+
+    def __len__(self):
+        return self.dropped + self.size
+
+    def count(self, side):
+        return self.counts[side]
+
+    def append(self, side, timestamp, price, quantity, orders_executed=0, profit_percent=math.nan, fee=0.0):
+        size = self.size
+        columns = self.columns
+        if size == len(columns['side']):
+            for name, values in columns.items():
+                grown = np.empty(max(2 * size, 16), dtype=values.dtype)
+                grown[:size] = values
+                columns[name] = grown  # Попередні масиви лишаються валідними для знімків інших потоків
+        columns['timestamp'][size] = timestamp
+        columns['side'][size] = side
+        columns['price'][size] = price
+        columns['quantity'][size] = quantity
+        columns['orders_executed'][size] = orders_executed
+        columns['profit_percent'][size] = profit_percent
+        columns['fee'][size] = fee
+        self.size = size + 1
+        self.counts[side] += 1
+        if self.sink is not None and self.size - self.flushed >= self.chunk_size:
+            self.flush()
+
+    def extend(self, columns):
+        """Дописати пачку угод з колонок (ключі JOURNAL_DTYPES) одним копіюванням."""
+        count = len(columns['side'])
+        if not count:
+            return
+        size = self.size
+        if size + count > len(self.columns['side']):
+            capacity = max(2 * len(self.columns['side']), size + count)
+            for name, values in self.columns.items():
+                grown = np.empty(capacity, dtype=values.dtype)
+                grown[:size] = values[:size]
+                self.columns[name] = grown
+        for name, values in self.columns.items():
+            values[size:size + count] = columns[name]
+        self.size = size + count
+        sells = int(np.count_nonzero(columns['side'] == Side.SELL))
+        self.counts[Side.BUY] += count - sells
+        self.counts[Side.SELL] += sells
+        if self.sink is not None and self.size - self.flushed >= self.chunk_size:
+            self.flush()
+
+    def snapshot(self):
+        """Колонки поточних угод у пам'яті (view без копіювання; наступні append їх не змінюють)."""
+        size = self.size
+        return {name: values[:size] for name, values in self.columns.items()}
+
+    def row(self, position):
+        """Угода з пам'яті як словник у форматі історії торгівлі."""
+        return journal_record(self.columns, position)
+
+    def flush(self):
+        """Дописати у приймач угоди, яких там ще немає."""
+        if self.sink is None or self.size == self.flushed:
+            return
+        self.sink.write(journal_frame({name: values[self.flushed:self.size] for name, values in self.columns.items()}))
+        self.flushed = self.size
+        if not self.keep:
+            # Нові масиви замість зсуву: знімки, віддані іншим потокам, лишаються незмінними
+            self.dropped += self.size
+            self.columns = {name: np.empty(len(values), dtype=values.dtype) for name, values in self.columns.items()}
+            self.size = 0
+            self.flushed = 0
+
+    def resume(self, trades, counts):
+        """Продовжити журнал після знімка стану: у приймачі лишаються перші `trades` угод.
+
+        Угоди не переписуються у приймач повторно; з keep=True вони один раз
+        дочитуються в пам'ять, з keep=False - лише враховуються як звільнені.
+        """
+        self.sink.resume(trades)
+        if self.keep and trades:
+            columns = frame_columns(self.sink.read())
+            self.columns = {name: np.ascontiguousarray(columns[name], dtype=dtype)
+                            for name, dtype in JOURNAL_DTYPES.items()}
+            self.size = self.flushed = trades
+        else:
+            self.dropped = trades
+        self.counts = [int(count) for count in counts]
+
+    def close(self):
+        """Дописати залишок і закрити приймач."""
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
+
+    def arrays(self):
+        """Колонки всіх угод, включно зі звільненими з пам'яті (дочитуються з приймача)."""
+        if not self.dropped:
+            return self.snapshot()
+        self.flush()  # Без keep після запису в пам'яті нічого не лишається
+        return frame_columns(self.sink.read())
+
+    def to_frame(self):
+        """Історія торгівлі як DataFrame (колонки EXPORT_COLUMNS; порожній журнал - порожній DataFrame)."""
+        if not len(self):
+            return pd.DataFrame()
+        return journal_frame(self.arrays())
+
+    def records(self):
+        """Усі угоди як список словників (формат колишнього trade_history).
+
+        З keep=False звільнені з пам'яті угоди дочитуються з приймача, як і в arrays().
+        """
+        columns = self.arrays()
+        return [journal_record(columns, position) for position in range(len(columns['side']))]
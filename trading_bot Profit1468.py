@@ -2,30 +2,27 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import pandas as pd
-import numpy as np
-from binance.client import Client
-from binance.exceptions import BinanceAPIException, BinanceRequestException
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from ta.volatility import BollingerBands
-from ta.trend import SMAIndicator
 import argparse
+import cProfile
 from datetime import datetime
-import matplotlib.dates as mdates
-import mplcursors  # Для інтерактивних підказок
-import time
 import logging
-import os
-
-# Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Логи у консоль
-        logging.FileHandler("trading_bot.log")  # Логи у файл
-    ]
-)
+import sys
+
+import cli
+from analytics import analyze, format_summary
+from backtest_engine import BacktestEngine
+from data_source import load_ohlcv
+from exchange import BinanceExchange, LazyClient, PaperExchange
+from gui_bridge import GuiBridge
+from indicators import IndicatorCache
+from kline_store import KlineStore, get_historical_data as load_history
+from live_trader import LiveTrader
+from logging_setup import GuiLogBuffer, setup_logging
+from metrics import instrument_engine, metrics, start_metrics_server
+from trade_journal import open_trade_sink
+
+# Налаштування логування: консоль і файл trading_bot.log через чергу у фоновому потоці
+setup_logging(level=logging.INFO, log_file="trading_bot.log")
 
 # Отримання Binance API ключів зі змінних середовища
 API_KEY = 'your_api_key'
@@ -35,12 +32,16 @@ if not API_KEY or not API_SECRET:
     logging.error("API_KEY та API_SECRET повинні бути встановлені як змінні середовища.")
     raise EnvironmentError("API ключі не знайдені.")
 
-# Ініціалізація Binance клієнта
-client = Client(API_KEY, API_SECRET)
+# Binance клієнт створюється при першому запиті до API (імпорт python-binance - лише тоді)
+client = LazyClient(API_KEY, API_SECRET)
+
+# Каталог локального кешу клайнів
+KLINE_CACHE_DIR = 'kline_cache'
 
 
 class TradingBotApp:
-    def __init__(self, root, from_date=None, to_date=None):
+    def __init__(self, root, from_date=None, to_date=None, csv_path=None, live_orders=False, profile=False,
+                 profile_output=None, checkpoint=None):
         self.root = root
         self.root.title("Binance Trading Bot")
 
@@ -68,37 +69,41 @@ class TradingBotApp:
 
         self.from_date = from_date
         self.to_date = to_date
-        self.backtesting = True if self.from_date and self.to_date else False
+        self.csv_path = csv_path  # Локальний CSV замість завантаження з Binance
+        self.backtesting = True if (self.from_date and self.to_date) or self.csv_path else False
+        self.live_orders = live_orders  # Реальні ордери на Binance замість paper trading
+        self.profile = profile  # Таймери та лічильники на гарячих методах рушія, звіт наприкінці запуску
+        self.profile_output = profile_output  # Файл pstats з cProfile потоку бота
+        self.checkpoint = checkpoint  # Знімок стану торгівлі наживо: після перезапуску вона продовжується з нього
 
         self.create_widgets()
 
         # Ініціалізація змінних
         self.bot_thread = None
         self.bot_running = False
+        self.bot_finished = True
 
-        # Ініціалізація торгових змінних
-        self.holding_coins = False
-        self.bought_quantity = 0.0
-        self.buy_prices = []
-        self.sell_prices = []
-        self.buy_times = []
-        self.sell_times = []
-        self.trade_history = []
+        # Торговий стан зберігається у рушії бек-тесту
         self.initial_balance = self.params['balance'].get()
-        self.balance = self.initial_balance  # Доступний баланс для торгівлі
-        self.profit = 0.0  # Накопичений прибуток
-        self.conditional_orders = []
-        self.total_profit = 0.0
-        self.total_cost = 0.0
-        self.all_buy_trades = []  # Деталізовані ордери на купівлю
-        self.all_sell_trades = []  # Деталізовані ордери на продаж
+        self.engine = None
+        self.live_trader = None
         self.current_data = pd.DataFrame()
-        self.remembered_orders = []  # Список запам'ятованих ордерів
-        self.initial_buy_done = False  # Флаг для відстеження, чи була виконана початкова купівля
 
-        # Змінні для функціоналу паузи
+        # Індикатори повторних запусків на тих самих даних беруться з кешу
+        self.indicator_cache = IndicatorCache()
+
+        # Події керування потоком бота: пауза та зупинка без опитування
         self.paused = False
-        self.pause_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+
+        # Оновлення GUI з потоку бота йдуть через чергу, яку Tk розбирає з фіксованою частотою кадрів
+        self.bridge = GuiBridge(self.root)
+        self.bridge.subscribe('load', self.load_chart)
+        self.bridge.subscribe('bars', self.append_chart)
+        self.bridge.subscribe('frame', self.update_visualization)
+        self.bridge.subscribe('finished', self.on_bot_finished)
 
     def create_widgets(self):
         # Створення головних фреймів
@@ -212,8 +217,14 @@ class TradingBotApp:
 
         self.log_text = tk.Text(log_frame, height=10)
         self.log_text.pack(fill="both", expand=True)
+        # Повідомлення з потоку бота потрапляють у віджет пачками через root.after
+        self.log_buffer = GuiLogBuffer(self.root, self.log_text)
+
+        # Візуалізація з інтерактивною панеллю; matplotlib і mplcursors потрібні лише GUI
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from price_chart import PriceChart
 
-        # Візуалізація з інтерактивною панеллю
         self.figure = plt.Figure(figsize=(10, 8))  # Збільшена висота для додаткового субплоту
         self.ax_price = self.figure.add_subplot(111)
 
@@ -232,9 +243,11 @@ class TradingBotApp:
         # Додавання Canvas після toolbar
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill="both", expand=True)
 
+        # Постійні лінії та scatter-и графіку, що оновлюються без перестворення
+        self.chart = PriceChart(self.figure, self.ax_price, self.canvas)
+
     def log(self, message):
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
+        self.log_buffer.append(message)
         logging.info(message)  # Логування як у GUI, так і у файл/консоль
 
     def start_bot(self):
@@ -259,8 +272,7 @@ class TradingBotApp:
             return
 
         # Ініціалізація параметрів бота з self.params
-        self.balance = self.params['balance'].get()
-        self.initial_balance = self.balance  # Збереження початкового балансу без змін
+        self.initial_balance = self.params['balance'].get()  # Збереження початкового балансу без змін
         self.number_of_orders = self.params['number_of_orders'].get()
         self.martingale_factor = self.params['martingale_factor'].get()
         self.order_step_percentage = self.params['order_step_percentage'].get()
@@ -304,30 +316,20 @@ class TradingBotApp:
         self.log("Бот запущено.")
 
         # Скидання змінних
-        self.holding_coins = False
-        self.bought_quantity = 0.0
-        self.buy_prices = []
-        self.sell_prices = []
-        self.buy_times = []
-        self.sell_times = []
-        self.trade_history = []
-        self.balance = self.initial_balance  # Скидання балансу
-        self.profit = 0.0  # Скидання прибутку
-        self.conditional_orders = []
-        self.total_profit = 0.0
-        self.total_cost = 0.0
-        self.all_buy_trades = []
-        self.all_sell_trades = []
+        self.engine = None
+        self.live_trader = None
         self.current_data = pd.DataFrame()
-        self.remembered_orders = []  # Скидання запам'ятованих ордерів
-        self.initial_buy_done = False  # Скидання флагу початкової купівлі
 
+        # Нові події для кожного запуску, щоб потік попереднього запуску не відновився
         self.paused = False
-        self.pause_event.clear()
+        self.stop_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
         self.pause_button.config(text="Пауза")
 
         # Запуск бота у окремому потоці
-        self.bot_thread = threading.Thread(target=self.run_bot)
+        self.bot_finished = False
+        self.bot_thread = threading.Thread(target=self.run_bot_thread)
         self.bot_thread.start()
 
     def pause_bot(self):
@@ -335,13 +337,13 @@ class TradingBotApp:
             return  # Не можна поставити паузу, якщо бот не працює
         if not self.paused:
             self.paused = True
-            self.pause_event.set()
+            self.resume_event.clear()
             self.pause_button.config(text="Продовжити")
             self.log("Бот поставлено на паузу.")
             logging.info("Бот поставлено на паузу.")
         else:
             self.paused = False
-            self.pause_event.clear()
+            self.resume_event.set()
             self.pause_button.config(text="Пауза")
             self.log("Бот продовжено.")
             logging.info("Бот продовжено.")
@@ -356,75 +358,103 @@ class TradingBotApp:
         self.stop_button.config(state="disabled")
         self.pause_button.config(state="disabled", text="Пауза")  # Скидання тексту кнопки
         self.paused = False
-        self.pause_event.clear()
+        self.stop_event.set()
+        self.resume_event.set()  # Розбудити потік, якщо він на паузі
+        if self.live_trader is not None:
+            self.live_trader.request_stop()
         self.log("Бот зупинено.")
         logging.info("Бот зупинено.")
 
+        # Якщо потік ще працює, підсумок покаже on_bot_finished після його завершення
+        if self.bot_finished:
+            self.show_summary()
+
+    def on_bot_finished(self, run_token):
+        if run_token is not self.stop_event:
+            return  # Подія попереднього запуску
+        self.bot_finished = True
+        # Бек-тест, що завершився сам, чекає на кнопку "Стоп" для підсумку
+        if run_token.is_set():
+            self.show_summary()
+
+    def show_summary(self):
         # Очистка графіку
-        self.ax_price.clear()
-        self.buy_times.clear()
-        self.buy_prices.clear()
-        self.sell_times.clear()
-        self.sell_prices.clear()
-        self.all_buy_trades.clear()
-        self.all_sell_trades.clear()
-        self.canvas.draw()
+        self.chart.clear()
+
+        engine = self.engine
+        if engine is None:
+            return
 
         # Отримання останньої ціни BTC з даних графіку
-        if not self.current_data.empty:
-            last_btc_price = self.current_data['close'].iloc[-1]  # Остання ціна на графіку
-        else:
-            last_btc_price = 0
+        last_btc_price = engine.last_close  # Остання ціна на графіку
 
         # Розрахунок та логування фінальних метрик
-        usdt_balance = self.balance                 # Залишок USDT
-        btc_balance = self.bought_quantity          # Загальна кількість BTC
-        final_value = usdt_balance + (btc_balance * last_btc_price)
-        profit = final_value - self.initial_balance
+        btc_balance = engine.bought_quantity          # Загальна кількість BTC
 
         # Обмеження використання тільки початкового балансу для купівлі
         # Прибуток не додається до балансу
-        profit = self.profit
+        profit = engine.profit
 
         # Логування результатів
         self.log(f"Початковий Баланс USDT: {self.initial_balance}")
-        self.log(f"Фінальний Баланс USDT: {self.balance}")
+        self.log(f"Фінальний Баланс USDT: {engine.balance}")
         self.log(f"Фінальна Кількість BTC: {btc_balance}")
         self.log(f"Остання Ціна BTC на Графіку: {last_btc_price} USDT")
         self.log(f"Загальний Прибуток: {profit:.2f} USDT")
         logging.info(f"Початковий Баланс USDT: {self.initial_balance}")
-        logging.info(f"Фінальний Баланс USDT: {self.balance}")
+        logging.info(f"Фінальний Баланс USDT: {engine.balance}")
         logging.info(f"Фінальна Кількість BTC: {btc_balance}")
         logging.info(f"Остання Ціна BTC на Графіку: {last_btc_price} USDT")
         logging.info(f"Загальний Прибуток: {profit:.2f} USDT")
 
+        # Метрики за кривою капіталу: просадка, Шарп/Сортіно, експозиція, цикли сітки
+        summary = analyze(engine)['summary']
+        self.log(format_summary(summary))
+        logging.info(format_summary(summary))
+
         # Додавання аннотації з останньою ціною BTC на графіку
-        if self.enable_plotting and not self.current_data.empty:
+        if self.enable_plotting and engine.last_index is not None:
             # Остання дата та ціна для відображення
-            last_date = self.current_data.index[-1]  # Остання дата на графіку
-            self.ax_price.text(last_date, last_btc_price,
-                               f"Остання Ціна BTC: {last_btc_price} USDT",
-                               color="blue", fontsize=10, ha="right", va="bottom")
+            last_date = engine.last_timestamp  # Остання дата на графіку
+            self.chart.annotate(last_date, last_btc_price,
+                                f"Остання Ціна BTC: {last_btc_price} USDT",
+                                color="blue", fontsize=10, ha="right", va="bottom")
 
-            # Оновлення графіку з новою аннотацією
-            self.canvas.draw()
+    def run_bot_thread(self):
+        run_token = self.stop_event
+        try:
+            if self.profile_output:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.runcall(self.run_bot)
+                finally:
+                    profiler.dump_stats(self.profile_output)
+                    logging.info(f"Профіль cProfile збережено у '{self.profile_output}'.")
+            else:
+                self.run_bot()
+            if self.profile:
+                logging.info(metrics.report())
+        finally:
+            self.bridge.publish('finished', run_token)
 
     def run_bot(self):
-        self.balance = self.initial_balance  # Скидання балансу на початку
-        self.total_profit = 0.0
-        self.trade_history = []
-        self.total_cost = 0.0
-        self.profit = 0.0  # Скидання прибутку
-
+        stop_event = self.stop_event
+        resume_event = self.resume_event
         if self.backtesting:
             try:
-                data = get_historical_data(
-                    self.trading_pair,
-                    self.timeframe,
-                    start_date=self.from_date,
-                    end_date=self.to_date
-                )
-                data = calculate_indicators(data, self.ma_window_size, self.ma_10_window_size, self.bb_window_size)
+                if self.csv_path:
+                    # Таймфрейм, старший за крок CSV, збирається з його свічок
+                    data = load_ohlcv(self.csv_path, start_date=self.from_date, end_date=self.to_date,
+                                      timeframe=self.timeframe)
+                else:
+                    data = get_historical_data(
+                        self.trading_pair,
+                        self.timeframe,
+                        start_date=self.from_date,
+                        end_date=self.to_date
+                    )
+                with metrics.timer('calculate_indicators'):
+                    data = self.indicator_cache.get(data, self.ma_window_size, self.ma_10_window_size, self.bb_window_size)
                 self.log(f"Дані завантажено з {data.index.min()} до {data.index.max()}")
                 logging.info(f"Дані завантажено з {data.index.min()} до {data.index.max()}")
             except Exception as e:
@@ -447,41 +477,46 @@ class TradingBotApp:
                 logging.warning(f"Недостатньо даних для обчислення індикаторів. Необхідно: {window_size}, Доступно: {len(data)}")
                 return
 
+            # Перевірка на валідність дат один раз для всього набору
+            if not isinstance(data.index, pd.DatetimeIndex):
+                self.log(f"Невірний тип часових міток: {type(data.index).__name__}")
+                logging.error(f"Невірний тип часових міток: {type(data.index).__name__}")
+                return
+
+            # Стан стратегії та масиви індикаторів живуть у рушії бек-тесту
+            self.engine = BacktestEngine(
+                data,
+                initial_balance=self.initial_balance,
+                number_of_orders=self.number_of_orders,
+                martingale_factor=self.martingale_factor,
+                order_step_percentage=self.order_step_percentage,
+                profit_target_percent=self.profit_target_percent,
+                net_profit_target_percent=self.net_profit_target_percent,
+                purchase_balance_percent=self.purchase_balance_percent * 100,
+                log=self.log,
+                trade_sink=self.open_trade_sink(),
+            )
+            engine = self.engine
+            if self.profile:
+                instrument_engine(engine)
+            if self.enable_plotting:
+                self.bridge.publish('load', (stop_event, data))
+
             index = window_size  # Початок з індексу, де всі індикатори мають валідні значення
             data_length = len(data)
             while index < data_length:
-                if not self.bot_running:
-                    break
-
-                # Перевірка на паузу
-                if self.pause_event.is_set():
-                    time.sleep(0.1)
-                    continue
-
-                # Оновлення поточних даних для використання в stop_bot
-                self.current_data = data.iloc[:index + 1]
-
-                # Перевірка на валідність дати
-                current_timestamp = self.current_data.index[-1]
-                if not isinstance(current_timestamp, pd.Timestamp):
-                    self.log(f"Невірний тип часової мітки: {current_timestamp}")
-                    logging.error(f"Невірний тип часової мітки: {current_timestamp}")
-                    break
-                if current_timestamp.year < 1 or current_timestamp.year > 9999:
-                    self.log(f"Виявлено невірну дату: {current_timestamp}")
-                    logging.error(f"Виявлено невірну дату: {current_timestamp}")
+                # Пауза блокує потік до resume_event; stop_bot також встановлює його
+                if not resume_event.is_set():
+                    resume_event.wait()
+                if stop_event.is_set():
                     break
 
                 try:
-                    self.check_buy_conditions(self.current_data)
-                    self.check_sell_conditions(self.current_data)
+                    engine.step(index)
 
                     # Оновлення візуалізації кожні 'update_interval' ітерацій
                     if self.enable_plotting and index % self.update_interval == 0:
-                        self.update_visualization(
-                            self.current_data, self.buy_times, self.buy_prices,
-                            self.sell_times, self.sell_prices
-                        )
+                        self.publish_frame(stop_event, engine, index + 1)
                 except Exception as e:
                     self.log(f"Виникла помилка у циклі run_bot: {e}")
                     logging.error(f"Помилка у циклі run_bot: {e}")
@@ -489,484 +524,186 @@ class TradingBotApp:
 
                 index += 1
 
+            # Оновлення поточних даних для використання в stop_bot
+            if engine.last_index is not None:
+                self.current_data = data.iloc[:engine.last_index + 1]
+
             self.log("Бек-тест завершено.")
-            self.log(f"Фінальний Баланс: {self.balance}")
-            self.log(f"Загальний Прибуток: {self.profit:.2f}")
-            logging.info(f"Бек-тест завершено. Фінальний Баланс: {self.balance}, Загальний Прибуток: {self.profit:.2f}")
+            self.log(f"Фінальний Баланс: {engine.balance}")
+            self.log(f"Загальний Прибуток: {engine.profit:.2f}")
+            logging.info(f"Бек-тест завершено. Фінальний Баланс: {engine.balance}, Загальний Прибуток: {engine.profit:.2f}")
 
-            df_trade_history = pd.DataFrame(self.trade_history)
+            # Дописування залишку історії торгівлі у файл
+            self.save_trade_history(engine)
+
+            df_trade_history = engine.trade_history_frame()
             self.log(f"Останні записи історії торгівлі:\n{df_trade_history.tail()}")
             logging.info(f"Останні записи історії торгівлі:\n{df_trade_history.tail()}")
 
-            # Збереження історії торгівлі у файл
-            filename = self.params['trade_history_filename'].get()
-            try:
-                df_trade_history.to_csv(filename, index=False)
-                self.log(f"Історія торгівлі збережена у файл '{filename}'.")
-                logging.info(f"Історія торгівлі збережена у файл '{filename}'.")
-            except Exception as e:
-                self.log(f"Не вдалося зберегти історію торгівлі: {e}")
-                logging.error(f"Не вдалося зберегти історію торгівлі: {e}")
-
             # Оновлення візуалізації наприкінці
-            if self.enable_plotting:
-                self.update_visualization(
-                    self.current_data, self.buy_times, self.buy_prices,
-                    self.sell_times, self.sell_prices
-                )
+            if self.enable_plotting and engine.last_index is not None:
+                self.publish_frame(stop_event, engine, engine.last_index + 1)
         else:
             # Реальний час торгівлі
-            pass
-
-    def check_buy_conditions(self, current_data):
-        # Отримання останніх значень індикаторів
-        last_close = current_data['close'].iloc[-1]
-        last_ma = current_data['ma'].iloc[-1]
-        last_ma_10 = current_data['ma_10'].iloc[-1]
-        last_bb_lower = current_data['bb_lower'].iloc[-1]
-
-        prev_ma_10 = current_data['ma_10'].iloc[-2]
-        prev_ma = current_data['ma'].iloc[-2]
-        prev_bb_lower = current_data['bb_lower'].iloc[-2]
-
-        current_timestamp = current_data.index[-1]
-        self.log(f"Перевірка умов купівлі на {current_timestamp}: Остання ціна={last_close}, MA10={last_ma_10}, MA={last_ma}, BB Lower={last_bb_lower}")
-        logging.info(f"Умови купівлі - Час: {current_timestamp}, Ціна: {last_close}, MA10: {last_ma_10}, MA: {last_ma}, BB Lower: {last_bb_lower}")
-
-        # Перевірка, чи MA10 перетнув MA320 зверху вниз
-        if not self.holding_coins:
-            if prev_ma_10 > prev_ma and last_ma_10 < last_ma:
-                self.log("MA10 перетнув MA320 зверху вниз. Встановлення умовних ордерів.")
-                logging.info("MA10 перетнув MA320 зверху вниз. Встановлення умовних ордерів.")
-                self.setup_conditional_orders(last_close)
-                # Не купувати на першому перетині
-                return
+            self.run_live(stop_event, resume_event)
 
-        # Перевірка на початкову купівлю
-        if not self.initial_buy_done:
-            # Перевірка, чи MA10 перетнув BB нижню лінію зверху
-            if prev_ma_10 < prev_bb_lower and last_ma_10 > last_bb_lower:
-                self.log("MA10 перетнув BB нижню лінію зверху. Виконання початкової купівлі.")
-                logging.info("MA10 перетнув BB нижню лінію зверху. Виконання початкової купівлі.")
-                self.execute_initial_buy_order(current_data)
-                self.initial_buy_done = True
+    def run_live(self, stop_event, resume_event):
+        """Торгівля на закритих клайнах з WebSocket Binance до натискання "Стоп"."""
+        self.live_chart_time = None  # Час відкриття останнього бару, вже надісланого на графік
+        if self.live_orders:
+            exchange = BinanceExchange(client, self.trading_pair)
         else:
-            # Після початкової купівлі
-            # Перевірка, чи ціна нижча за BB нижню лінію та досягла умовних ордерів
-            if last_close < last_bb_lower:
-                for order in self.conditional_orders:
-                    if last_close <= order['price'] and order not in self.remembered_orders:
-                        self.remembered_orders.append(order)
-                        self.log(f"Ціна досягла умовного ордера на {order['price']:.2f}. Запам'ятовування ордера.")
-                        logging.info(f"Ціна досягла умовного ордера на {order['price']:.2f}. Запам'ятовування ордера.")
-            # Коли MA10 знову перетинає BB нижню лінію зверху
-            if prev_ma_10 < prev_bb_lower and last_ma_10 > last_bb_lower:
-                self.log("MA10 знову перетнув BB нижню лінію зверху. Виконання запам'ятованих ордерів.")
-                logging.info("MA10 знову перетнув BB нижню лінію зверху. Виконання запам'ятованих ордерів.")
-                self.execute_remembered_orders(current_data, last_close)
-
-    def execute_initial_buy_order(self, current_data):
-        last_close = current_data['close'].iloc[-1]
-        current_timestamp = current_data.index[-1]
-        self.log(f"Виконання початкової купівлі на {current_timestamp} за ціною {last_close:.2f} USDT")
-        logging.info(f"Виконання початкової купівлі: Ціна={last_close:.2f} USDT")
-
-        # Фільтрація ордерів, де ціна > поточної
-        filtered_orders = [order for order in self.conditional_orders if order['price'] > last_close]
-
-        if not filtered_orders:
-            self.log("Немає умовних ордерів з ціною вище поточної для виконання.")
-            logging.info("Немає умовних ордерів з ціною вище поточної для виконання.")
-            return
-
-        # Підрахунок загальної вартості фільтрованих ордерів за поточною ціною
-        total_orders_cost = sum(order['quantity'] * last_close for order in filtered_orders)
-
-        # Розрахунок, який відсоток початкового балансу це становить
-        total_orders_percent = total_orders_cost / self.initial_balance
-
-        # Обробка випадку, коли purchase_balance_percent = 0%
-        if self.purchase_balance_percent == 0:
-            orders_to_buy = filtered_orders.copy()
-            cumulative_cost = total_orders_cost
-            cumulative_quantity = sum(order['quantity'] for order in orders_to_buy)
-            self.log(f"Відсоток балансу для покупки 0%. Виконано всі {len(orders_to_buy)} умовних ордерів.")
-            logging.info(f"Відсоток балансу для покупки 0%. Виконано всі {len(orders_to_buy)} умовних ордерів.")
-        elif total_orders_percent >= self.purchase_balance_percent:
-            orders_to_buy = filtered_orders.copy()
-            cumulative_cost = total_orders_cost
-            cumulative_quantity = sum(order['quantity'] for order in orders_to_buy)
-            self.log(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT >= вказаному відсотку балансу для покупки.")
-            logging.info(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT >= вказаному відсотку балансу для покупки.")
-        else:
-            # Використання заданого відсотка балансу для покупки
-            purchase_balance = self.initial_balance * self.purchase_balance_percent
-            if self.balance < purchase_balance:
-                purchase_balance = self.balance  # Використати весь доступний баланс, якщо менше
-                self.log(f"Баланс ({self.balance:.2f} USDT) менше заданого відсотка. Використано весь доступний баланс.")
-                logging.info(f"Баланс ({self.balance:.2f} USDT) менше заданого відсотка. Використано весь доступний баланс.")
-
-            orders_to_buy = []
-            cumulative_cost = 0.0
-            cumulative_quantity = 0.0
-
-            for order in filtered_orders:
-                order_quantity = order['quantity']
-                order_cost = order_quantity * last_close  # Використання поточної ціни
-                if cumulative_cost + order_cost <= purchase_balance or cumulative_cost == 0.0:
-                    orders_to_buy.append(order)
-                    cumulative_cost += order_cost
-                    cumulative_quantity += order_quantity
-                else:
-                    break
-            self.log(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT < заданому відсотку балансу для покупки. Купівля до {self.purchase_balance_percent*100:.2f}% балансу.")
-            logging.info(f"Загальна вартість фільтрованих ордерів {cumulative_cost:.2f} USDT < заданому відсотку балансу для покупки. Купівля до {self.purchase_balance_percent*100:.2f}% балансу.")
-
-        if not orders_to_buy:
-            self.log("Немає умовних ордерів, які можна виконати з доступним балансом.")
-            logging.info("Немає умовних ордерів, які можна виконати з доступним балансом.")
-            return
-
-        # Виконання покупки
-        self.bought_quantity += cumulative_quantity
-        self.balance -= cumulative_cost
-        self.total_cost += cumulative_cost
-        avg_price = last_close  # Купівля за поточною ціною
-
-        # Перевірка валідності дати перед додаванням
-        if not isinstance(current_timestamp, pd.Timestamp):
-            self.log(f"Невірний тип часової мітки при виконанні ордерів купівлі: {current_timestamp}")
-            logging.error(f"Невірний тип часової мітки при виконанні ордерів купівлі: {current_timestamp}")
+            exchange = PaperExchange(self.trading_pair)
+        params = {
+            'balance': self.initial_balance,
+            'number_of_orders': self.number_of_orders,
+            'martingale_factor': self.martingale_factor,
+            'order_step_percentage': self.order_step_percentage,
+            'profit_target_percent': self.profit_target_percent,
+            'net_profit_target_percent': self.net_profit_target_percent,
+            'purchase_balance_percent': self.purchase_balance_percent * 100,
+        }
+        self.live_trader = LiveTrader(
+            client,
+            self.trading_pair,
+            self.timeframe,
+            exchange,
+            params,
+            (self.ma_window_size, self.ma_10_window_size, self.bb_window_size),
+            store=KlineStore(KLINE_CACHE_DIR),
+            log=self.log,
+            on_bar=lambda engine: self.publish_live(stop_event, engine),
+            # На паузі індикатори оновлюються, але стратегія не виконується
+            should_trade=resume_event.is_set,
+            instrument=self.profile,
+            trade_sink=self.open_trade_sink(),
+            checkpoint=self.checkpoint,
+        )
+        if stop_event.is_set():
             return
-        if current_timestamp.year < 1 or current_timestamp.year > 9999:
-            self.log(f"Виявлено невірну дату при виконанні ордерів купівлі: {current_timestamp}")
-            logging.error(f"Виявлено невірну дату при виконанні ордерів купівлі: {current_timestamp}")
+        mode = "реальними ордерами" if self.live_orders else "paper trading"
+        self.log(f"Торгівля наживо ({mode}): {self.trading_pair} {self.timeframe}.")
+        try:
+            self.live_trader.start()
+        except Exception as e:
+            self.log(f"Помилка торгівлі наживо: {e}")
+            logging.error(f"Помилка торгівлі наживо: {e}")
+        engine = self.engine = self.live_trader.engine
+        if engine is None:
+            if self.live_trader.trade_sink is not None:
+                self.live_trader.trade_sink.close()
             return
-
-        # Додавання до списків для візуалізації
-        self.buy_prices.append(avg_price)
-        self.buy_times.append(current_timestamp)
-        self.all_buy_trades.append({
-            'price': avg_price,
-            'quantity': cumulative_quantity,
-            'orders_executed': len(orders_to_buy),
-            'timestamp': current_timestamp
-        })
-
-        self.holding_coins = True
-
-        # Видалення виконаних ордерів з умовних
-        self.conditional_orders = [order for order in self.conditional_orders if order not in orders_to_buy]
-
-        # Запис торгівлі
-        self.trade_history.append({
-            'type': 'Buy',
-            'price': avg_price,
-            'quantity': cumulative_quantity,
-            'timestamp': current_timestamp,
-            'orders_executed': len(orders_to_buy)
-        })
-
-        self.log(f"Виконано початкову купівлю на суму {cumulative_cost:.2f} USDT за ціною {avg_price:.2f} USDT.")
-        logging.info(f"Виконано початкову купівлю: Сума={cumulative_cost:.2f} USDT, Ціна={avg_price:.2f} USDT, Кількість={cumulative_quantity}")
-
-    def execute_remembered_orders(self, current_data, crossing_price):
-        current_timestamp = current_data.index[-1]
-        self.log(f"Виконання запам'ятованих ордерів на {current_timestamp} за ціною {crossing_price:.2f} USDT")
-        logging.info(f"Виконання запам'ятованих ордерів: Ціна={crossing_price:.2f} USDT")
-
-        # Купівля запам'ятованих ордерів, де ціна > поточної ціни перетину
-        orders_to_buy = [order for order in self.remembered_orders if order['price'] > crossing_price]
-        if not orders_to_buy:
-            self.log("Немає запам'ятованих ордерів для виконання на цьому перетині.")
-            logging.info("Немає запам'ятованих ордерів для виконання на цьому перетині.")
+        if engine.last_index is not None:
+            self.current_data = engine.frame()
+        self.save_trade_history(engine)
+
+    def publish_live(self, run_token, engine):
+        """Показати новий закритий бар торгівлі наживо (викликається з потоку бота).
+
+        Історія надсилається на графік один раз, далі - лише нові бари (кілька
+        після довантаження прогалини) та кадр з ордерами й угодами.
+        """
+        self.engine = engine
+        if not self.enable_plotting:
             return
-
-        cumulative_cost = 0.0
-        cumulative_quantity = 0.0
-        for order in orders_to_buy:
-            order_quantity = order['quantity']
-            order_cost = order_quantity * crossing_price  # Купівля за поточною ціною
-
-            if self.balance >= order_cost:
-                cumulative_cost += order_cost
-                cumulative_quantity += order_quantity
-                self.bought_quantity += order_quantity
-                self.balance -= order_cost
-                self.total_cost += order_cost
-
-                # Запис торгівлі
-                self.buy_prices.append(crossing_price)
-                self.buy_times.append(current_timestamp)
-                self.all_buy_trades.append({
-                    'price': crossing_price,
-                    'quantity': order_quantity,
-                    'orders_executed': 1,
-                    'timestamp': current_timestamp
-                })
-                self.trade_history.append({
-                    'type': 'Buy',
-                    'price': crossing_price,
-                    'quantity': order_quantity,
-                    'timestamp': current_timestamp,
-                    'orders_executed': 1
-                })
-                self.log(f"Виконано запам'ятований ордер на ціну {crossing_price:.2f} USDT, кількість {order_quantity:.6f}.")
-                logging.info(f"Виконано запам'ятований ордер: Ціна={crossing_price:.2f} USDT, Кількість={order_quantity:.6f}")
-            else:
-                self.log("Недостатньо балансу для виконання запам'ятованого ордера.")
-                logging.info("Недостатньо балансу для виконання запам'ятованого ордера.")
-                break  # Немає достатньо балансу для подальших ордерів
-
-        # Видалення виконаних ордерів з умовних та запам'ятованих
-        self.conditional_orders = [order for order in self.conditional_orders if order not in orders_to_buy]
-        self.remembered_orders = [order for order in self.remembered_orders if order not in orders_to_buy]
-
-    def setup_conditional_orders(self, crossing_price):
-        self.conditional_orders = []
-        P0 = crossing_price
-        S = self.order_step_percentage / 100
-        M = self.martingale_factor
-        total_sum = 0
-        prices = [P0]
-        quantities = []
-
-        # Розрахунок цін ордерів
-        for n in range(1, self.number_of_orders + 1):
-            if n > 1:
-                Pn = prices[-1] - (S * P0)
-                prices.append(Pn)
-            exponent = (n - 1)
-            total_sum += prices[-1] * (1 + M) ** exponent
-
-        # Розрахунок кількості
-        Q1 = self.initial_balance / total_sum  # Використання початкового балансу для розрахунку кількості
-        quantities.append(Q1)
-        for n in range(1, self.number_of_orders):
-            Qn = quantities[-1] * (1 + M)
-            quantities.append(Qn)
-
-        # Зберігання умовних ордерів
-        for price, quantity in zip(prices, quantities):
-            self.conditional_orders.append({'price': price, 'quantity': quantity})
-
-        self.log(f"Встановлено умовні ордери, починаючи з ціни {P0:.2f} USDT.")
-        logging.info(f"Встановлено умовні ордери, починаючи з ціни {P0:.2f} USDT.")
-
-    def check_sell_conditions(self, current_data):
-        # Отримання останніх значень індикаторів
-        last_close = current_data['close'].iloc[-1]
-        last_bb_upper = current_data['bb_upper'].iloc[-1]
-
-        current_timestamp = current_data.index[-1]
-        self.log(f"Перевірка умов продажу на {current_timestamp}: Остання ціна={last_close}, BB Upper={last_bb_upper}")
-        logging.info(f"Умови продажу - Час: {current_timestamp}, Ціна: {last_close}, BB Upper: {last_bb_upper}")
-
-        if self.holding_coins and self.bought_quantity > 0:
-            current_value = self.bought_quantity * last_close
-            profit = current_value - self.total_cost
-            profit_percent = (profit / self.total_cost) * 100 if self.total_cost > 0 else 0
-
-            if profit_percent >= self.net_profit_target_percent or \
-               (last_close > last_bb_upper and profit_percent >= self.profit_target_percent):
-                # Виконання продажу
-                trade_profit = (last_close * self.bought_quantity) - self.total_cost
-                self.profit += trade_profit
-                self.log(f"Продано {self.bought_quantity:.6f} одиниць за ціною {last_close:.2f} USDT.")
-                logging.info(f"Продано {self.bought_quantity:.6f} одиниць за ціною {last_close:.2f} USDT.")
-
-                self.sell_times.append(current_timestamp)
-                self.sell_prices.append(last_close)
-                # Запис торгівлі
-                self.trade_history.append({
-                    'type': 'Sell',
-                    'price': last_close,
-                    'quantity': self.bought_quantity,
-                    'timestamp': current_timestamp,
-                    'profit_percent': profit_percent
-                })
-                self.all_sell_trades.append({
-                    'price': last_close,
-                    'quantity': self.bought_quantity,
-                    'profit_percent': profit_percent,
-                    'timestamp': current_timestamp
-                })
-                self.log(f"Прибуток від торгівлі: {trade_profit:.2f} USDT.")
-                logging.info(f"Прибуток від торгівлі: {trade_profit:.2f} USDT.")
-
-                self.holding_coins = False
-                self.bought_quantity = 0
-                self.buy_prices = []
-                self.total_cost = 0.0  # Скидання загальної вартості
-                # Скидання для наступного циклу торгівлі
-                self.conditional_orders = []
-                self.remembered_orders = []  # Очищення запам'ятованих ордерів
-                self.initial_buy_done = False  # Скидання флагу початкової купівлі
-                # Скидання балансу до початкового, гарантування, що він не перевищує початковий
-                self.balance = self.initial_balance
-                self.log("Підготовка до наступної можливості купівлі.")
-                logging.info("Підготовка до наступної можливості купівлі.")
-
-    def update_visualization(self, data, buy_times, buy_prices, sell_times, sell_prices):
-        # Очищення попередніх графіків
-        self.ax_price.clear()
-
-        # Побудова графіку ціни
-        self.ax_price.plot(data.index, data['close'], label='Ціна', color='blue')
-
-        # Побудова MA
-        if self.params['show_ma'].get():
-            self.ax_price.plot(data.index, data['ma'], label=f"MA {self.ma_window_size}", color='orange')
-            self.ax_price.plot(data.index, data['ma_10'], label=f"MA {self.ma_10_window_size}", color='purple')
-
-        # Побудова Bollinger Bands
-        if self.params['show_bb'].get():
-            self.ax_price.plot(data.index, data['bb_upper'], label='BB Верхня', color='green')
-            self.ax_price.plot(data.index, data['bb_lower'], label='BB Нижня', color='red')
-
-        # Побудова умовних ордерів як горизонтальних ліній
-        for order in self.conditional_orders:
-            self.ax_price.axhline(y=order['price'], linestyle='--', color='grey', alpha=0.5)
-
-        # Побудова ордерів на купівлю
-        if self.all_buy_trades:
-            buy_scatter = self.ax_price.scatter(
-                [trade['timestamp'] for trade in self.all_buy_trades],
-                [trade['price'] for trade in self.all_buy_trades],
-                marker='^',
-                color='green',
-                label='Купівля'
-            )
-            cursor = mplcursors.cursor(buy_scatter, hover=True)
-            cursor.connect("add", lambda sel: sel.annotation.set_text(
-                f"Купівля\nЦіна: {self.all_buy_trades[sel.target.index]['price']:.2f} USDT\n"
-                f"Кількість: {self.all_buy_trades[sel.target.index]['quantity']:.6f}\n"
-                f"Ордерів: {self.all_buy_trades[sel.target.index]['orders_executed']}"
-            ))
-
-        # Побудова ордерів на продаж
-        if self.all_sell_trades:
-            sell_scatter = self.ax_price.scatter(
-                [trade['timestamp'] for trade in self.all_sell_trades],
-                [trade['price'] for trade in self.all_sell_trades],
-                marker='v',
-                color='red',
-                label='Продаж'
-            )
-            cursor = mplcursors.cursor(sell_scatter, hover=True)
-            cursor.connect("add", lambda sel: sel.annotation.set_text(
-                f"Продаж\nЦіна: {self.all_sell_trades[sel.target.index]['price']:.2f} USDT\n"
-                f"Кількість: {self.all_sell_trades[sel.target.index]['quantity']:.6f}\n"
-                f"Прибуток: {self.all_sell_trades[sel.target.index]['profit_percent']:.2f}%"
-            ))
-
-        # Форматування осі x для відображення дати та часу
-        self.ax_price.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-        self.ax_price.xaxis.set_major_locator(mdates.AutoDateLocator())
-
-        # Додавання легенди
-        self.ax_price.legend()
-
-        # Налаштування макету та оновлення Canvas
-        self.figure.tight_layout()
-        self.canvas.draw()
-
-
-def get_historical_data(symbol, interval, start_date=None, end_date=None, limit=1000):
-    """Отримати історичні дані з Binance."""
-    klines = []
-
-    if start_date:
-        try:
-            start_ts = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
-        except ValueError as e:
-            logging.error(f"Помилка парсингу початкової дати: {e}")
-            raise
-    else:
-        start_ts = None
-
-    if end_date:
+        if self.live_chart_time is None:
+            self.bridge.publish('load', (run_token, engine.frame()))
+        else:
+            first = len(engine.index)
+            while first > 0 and engine.index[first - 1] > self.live_chart_time:
+                first -= 1
+            self.bridge.publish('bars', (run_token, engine.frame(first)))
+        self.live_chart_time = engine.last_open_time
+        self.publish_frame(run_token, engine, None)
+
+    def open_trade_sink(self):
+        """Файл історії торгівлі, у який журнал дописує угоди пачками під час роботи (.parquet або CSV)."""
         try:
-            end_ts = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
-        except ValueError as e:
-            logging.error(f"Помилка парсингу кінцевої дати: {e}")
-            raise
-    else:
-        end_ts = None
+            return open_trade_sink(self.trade_history_filename)
+        except Exception as e:
+            self.log(f"Не вдалося відкрити файл історії торгівлі: {e}")
+            logging.error(f"Не вдалося відкрити файл історії торгівлі: {e}")
+            return None
 
-    while True:
+    def save_trade_history(self, engine):
+        filename = self.trade_history_filename
         try:
-            temp_klines = client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit,
-                startTime=start_ts,
-                endTime=end_ts
-            )
-            logging.info(f"Отримано {len(temp_klines)} клінів.")
-        except BinanceAPIException as e:
-            logging.error(f"Binance API помилка: {e}")
-            break
-        except BinanceRequestException as e:
-            logging.error(f"Binance Запит помилка: {e}")
-            break
+            if engine.journal.sink is None:
+                engine.trade_history_frame().to_csv(filename, index=False)
+            engine.journal.close()
+            self.log(f"Історія торгівлі збережена у файл '{filename}'.")
+            logging.info(f"Історія торгівлі збережена у файл '{filename}'.")
         except Exception as e:
-            logging.error(f"Несподівана помилка: {e}")
-            break
-
-        if not temp_klines:
-            logging.info("Немає більше клінів для завантаження. Вихід з циклу.")
-            break
-        klines.extend(temp_klines)
-
-        if len(temp_klines) < limit:
-            # Немає більше даних для завантаження
-            logging.info("Отримано менше ніж ліміт. Припускається, що всі дані завантажено.")
-            break
-        else:
-            # Оновлення start_ts до часу закриття останнього кліну + 1 мс для уникнення перекриття
-            last_close_time = temp_klines[-1][6]  # Час закриття знаходиться на індексі 6
-            start_ts = last_close_time + 1
-            last_date = pd.to_datetime(last_close_time, unit='ms')
-            logging.info(f"Оновлено start_ts до {last_date}")
-
-    # Обробка та повернення даних
-    data = pd.DataFrame(klines, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_asset_volume', 'number_of_trades',
-        'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-    ])
-    data['timestamp'] = pd.to_datetime(data['timestamp'], unit='ms', errors='coerce')
-    data = data.dropna(subset=['timestamp'])  # Видалення рядків з некоректними датами
-    data.set_index('timestamp', inplace=True)
-    data = data[['open', 'high', 'low', 'close', 'volume']]
-    data = data.astype(float)
-    logging.info(f"Загальна кількість отриманих даних: {len(data)}")
-    return data
-
-
-def calculate_indicators(data, ma_window_size, ma_10_window_size, bb_window_size):
-    """Обчислити індикатори MA та Bollinger Bands."""
-    # Простий рухомий середній (MA)
-    data['ma'] = SMAIndicator(close=data['close'], window=ma_window_size).sma_indicator()
-    data['ma_10'] = SMAIndicator(close=data['close'], window=ma_10_window_size).sma_indicator()
-
-    # Bollinger Bands
-    bb_indicator = BollingerBands(close=data['close'], window=bb_window_size, window_dev=2)
-    data['bb_upper'] = bb_indicator.bollinger_hband()
-    data['bb_lower'] = bb_indicator.bollinger_lband()
-
-    logging.info("Індикатори успішно обчислено.")
-    return data
+            self.log(f"Не вдалося зберегти історію торгівлі: {e}")
+            logging.error(f"Не вдалося зберегти історію торгівлі: {e}")
+
+    def publish_frame(self, run_token, engine, stop):
+        """Надіслати у Tk знімок стану рушія для графіку (викликається з потоку бота)."""
+        # Журнал лише доповнюється, тож знімок колонок - це view без копіювання
+        self.bridge.publish('frame', (run_token, stop, list(engine.conditional_orders), engine.journal.snapshot()))
+
+    def load_chart(self, payload):
+        run_token, data = payload
+        if run_token is not self.stop_event:
+            return  # Подія попереднього запуску
+        self.chart.load(data, ma_label=f"MA {self.ma_window_size}", ma_10_label=f"MA {self.ma_10_window_size}")
+
+    def append_chart(self, payload):
+        run_token, data = payload
+        if run_token is not self.stop_event:
+            return  # Подія попереднього запуску
+        self.chart.append(data)
+
+    def update_visualization(self, frame):
+        """Оновити графік за знімком стану без повного перемальовування (у потоці Tk)."""
+        run_token, stop, conditional_orders, trades = frame
+        if run_token is not self.stop_event:
+            return  # Кадр попереднього запуску
+        with metrics.timer('update_visualization'):
+            self.chart.update(
+                stop,
+                conditional_orders,
+                trades,
+                show_ma=self.params['show_ma'].get(),
+                show_bb=self.params['show_bb'].get(),
+            )
+        metrics.inc('redraws_total')
+
+
+@metrics.timed('get_historical_data')
+def get_historical_data(symbol, interval, start_date=None, end_date=None, limit=1000, store=None):
+    """Отримати історичні дані з Binance через локальний кеш клайнів."""
+    return load_history(client, symbol, interval, start_date=start_date, end_date=end_date, limit=limit,
+                        store=store or KlineStore(KLINE_CACHE_DIR))
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+        # Запуск без GUI: python "trading_bot Profit1468.py" backtest --csv ... (те саме, що cli.py)
+        sys.exit(cli.main(sys.argv[1:]))
+
     parser = argparse.ArgumentParser(description='Binance Trading Bot')
     parser.add_argument('--from', dest='from_date', type=str, help='Початкова дата у форматі YYYY-MM-DD')
     parser.add_argument('--to', dest='to_date', type=str, help='Кінцева дата у форматі YYYY-MM-DD')
+    parser.add_argument('--csv', dest='csv_path', type=str, help='Бек-тест на локальному CSV (Time,Open,High,Low,Close,Volume)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Рівень логування (DEBUG - побарова діагностика стратегії)')
+    parser.add_argument('--live-orders', action='store_true',
+                        help='Без --from/--to/--csv: виставляти реальні ордери на Binance замість paper trading')
+    parser.add_argument('--profile', action='store_true',
+                        help='Таймери стадій, лічильники та гістограми затримок зі звітом у лог наприкінці запуску')
+    parser.add_argument('--profile-output', help='Записати профіль cProfile потоку бота у файл pstats')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Віддавати метрики у форматі Prometheus на http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--checkpoint', help='Файл знімка стану торгівлі наживо (продовження після перезапуску)')
 
     args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level)
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
 
     root = tk.Tk()
-    app = TradingBotApp(root, from_date=args.from_date, to_date=args.to_date)
-    root.mainloop()
\ No newline at end of file
+    app = TradingBotApp(root, from_date=args.from_date, to_date=args.to_date, csv_path=args.csv_path,
+                        live_orders=args.live_orders, profile=args.profile or args.metrics_port is not None,
+                        profile_output=args.profile_output, checkpoint=args.checkpoint)
+    root.mainloop()
@@ -0,0 +1,161 @@
+import argparse
+import csv
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import BacktestEngine, max_drawdown
+from data_source import load_ohlcv
+from optimizer import (RESULT_FIELDS, _init_worker, add_sweep_arguments, build_grid, engine_metrics, ranges_from_args,
+                       silent, worker_indicators)
+
+
+FOLD_FIELDS = ['fold', 'train_start', 'train_end', 'test_start', 'test_end']
+
+
+def plan_folds(index, train_months=3, test_months=1, anchored=False):
+    """Розбити часовий індекс на фолди train/test по календарних місяцях.
+
+    Повертає список позицій (train_lo, train_hi, test_lo, test_hi); вікна
+    зсуваються на test_months, тож тестові відрізки йдуть підряд без
+    перекриття. З anchored навчальне вікно завжди починається з першого бару.
+    Останній тестовий відрізок може бути коротшим.
+    """
+    if len(index) == 0:
+        return []
+    first = index[0]
+    folds = []
+    shift = 0
+    while True:
+        train_start = first if anchored else first + pd.DateOffset(months=shift)
+        train_end = first + pd.DateOffset(months=shift + train_months)
+        test_end = train_end + pd.DateOffset(months=test_months)
+        train_lo, train_hi, test_hi = (int(position) for position in index.searchsorted([train_start, train_end, test_end]))
+        if train_hi >= len(index):
+            break
+        folds.append((train_lo, train_hi, train_hi, test_hi))
+        shift += test_months
+    return folds
+
+
+def run_window(params, balance, lo, hi):
+    """Бек-тест на барах [lo, hi) з індикаторами, порахованими на всій історії (без втрати прогріву).
+
+    Повертає (метрики, крива капіталу вікна).
+    """
+    # Попередній бар потрібен для перетинів на першому барі вікна
+    engine = BacktestEngine.from_params(worker_indicators(params).iloc[max(lo - 1, 0):hi],
+                                        {'balance': balance, **params}, log=silent, kernel=True)
+    engine.run()
+    equity = engine.equity_curve()[1 if lo > 0 else 0:]  # Рівно бари [lo, hi)
+    return engine_metrics(engine, equity, balance), equity
+
+
+def evaluate_fold(fold, grid, balance, rank_by):
+    """Оптимізувати параметри на навчальному вікні фолду й оцінити найкращі на тестовому."""
+    train_lo, train_hi, test_lo, test_hi = fold
+    reverse = rank_by != 'max_drawdown'  # Просадку мінімізуємо, решту метрик - максимізуємо
+    best_params, best_metrics = None, None
+    for params in grid:
+        metrics, _ = run_window(params, balance, train_lo, train_hi)
+        if best_metrics is None or (metrics[rank_by] > best_metrics[rank_by] if reverse
+                                    else metrics[rank_by] < best_metrics[rank_by]):
+            best_params, best_metrics = params, metrics
+    test_metrics, equity = run_window(best_params, balance, test_lo, test_hi)
+    return best_params, best_metrics, test_metrics, equity
+
+
+def chain_equity(equities, balance):
+    """Склеїти криві тестових вікон: кожне починається з капіталу, яким закінчилось попереднє.
+
+    Позиція, відкрита наприкінці вікна, враховується за ціною закриття останнього бару.
+    """
+    combined = []
+    offset = 0.0
+    for equity in equities:
+        combined.append(equity + offset)
+        if len(equity):
+            offset += float(equity[-1]) - balance
+    return np.concatenate(combined) if combined else np.array([])
+
+
+def run_walk_forward(csv_path, ranges, output, equity_output, balance=5000.0, start_date=None, end_date=None,
+                     train_months=3, test_months=1, anchored=False, workers=None, rank_by='profit',
+                     indicator_cache_dir=None, timeframe=None):
+    """Walk-forward: незалежні фолди паралельно у пулі процесів, спільна out-of-sample крива капіталу."""
+    grid = build_grid(ranges)
+    # Бінарний кеш створюється до запуску воркерів; воркери відкривають його через memory map
+    data = load_ohlcv(csv_path, start_date=start_date, end_date=end_date, timeframe=timeframe)
+    folds = plan_folds(data.index, train_months, test_months, anchored)
+    if not folds:
+        raise ValueError(f"Замало даних для навчального вікна {train_months} міс. і тестового {test_months} міс.")
+
+    started = time.perf_counter()
+    logging.info(f"Walk-forward: {len(folds)} фолдів ({train_months} міс. навчання / {test_months} міс. тест), "
+                 f"{len(grid)} комбінацій на фолд, {workers or os.cpu_count()} процесів.")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(csv_path, start_date, end_date, indicator_cache_dir, timeframe)) as executor:
+        futures = [executor.submit(evaluate_fold, fold, grid, balance, rank_by) for fold in folds]
+        results = []
+        for number, future in enumerate(futures, start=1):
+            results.append(future.result())
+            if number % max(1, len(folds) // 10) == 0 or number == len(folds):
+                logging.info(f"Виконано {number}/{len(folds)} фолдів за {time.perf_counter() - started:.1f} с.")
+
+    index = data.index
+    param_names = list(grid[0])
+    rows = []
+    for number, (fold, (params, train_metrics, test_metrics, _)) in enumerate(zip(folds, results), start=1):
+        train_lo, train_hi, test_lo, test_hi = fold
+        rows.append({
+            'fold': number,
+            'train_start': index[train_lo], 'train_end': index[train_hi - 1],
+            'test_start': index[test_lo], 'test_end': index[test_hi - 1],
+            **params,
+            **{f'train_{name}': train_metrics[name] for name in RESULT_FIELDS},
+            **{f'test_{name}': test_metrics[name] for name in RESULT_FIELDS},
+        })
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FOLD_FIELDS + param_names
+                                + [f'train_{name}' for name in RESULT_FIELDS] + [f'test_{name}' for name in RESULT_FIELDS])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    equity = chain_equity([result[3] for result in results], balance)
+    timestamps = index[folds[0][2]:folds[-1][3]]
+    pd.DataFrame({'equity': equity}, index=pd.DatetimeIndex(timestamps, name='timestamp')).to_csv(equity_output)
+
+    profit = float(equity[-1]) - balance if len(equity) else 0.0
+    logging.info(f"Walk-forward завершено за {time.perf_counter() - started:.1f} с. Out-of-sample прибуток: "
+                 f"{profit:.2f} USDT, макс. просадка {max_drawdown(equity):.2f}%. "
+                 f"Фолди у '{output}', крива капіталу у '{equity_output}'.")
+    return rows, equity
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Walk-forward оцінка стратегії з паралельними фолдами')
+    parser.add_argument('--csv', required=True, help='CSV з даними OHLCV (Time,Open,High,Low,Close,Volume)')
+    parser.add_argument('--from', dest='from_date', help='Початкова дата у форматі YYYY-MM-DD')
+    parser.add_argument('--to', dest='to_date', help='Кінцева дата у форматі YYYY-MM-DD')
+    parser.add_argument('--timeframe', help='Таймфрейм стратегії, напр. 1h (агрегується з даних CSV)')
+    parser.add_argument('--train-months', type=int, default=3, help='Довжина навчального вікна, місяців')
+    parser.add_argument('--test-months', type=int, default=1, help='Довжина тестового вікна (і кроку), місяців')
+    parser.add_argument('--anchored', action='store_true', help='Навчальне вікно завжди від початку даних')
+    parser.add_argument('--balance', type=float, default=5000.0, help='Початковий баланс')
+    parser.add_argument('--workers', type=int, default=None, help='Кількість процесів (за замовчуванням - усі ядра)')
+    parser.add_argument('--rank-by', default='profit', choices=RESULT_FIELDS, help='Метрика вибору параметрів на навчанні')
+    parser.add_argument('--output', default='walk_forward_folds.csv', help='Файл з результатами фолдів')
+    parser.add_argument('--equity-output', default='walk_forward_equity.csv', help='Файл з out-of-sample кривою капіталу')
+    parser.add_argument('--indicator-cache', default=None, help='Каталог для збереження індикаторів між запусками')
+    add_sweep_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_walk_forward(args.csv, ranges_from_args(args), args.output, args.equity_output, balance=args.balance,
+                     start_date=args.from_date, end_date=args.to_date, train_months=args.train_months,
+                     test_months=args.test_months, anchored=args.anchored, workers=args.workers,
+                     rank_by=args.rank_by, indicator_cache_dir=args.indicator_cache, timeframe=args.timeframe)